@@ -1,18 +1,23 @@
 """
 Authentication utilities for password hashing and JWT tokens
 """
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
+import secrets
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
 import os
 from dotenv import load_dotenv
 
-from backend.database import get_db
+from backend.database import run_db
 from backend.auth_models import User
+from backend.services.cache import TTLCache, MISSING
+from backend.password_hashing import password_hash_pool, HashPoolBusy, TooManyAttempts
 
 # Load environment variables
 load_dotenv()
@@ -21,12 +26,82 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_DAYS = int(os.getenv("ACCESS_TOKEN_EXPIRE_DAYS", "1"))
+# Stream tickets: short-lived, single-use tokens for EventSource URLs (which end up in logs)
+STREAM_TICKET_EXPIRE_SECONDS = int(os.getenv("STREAM_TICKET_EXPIRE_SECONDS", "30"))
+STREAM_SCOPE = "stream"
+
+# Authenticated-user cache (avoids a database query per protected request)
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+# Trust the signed uid/active claims in the token and skip the database entirely
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() == "true"
 
 # Password hashing context (bcrypt)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # OAuth2 scheme for token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+# Same, but optional: streaming endpoints also accept ?ticket= (EventSource cannot send headers)
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
+
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """Detached snapshot of the fields protected routes use from a User"""
+    id: int
+    email: str
+    is_active: bool
+    created_at: Optional[datetime] = None
+    
+    @classmethod
+    def from_user(cls, user: User) -> "AuthenticatedUser":
+        return cls(id=user.id, email=user.email, is_active=user.is_active, created_at=user.created_at)
+
+
+# Token subject (email) -> AuthenticatedUser, or None for unknown users
+user_cache = TTLCache(maxsize=AUTH_USER_CACHE_SIZE, ttl=AUTH_USER_CACHE_TTL)
+
+# Subjects deactivated by this process; checked even when trusting token claims
+deactivated_subjects = TTLCache(maxsize=AUTH_USER_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_DAYS * 24 * 3600)
+
+# Ids of stream tickets already redeemed on this process, kept until the tickets expire
+redeemed_tickets = TTLCache(maxsize=AUTH_USER_CACHE_SIZE, ttl=STREAM_TICKET_EXPIRE_SECONDS)
+
+
+def invalidate_user(email: str, deactivated: bool = False):
+    """
+    Drop a user from the authentication cache
+    
+    Args:
+        email: Token subject
+        deactivated: Also reject tokens whose claims still say the user is active
+    """
+    user_cache.invalidate(email)
+    if deactivated:
+        deactivated_subjects.set(email, True)
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target):
+    """Invalidate cached users when their active flag or email changes"""
+    state = inspect(target)
+    if state.attrs.is_active.history.has_changes() or state.attrs.email.history.has_changes():
+        for email in set(state.attrs.email.history.deleted or []) | {target.email}:
+            invalidate_user(email, deactivated=not target.is_active)
+    if target.is_active:
+        deactivated_subjects.invalidate(target.email)
+
+
+@event.listens_for(User, "after_insert")
+def _user_created(mapper, connection, target):
+    """Forget a cached "unknown user" result for a newly registered email"""
+    invalidate_user(target.email)
+    deactivated_subjects.invalidate(target.email)
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target):
+    invalidate_user(target.email, deactivated=True)
 
 
 def hash_password(password: str) -> str:
@@ -56,6 +131,59 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def _run_hashing(account: str, fn, *args):
+    """Run a bcrypt call on the hashing pool, mapping admission failures to HTTP errors"""
+    try:
+        return await password_hash_pool.run(account, fn, *args)
+    except TooManyAttempts as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": "1"},
+        )
+    except HashPoolBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "2"},
+        )
+
+
+async def hash_password_async(password: str, account: str) -> str:
+    """
+    Hash password on the bcrypt worker pool (use from async routes)
+    
+    Args:
+        password: Plain text password
+        account: Email the password belongs to (per-account concurrency limit)
+        
+    Returns:
+        Hashed password
+        
+    Raises:
+        HTTPException: 429 if the account has too many attempts in flight, 503 if the pool is saturated
+    """
+    return await _run_hashing(account, hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str, account: str) -> bool:
+    """
+    Verify password on the bcrypt worker pool (use from async routes)
+    
+    Args:
+        plain_password: Plain text password from user
+        hashed_password: Hashed password from database
+        account: Email being logged into (per-account concurrency limit)
+        
+    Returns:
+        True if password matches, False otherwise
+        
+    Raises:
+        HTTPException: 429 if the account has too many attempts in flight, 503 if the pool is saturated
+    """
+    return await _run_hashing(account, verify_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Create JWT access token
@@ -82,41 +210,88 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def verify_token(token: str) -> Optional[str]:
+def user_claims(user: User) -> dict:
+    """Token claims for a user (subject plus the fields trusted-claims mode relies on)"""
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "active": bool(user.is_active),
+        "created": user.created_at.isoformat() if user.created_at else None
+    }
+
+
+def create_stream_ticket(user: AuthenticatedUser) -> str:
     """
-    Verify JWT token and extract email
+    Create a ticket for opening one live weather stream
+    
+    Unlike an access token it expires after STREAM_TICKET_EXPIRE_SECONDS, is
+    accepted only by streaming endpoints, and is redeemed at most once per
+    worker, so a URL that leaks into access logs or browser history is
+    useless.
+    
+    Args:
+        user: Authenticated user the ticket is issued to
+        
+    Returns:
+        Encoded JWT ticket
+    """
+    claims = {**user_claims(user), "scope": STREAM_SCOPE, "jti": secrets.token_urlsafe(16)}
+    return create_access_token(claims, timedelta(seconds=STREAM_TICKET_EXPIRE_SECONDS))
+
+
+def decode_token(token: str) -> Optional[dict]:
+    """
+    Verify JWT token and return its claims
     
     Args:
         token: JWT token
         
     Returns:
-        Email from token if valid, None otherwise
+        Claims if valid, None otherwise
     """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        return email
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         return None
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+def verify_token(token: str) -> Optional[str]:
+    """
+    Verify JWT token and extract email
+    
+    Args:
+        token: JWT token
+        
+    Returns:
+        Email from token if valid, None otherwise
+    """
+    payload = decode_token(token)
+    return payload.get("sub") if payload else None
+
+
+def _load_user(db: Session, email: str) -> Optional[AuthenticatedUser]:
+    """Fetch a user snapshot from the database"""
+    user = db.query(User).filter(User.email == email).first()
+    return AuthenticatedUser.from_user(user) if user else None
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> AuthenticatedUser:
     """
     Get current user from JWT token
     This is a dependency that can be used in protected routes
     
+    Users are served from a short-lived in-process cache; with
+    AUTH_TRUST_TOKEN_CLAIMS the signed claims are used and the database is
+    never touched.
+    
     Args:
         token: JWT token from request header
-        db: Database session
         
     Returns:
-        User object if token is valid
+        AuthenticatedUser if token is valid
         
     Raises:
-        HTTPException: If token is invalid or user not found
+        HTTPException: If token is invalid, user not found or inactive
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -124,14 +299,80 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    # Verify token and get email
-    email = verify_token(token)
+    # Verify token and get email (stream tickets are not access tokens)
+    payload = decode_token(token)
+    if payload is None or "scope" in payload:
+        raise credentials_exception
+    return await _user_from_claims(payload, credentials_exception)
+
+
+async def _user_from_claims(payload: dict, credentials_exception: HTTPException) -> AuthenticatedUser:
+    """Resolve the active user a verified token was issued to"""
+    email = payload.get("sub")
     if email is None:
         raise credentials_exception
     
-    # Get user from database
-    user = db.query(User).filter(User.email == email).first()
+    if AUTH_TRUST_TOKEN_CLAIMS and "uid" in payload and "active" in payload:
+        created = payload.get("created")
+        user = AuthenticatedUser(
+            id=payload["uid"],
+            email=email,
+            is_active=payload["active"] and deactivated_subjects.get(email) is MISSING,
+            created_at=datetime.fromisoformat(created) if created else None
+        )
+    else:
+        user = user_cache.get(email)
+        if user is MISSING:
+            # Get user from database (async engine or threadpool, never on the event loop)
+            user = await run_db(_load_user, email)
+            user_cache.set(email, user)
+    
     if user is None:
         raise credentials_exception
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Account is inactive. Please contact support.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
     return user
+
+
+async def get_stream_user(
+    header_token: Optional[str] = Depends(oauth2_scheme_optional),
+    ticket: Optional[str] = Query(None)
+) -> AuthenticatedUser:
+    """
+    Get current user for a streaming endpoint
+    
+    Browsers' EventSource cannot set an Authorization header, so instead of
+    the access token it passes a stream ticket (see create_stream_ticket) as
+    the `ticket` query parameter. Each ticket opens one stream.
+    
+    Args:
+        header_token: JWT token from request header
+        ticket: Stream ticket from the query string
+        
+    Returns:
+        AuthenticatedUser if the token or ticket is valid
+        
+    Raises:
+        HTTPException: If neither was sent, the ticket is invalid, expired or
+            already used, or the user is inactive
+    """
+    if header_token:
+        return await get_current_user(header_token)
+    
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Not authenticated" if not ticket else "Invalid or expired stream ticket",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    payload = decode_token(ticket) if ticket else None
+    if payload is None or payload.get("scope") != STREAM_SCOPE or "jti" not in payload:
+        raise credentials_exception
+    if redeemed_tickets.get(payload["jti"]) is not MISSING:
+        raise credentials_exception
+    redeemed_tickets.set(payload["jti"], True)
+    return await _user_from_claims(payload, credentials_exception)
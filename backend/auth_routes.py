@@ -7,9 +7,9 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
 
-from backend.database import get_db
+from backend.database import run_db
 from backend.auth_models import User
-from backend.auth import hash_password, verify_password, create_access_token, get_current_user
+from backend.auth import hash_password_async, verify_password_async, create_access_token, get_current_user, user_claims, AuthenticatedUser
 
 # Create router
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
@@ -70,10 +70,28 @@ class MessageResponse(BaseModel):
     message: str
 
 
+# ===== Database helpers =====
+# Run through run_db (async engine or threadpool) with a short-lived session,
+# so no pooled connection is held while a request waits for password hashing.
+
+def _get_user_by_email(db: Session, email: str) -> Optional[User]:
+    """Load a user (detached, attributes loaded) or None"""
+    return db.query(User).filter(User.email == email).first()
+
+
+def _create_user(db: Session, email: str, hashed_password: str) -> User:
+    """Insert a new active user"""
+    user = User(email=email, hashed_password=hashed_password, is_active=True)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
 # ===== API Endpoints =====
 
 @router.post("/signup", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
-async def signup(request: SignupRequest, db: Session = Depends(get_db)):
+async def signup(request: SignupRequest):
     """
     User Signup Endpoint
     
@@ -82,36 +100,27 @@ async def signup(request: SignupRequest, db: Session = Depends(get_db)):
     
     Args:
         request: Signup request with email and password
-        db: Database session
         
     Returns:
         Success message
         
     Raises:
         HTTPException 400: If email already exists
+        HTTPException 429/503: If password hashing is saturated
     """
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == request.email).first()
+    existing_user = await run_db(_get_user_by_email, request.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered. Please login instead."
         )
     
-    # Hash password (NEVER store plaintext password!)
-    hashed_password = hash_password(request.password)
-    
-    # Create new user
-    new_user = User(
-        email=request.email,
-        hashed_password=hashed_password,
-        is_active=True
-    )
+    # Hash password (NEVER store plaintext password!) on the bcrypt pool, off the event loop
+    hashed_password = await hash_password_async(request.password, request.email)
     
-    # Save to database
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    # Create new user and save to database
+    await run_db(_create_user, request.email, hashed_password)
     
     return MessageResponse(
         success=True,
@@ -120,7 +129,7 @@ async def signup(request: SignupRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest):
     """
     User Login Endpoint
     
@@ -129,24 +138,24 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
     
     Args:
         request: Login request with email and password
-        db: Database session
         
     Returns:
         JWT access token
         
     Raises:
         HTTPException 401: If credentials are invalid
+        HTTPException 429/503: If password hashing is saturated
     """
     # Check if user exists
-    user = db.query(User).filter(User.email == request.email).first()
+    user = await run_db(_get_user_by_email, request.email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Please signup first"
         )
     
-    # Verify password
-    if not verify_password(request.password, user.hashed_password):
+    # Verify password on the bcrypt pool, off the event loop
+    if not await verify_password_async(request.password, user.hashed_password, user.email):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid password"
@@ -160,7 +169,7 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
         )
     
     # Create JWT access token (expires in 1 day)
-    access_token = create_access_token(data={"sub": user.email})
+    access_token = create_access_token(data=user_claims(user))
     
     return TokenResponse(
         access_token=access_token,
@@ -171,7 +180,7 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_profile(current_user: User = Depends(get_current_user)):
+async def get_current_user_profile(current_user: AuthenticatedUser = Depends(get_current_user)):
     """
     Get Current User Profile (Protected Route)
     
@@ -188,7 +197,7 @@ async def get_current_user_profile(current_user: User = Depends(get_current_user
         id=current_user.id,
         email=current_user.email,
         is_active=current_user.is_active,
-        created_at=current_user.created_at.isoformat()
+        created_at=current_user.created_at.isoformat() if current_user.created_at else ""
     )
 
 
@@ -0,0 +1 @@
+"""Benchmarks and load tests (run as modules, e.g. python -m backend.benchmarks.bench_async_client)"""
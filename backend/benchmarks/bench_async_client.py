@@ -0,0 +1,84 @@
+"""
+Throughput of blocking vs async upstream calls inside one event loop
+
+Simulates N concurrent route invocations on a single uvicorn worker:
+  - before: async routes making blocking `requests` calls (the pre-async
+            service path: cached geocode, then cached forecast)
+  - after:  async routes awaiting AsyncOpenMeteoService (pooled httpx)
+
+Usage:
+    python -m backend.benchmarks.bench_async_client [requests] [upstream_delay_s]
+"""
+import asyncio
+import sys
+import time
+
+import requests
+
+from backend.benchmarks.fake_upstream import FakeUpstream
+from backend.services.cache import MISSING
+from backend.services.weather_service import OpenMeteoService, AsyncOpenMeteoService
+
+
+def _blocking_get_weather(service: OpenMeteoService, city: str):
+    """Current weather the way the service fetched it before the async client, blocking the caller"""
+    key = service._geocode_key(city, 1)
+    locations = service.geocode_cache.get(key)
+    if locations is MISSING:
+        response = requests.get(service.geocoding_url, params={"q": city, "limit": 1}, timeout=10)
+        response.raise_for_status()
+        locations = service._parse_photon(response.json())
+        service.geocode_cache.set(key, locations)
+    location = service._first_location(city, locations)
+
+    params = service._forecast_params(location["lat"], location["lon"])
+    key = service.forecast_cache.key(location["lat"], location["lon"], params)
+    entry = service.forecast_cache.get(key)
+    if entry is None or not entry.fresh:
+        response = requests.get(service.weather_url, params=params, timeout=10)
+        response.raise_for_status()
+        entry = service.forecast_cache.set(key, response.json())
+    return service._build_weather_data(location, entry.value)
+
+
+def _report(label: str, latencies, elapsed: float):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<8} {len(latencies) / elapsed:8.1f} req/s   p50 {p50 * 1000:7.1f} ms   p99 {p99 * 1000:7.1f} ms")
+
+
+async def _run(label: str, call, n: int):
+    latencies = []
+    start = time.perf_counter()
+
+    # Latency is measured from the moment all requests arrive, so time spent
+    # queued behind a blocked event loop is included
+    async def one(i):
+        await call(f"City {i % 50}")
+        latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(n)))
+    _report(label, latencies, time.perf_counter() - start)
+
+
+async def main(n: int, delay: float):
+    upstream = FakeUpstream(delay=delay).start()
+    sync_service = upstream.point(OpenMeteoService())
+    async_service = upstream.point(AsyncOpenMeteoService())
+
+    async def blocking_route(city):
+        return _blocking_get_weather(sync_service, city)
+
+    print(f"{n} concurrent get_weather calls, upstream delay {delay * 1000:.0f} ms per call")
+    await _run("before", blocking_route, n)
+    await _run("after", async_service.get_weather, n)
+
+    await async_service.aclose()
+    upstream.stop()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    upstream_delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    asyncio.run(main(count, upstream_delay))
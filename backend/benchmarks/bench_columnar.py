@@ -0,0 +1,81 @@
+"""
+Row vs columnar forecast payloads: mapping time, allocations and JSON size
+
+For the hourly (48 entries) and daily (7 entries) views of one forecast
+response, measures:
+  - mapping time (Open-Meteo response -> API payload)
+  - memory allocated while mapping (tracemalloc peak and live blocks)
+  - json.dumps time and encoded size of the API payload
+
+Also checks that the row view is exactly the columnar data zipped back into
+objects.
+
+Usage:
+    python -m backend.benchmarks.bench_columnar [iterations]
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from backend.benchmarks.fake_upstream import _forecast_document
+from backend.services.weather_service import OpenMeteoService
+
+
+def _per_call_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def _allocations(fn):
+    """(peak bytes, live blocks) allocated by one call"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    result = fn()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    del result
+    return peak, blocks
+
+
+def _compare(label: str, build_rows, build_columns, iterations: int):
+    rows, columns = build_rows(), build_columns()
+    assert rows == [dict(zip(columns, values)) for values in zip(*columns.values())], "row view must match columns"
+
+    print(f"{label}")
+    for name, build, payload in (("rows", build_rows, rows), ("columns", build_columns, columns)):
+        mapping = _per_call_us(build, iterations)
+        peak, blocks = _allocations(build)
+        encoded = json.dumps(payload)
+        dumps = _per_call_us(lambda: json.dumps(payload), iterations)
+        print(
+            f"  {name:<8} map {mapping:7.1f} µs   alloc peak {peak / 1024:6.1f} KiB, {blocks:5d} blocks"
+            f"   json {dumps:7.1f} µs, {len(encoded):6d} bytes"
+        )
+
+
+def main(iterations: int):
+    service = OpenMeteoService()
+    data = _forecast_document(51.5, -0.1)
+
+    _compare(
+        "hourly (48 entries)",
+        lambda: service._build_hourly_forecast(data),
+        lambda: service._build_hourly_columns(data),
+        iterations
+    )
+    _compare(
+        "daily (7 entries)",
+        lambda: service._build_daily_forecast(data),
+        lambda: service._build_daily_columns(data),
+        iterations
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,91 @@
+"""
+Build, load and lookup times of the offline gazetteer index
+
+Generates a synthetic GeoNames-style TSV (or uses a real one such as
+cities500.txt), compiles it, then measures:
+  - open time (mmap + header only, independent of gazetteer size)
+  - exact, qualified ("Name, State"), fuzzy (one typo) and prefix (typeahead) lookups
+  - a miss (what a query falls through to the remote geocoders with)
+  - reverse geocoding of random coordinates (nearest place within 25 km)
+
+Usage:
+    python -m backend.benchmarks.bench_gazetteer [places] [geonames.tsv]
+"""
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+from backend.services.gazetteer import Gazetteer, build_index
+
+
+def _synthetic_tsv(path: str, places: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    names = []
+    with open(path, "w", encoding="utf-8") as out:
+        for i in range(places):
+            name = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 12))).title()
+            if i % 10 == 0:
+                name = "São " + name  # accents must normalize
+            names.append(name)
+            population = int(rng.paretovariate(1.2) * 500)
+            columns = [
+                str(i), name, name.replace("ã", "a"), "", f"{rng.uniform(-60, 70):.5f}", f"{rng.uniform(-180, 180):.5f}",
+                "P", "PPL", rng.choice(["US", "IN", "FR", "BR", "DE"]), "", f"{rng.randint(1, 20):02d}", "", "", "",
+                str(population), "", "", "UTC", "2024-01-01"
+            ]
+            out.write("\t".join(columns) + "\n")
+    return names
+
+
+def _time(label: str, fn, queries):
+    start = time.perf_counter()
+    hits = sum(1 for query in queries if fn(query))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {elapsed / len(queries) * 1e6:8.1f} µs/lookup   ({hits}/{len(queries)} matched)")
+    return hits
+
+
+def main(places: int, tsv_path: str = ""):
+    workdir = tempfile.mkdtemp(prefix="gazetteer-")
+    if tsv_path:
+        names = None
+    else:
+        tsv_path = os.path.join(workdir, "places.tsv")
+        names = _synthetic_tsv(tsv_path, places)
+    index_path = os.path.join(workdir, "places.idx")
+
+    start = time.perf_counter()
+    count = build_index(tsv_path, index_path)
+    print(f"build      {time.perf_counter() - start:8.2f} s   {count} places, {os.path.getsize(index_path) / 1e6:.1f} MB")
+
+    start = time.perf_counter()
+    gazetteer = Gazetteer(index_path)
+    print(f"open       {(time.perf_counter() - start) * 1e6:8.1f} µs")
+
+    if names is None:
+        names = [gazetteer.place(i)["name"] for i in random.Random(1).sample(range(gazetteer.places), 1000)]
+    sample = random.Random(2).sample(names, min(1000, len(names)))
+    typos = [name[:-2] + name[-1] + name[-2] for name in sample if len(name) >= 6]
+
+    exact_hits = _time("exact", lambda q: gazetteer.search(q, limit=1), sample)
+    _time("qualified", lambda q: gazetteer.search(q + ", " + gazetteer.search(q, 1)[0]["country_code"], limit=1), sample)
+    _time("fuzzy", lambda q: gazetteer.search(q, limit=1, fuzzy=True), typos)
+    _time("prefix-1", lambda q: gazetteer.prefix(q[:1], limit=10), sample)
+    _time("prefix-3", lambda q: gazetteer.prefix(q[:3], limit=10), sample)
+    _time("miss", lambda q: gazetteer.search(q, limit=1) or gazetteer.search(q, limit=1, fuzzy=True), ["Zzqxv " + name for name in sample])
+    rng = random.Random(3)
+    points = [(rng.uniform(-60, 70), rng.uniform(-180, 180)) for _ in range(1000)]
+    _time("reverse", lambda point: gazetteer.reverse(*point, max_km=25), points)
+
+    assert exact_hits == len(sample), "every indexed name must be found"
+    gazetteer.close()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200_000,
+        sys.argv[2] if len(sys.argv) > 2 else ""
+    )
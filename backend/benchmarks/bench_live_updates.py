@@ -0,0 +1,104 @@
+"""
+Live weather fan-out: many idle SSE subscribers on one worker
+
+Opens N subscriptions (default 10,000) spread over a few cities, each
+consumed by its own task running LiveWeatherHub.stream (the body of
+/api/weather/stream), with a stub forecast service in place of Open-Meteo.
+A few subscribers never read, to exercise slow-consumer disconnects.
+Measures:
+  - subscribe time and memory per idle subscriber (tracemalloc)
+  - fan-out latency: refresh published -> every reading subscriber has the event
+  - upstream fetches (one per city per refresh, independent of N)
+
+Usage:
+    python -m backend.benchmarks.bench_live_updates [subscribers] [cities]
+"""
+import asyncio
+import sys
+import time
+import tracemalloc
+
+from backend.benchmarks.fake_upstream import _forecast_document
+from backend.config import Config
+from backend.services.live_updates import LiveWeatherHub
+from backend.services.weather_service import ForecastBundle, OpenMeteoService
+
+REFRESH = 0.5
+ROUNDS = 3
+STALLED = 10
+
+
+class StubService(OpenMeteoService):
+    """Forecast bundles with a new digest on every fetch, expiring after REFRESH seconds"""
+
+    def __init__(self):
+        super().__init__()
+        self.fetches = 0
+        self.document = _forecast_document(51.5, -0.1)
+
+    async def get_forecast_bundle(self, city: str) -> ForecastBundle:
+        self.fetches += 1
+        now = time.time()
+        location = {"name": city, "country": "Nowhere", "lat": 51.5, "lon": -0.1}
+        return ForecastBundle(location, self.document, now, now + REFRESH, digest=str(self.fetches))
+
+
+async def _consume(hub: LiveWeatherHub, subscription, received: list, index: int):
+    async for frame in hub.stream(subscription):
+        if frame.startswith(b"event: weather"):
+            received[index] += 1
+
+
+async def main(subscribers: int, cities: int):
+    Config.LIVE_MAX_SUBSCRIBERS = subscribers + STALLED
+    Config.LIVE_MIN_INTERVAL = REFRESH
+    Config.LIVE_REFRESH_JITTER = 0
+    Config.LIVE_STALL_TIMEOUT = REFRESH * 1.5
+    service = StubService()
+    hub = LiveWeatherHub(service)
+    published = []
+    publish = hub._publish
+    hub._publish = lambda *args: (published.append(time.perf_counter()), publish(*args))
+
+    names = [f"City {i}" for i in range(cities)]
+    received = [0] * subscribers
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    tasks = [
+        asyncio.create_task(_consume(hub, hub.subscribe([names[i % cities]]), received, i))
+        for i in range(subscribers)
+    ]
+    stalled = [hub.subscribe([names[i % cities]]) for i in range(STALLED)]  # never read
+    subscribe_s = time.perf_counter() - start
+    await asyncio.sleep(0.05)
+    per_subscriber = (tracemalloc.get_traced_memory()[0] - before) / (subscribers + STALLED)
+    tracemalloc.stop()
+    print(f"subscribe    {subscribers} subscribers, {cities} cities in {subscribe_s * 1e3:.0f} ms"
+          f"   ~{per_subscriber / 1024:.1f} KiB per idle subscriber")
+
+    for round_ in range(1, ROUNDS + 1):
+        while min(received) < round_:
+            await asyncio.sleep(0.001)
+        fanned_out = time.perf_counter()
+        first = published[(round_ - 1) * cities]
+        print(f"round {round_}      all {subscribers} subscribers updated {(fanned_out - first) * 1e3:7.1f} ms after publish")
+
+    stats = hub.stats()
+    print(f"upstream     {service.fetches} fetches for {ROUNDS} rounds x {cities} cities")
+    print(f"slow         {stats['slow_disconnects']}/{STALLED} never-reading subscribers disconnected, "
+          f"{sum(1 for s in stalled if s.closed)} closed")
+
+    await hub.aclose()
+    await asyncio.wait_for(asyncio.gather(*tasks), 5)
+    for subscription in stalled:
+        hub.unsubscribe(subscription)  # what their stream() would do once the connection drops
+    print(f"shutdown     {hub.stats()['subscribers']} subscribers, {len(hub.topics)} refresh loops left")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    ))
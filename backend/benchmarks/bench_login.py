@@ -0,0 +1,119 @@
+"""
+Login throughput and event-loop responsiveness under a login storm
+
+Fires `logins` concurrent POST /api/auth/login requests (spread over `users`
+accounts) at the auth router on one event loop while a probe measures how
+long the event loop stalls:
+  - before: bcrypt verify called inline on the event loop
+  - after:  bcrypt verify on the bounded hashing pool
+
+Rejections (429 per-account, 503 pool saturated) are counted separately.
+Uses a throwaway SQLite database unless DATABASE_URL is set.
+
+Usage:
+    python -m backend.benchmarks.bench_login [logins] [users]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_login.db")
+
+import httpx
+from fastapi import FastAPI
+
+from backend import auth, auth_routes
+from backend.auth_models import User
+from backend.database import Base, SessionLocal, engine
+
+PASSWORD = "benchmark-password"
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(auth_routes.router)
+
+    @app.get("/probe")
+    async def probe():
+        return {"ok": True}
+
+    return app
+
+
+def _create_users(count: int):
+    Base.metadata.create_all(bind=engine)
+    hashed = auth.hash_password(PASSWORD)
+    with SessionLocal() as db:
+        db.query(User).delete()
+        db.add_all(User(email=f"user{i}@example.com", hashed_password=hashed, is_active=True) for i in range(count))
+        db.commit()
+
+
+def _pct(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+async def _run(label: str, client: httpx.AsyncClient, logins: int, users: int):
+    statuses = {}
+    latencies = []
+    probes = []
+    done = asyncio.Event()
+
+    async def probe():
+        # Time a request plus a 10 ms sleep; anything beyond 10 ms is event-loop stall
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/probe")
+            await asyncio.sleep(0.01)
+            probes.append(time.perf_counter() - start - 0.01)
+
+    async def login(i):
+        start = time.perf_counter()
+        response = await client.post(
+            "/api/auth/login",
+            json={"email": f"user{i % users}@example.com", "password": PASSWORD}
+        )
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    prober = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(login(i) for i in range(logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await prober
+
+    ok = statuses.get(200, 0)
+    print(
+        f"{label:<8} {ok / elapsed:7.1f} logins/s   login p50 {_pct(latencies, 0.5) * 1000:7.1f} ms"
+        f"   loop stall p99 {_pct(probes, 0.99) * 1000:7.1f} ms   statuses {dict(sorted(statuses.items()))}"
+    )
+
+
+async def main(logins: int, users: int):
+    _create_users(users)
+    transport = httpx.ASGITransport(app=_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{logins} concurrent logins over {users} accounts, {auth.password_hash_pool.workers} hashing threads")
+
+        pooled = auth_routes.verify_password_async
+
+        async def inline_verify(plain_password, hashed_password, account):
+            return auth.verify_password(plain_password, hashed_password)
+
+        auth_routes.verify_password_async = inline_verify
+        await _run("before", client, logins, users)
+        auth_routes.verify_password_async = pooled
+        await _run("after", client, logins, users)
+
+    print(f"pool: {auth.password_hash_pool.stats()}")
+    auth.password_hash_pool.shutdown()
+
+
+if __name__ == "__main__":
+    n_logins = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    n_users = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    asyncio.run(main(n_logins, n_users))
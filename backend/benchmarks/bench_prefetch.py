@@ -0,0 +1,91 @@
+"""
+Hot-location prefetch: how often popular places are served fresh
+
+Replays Zipf-distributed traffic over `cells` forecast grid cells against a
+fake upstream, with a shortened model-refresh interval so several model
+runs pass, once without and once with the prefetch scheduler. For the
+hottest `top_k` cells and for all traffic, reports the share of lookups
+served fresh, served stale (expired entry, revalidated in the background)
+or missed (caller waits for the upstream), plus upstream forecast requests.
+
+Usage:
+    python -m backend.benchmarks.bench_prefetch [seconds] [cells] [requests_per_second]
+"""
+import asyncio
+import random
+import sys
+import time
+from collections import Counter
+
+from backend.benchmarks.fake_upstream import FakeUpstream
+from backend.config import Config
+from backend.services.weather_service import AsyncOpenMeteoService
+
+MODEL_INTERVAL = 2.0
+TOP_K = 20
+LEAD = 1.0
+BUDGET = 2400  # per minute: one refresh every 25 ms, all TOP_K cells within half the lead
+
+
+def _outcome(service, lat: float, lon: float) -> str:
+    """What a lookup of this cell would get right now"""
+    entry = service.forecast_entry(lat, lon)
+    if entry is None:
+        return "miss"
+    return "fresh" if entry.fresh else "stale"
+
+
+async def _replay(prefetch: bool, seconds: float, cells: int, rate: int) -> None:
+    Config.MODEL_UPDATE_INTERVAL = MODEL_INTERVAL
+    Config.FORECAST_STALE_TTL = MODEL_INTERVAL
+    Config.PREFETCH_TOP_K = TOP_K
+    Config.PREFETCH_BUDGET_PER_MINUTE = BUDGET
+    Config.PREFETCH_LEAD = LEAD
+    upstream = FakeUpstream(delay=0.05).start()
+    service = upstream.point(AsyncOpenMeteoService())
+    service.gazetteer = None  # name coordinates locally, no reverse lookup cost
+
+    rng = random.Random(11)
+    points = [(rng.uniform(-60, 60), rng.uniform(-170, 170)) for _ in range(cells)]
+    weights = [1 / (rank + 1) for rank in range(cells)]
+    hot = set(range(TOP_K))
+    if prefetch:
+        service.prefetch.start()
+
+    outcomes = {"hot": Counter(), "all": Counter()}
+    pending = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        for index in rng.choices(range(cells), weights, k=max(1, rate // 20)):
+            lat, lon = points[index]
+            outcome = _outcome(service, lat, lon)
+            outcomes["all"][outcome] += 1
+            if index in hot:
+                outcomes["hot"][outcome] += 1
+            pending.append(asyncio.create_task(service.get_forecast_bundle_at(lat, lon)))
+        await asyncio.sleep(0.05)
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    forecasts = sum(n for key, n in upstream.keys.items() if key[0] == "/v1/forecast")
+    print(f"prefetch {'on ' if prefetch else 'off'}  upstream forecasts {forecasts:5d}   {service.prefetch.stats()}")
+    for label, counts in outcomes.items():
+        total = sum(counts.values()) or 1
+        print(
+            f"  {label:<4} fresh {counts['fresh'] / total:6.1%}   stale {counts['stale'] / total:6.1%}"
+            f"   miss {counts['miss'] / total:6.1%}   ({total} lookups)"
+        )
+    await service.aclose()
+    upstream.stop()
+
+
+def main(seconds: float, cells: int, rate: int):
+    for prefetch in (False, True):
+        asyncio.run(_replay(prefetch, seconds, cells, rate))
+
+
+if __name__ == "__main__":
+    main(
+        float(sys.argv[1]) if len(sys.argv) > 1 else 10,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 500,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 400
+    )
@@ -0,0 +1,129 @@
+"""
+Per-response CPU time of API serialization: FastAPI default vs FAST_JSON
+
+For the payload of each JSON endpoint, measures the work after the route
+has its data:
+  - default: validated response model -> FastAPI serialize_response
+    (re-validation against response_model + dump) -> JSONResponse (json.dumps)
+  - fast:    model_construct / plain dict -> FastJSONResponse (orjson, or
+    compact json.dumps without it)
+
+Also checks that both paths produce the same JSON.
+
+Usage:
+    python -m backend.benchmarks.bench_serialization [iterations]
+"""
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+
+from fastapi.routing import APIRoute, serialize_response
+from starlette.responses import JSONResponse
+
+from backend import fast_json
+from backend.benchmarks.fake_upstream import _forecast_document
+from backend.models import (
+    BatchWeatherResponse, CoordinateWeatherResponse, DashboardResponse, HistoryResponse, WeatherResponse
+)
+from backend.services.weather_service import ForecastBundle, OpenMeteoService
+
+
+def _history_rows(count: int) -> list:
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "Timestamp": (start + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+            "City": "São Paulo",
+            "Country": "BR",
+            "Temperature (°C)": 21.5 + i % 7,
+            "Feels Like (°C)": 20.9,
+            "Humidity (%)": 60 + i % 30,
+            "Pressure (hPa)": 1012.5,
+            "Description": "Partly cloudy",
+            "Wind Speed (m/s)": 3.4
+        }
+        for i in range(count)
+    ]
+
+
+def _endpoints(service: OpenMeteoService) -> list:
+    """
+    (label, response_model, fields, constructed) for each endpoint
+
+    `fields` are what the route passes to its response model; `constructed`
+    is False where the fast path returns them as a plain dict.
+    """
+    location = {"name": "London", "country": "United Kingdom", "latitude": 51.5, "longitude": -0.1}
+    bundle = ForecastBundle(location=location, data=_forecast_document(51.5, -0.1), fetched_at=0, expires_at=0)
+    weather = service.weather_view(bundle)
+    dashboard = service.dashboard_view(bundle)
+    batch = [{"success": True, "data": weather, "error": None} for _ in range(100)]
+    return [
+        ("weather", WeatherResponse, {"success": True, "data": weather}, True),
+        ("weather/at", CoordinateWeatherResponse, {"success": True, "data": weather, "location": location}, True),
+        ("dashboard", DashboardResponse, {"success": True, "city": "London", "data": dashboard["current"],
+                                          "hourly": dashboard["hourly"], "daily": dashboard["daily"]}, True),
+        ("hourly rows", None, {"success": True, "city": "London", "format": "rows",
+                               "data": service.hourly_view(bundle)}, False),
+        ("hourly columns", None, {"success": True, "city": "London", "format": "columns",
+                                  "data": service.hourly_view(bundle, columnar=True)}, False),
+        ("daily rows", None, {"success": True, "city": "London", "format": "rows",
+                              "data": service.daily_view(bundle)}, False),
+        ("history 50", HistoryResponse, {"success": True, "data": _history_rows(50), "next_cursor": "abc"}, True),
+        ("history 1000", HistoryResponse, {"success": True, "data": _history_rows(1000), "next_cursor": "abc"}, True),
+        ("batch 100", BatchWeatherResponse, {"success": True, "data": batch}, False),
+    ]
+
+
+def _default_path(model, fields):
+    """What the routes did before: validated model, then FastAPI's response_model handling"""
+    field = APIRoute("/", endpoint=lambda: None, response_model=model).response_field if model else None
+
+    def render() -> bytes:
+        content = model(**fields) if model else fields
+        encoded = _run(serialize_response(field=field, response_content=content, is_coroutine=True))
+        return JSONResponse(encoded).body
+
+    return render
+
+
+def _fast_path(model, fields, constructed: bool):
+    """What the routes do with FAST_JSON: no validation, one encoder pass"""
+    def render() -> bytes:
+        content = model.model_construct(**fields) if constructed else fields
+        return fast_json.FastJSONResponse(content).body
+
+    return render
+
+
+def _run(coroutine):
+    """Drive a coroutine that never suspends without event loop overhead"""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("coroutine suspended")
+
+
+def _cpu_us(fn, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main(iterations: int):
+    print(f"encoder: {fast_json.stats()['encoder']}")
+    print(f"{'endpoint':<16} {'bytes':>8} {'default µs':>11} {'fast µs':>9} {'speedup':>8}")
+    for label, model, fields, constructed in _endpoints(OpenMeteoService()):
+        default, fast = _default_path(model, fields), _fast_path(model, fields, constructed)
+        body = default()
+        assert json.loads(body) == json.loads(fast()), f"{label}: fast path must produce the same JSON"
+        runs = max(10, iterations // max(1, len(body) // 2000))
+        default_us, fast_us = _cpu_us(default, runs), _cpu_us(fast, runs)
+        print(f"{label:<16} {len(body):8d} {default_us:11.1f} {fast_us:9.1f} {default_us / fast_us:7.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
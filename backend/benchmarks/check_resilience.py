@@ -0,0 +1,160 @@
+"""
+Resilience checks for the Photon -> Nominatim geocoding chain
+
+Runs the async service against local fake upstreams that inject latency and
+errors, and asserts that:
+  1. a failing Photon opens its circuit after CIRCUIT_FAILURE_THRESHOLD calls
+     and is then skipped (Nominatim answers immediately)
+  2. a hanging Photon costs at most GEOCODE_TIMEOUT per call until its circuit
+     opens, then nothing
+  3. after CIRCUIT_RESET_TIMEOUT one trial call goes through and a healthy
+     Photon closes the circuit again
+  4. hedged mode answers from Nominatim once Photon exceeds its p95 latency,
+     and does not hedge while Photon is fast
+  5. when both providers fail, geocoding raises
+
+Usage:
+    python -m backend.benchmarks.check_resilience
+"""
+import asyncio
+import time
+
+from backend.benchmarks.fake_upstream import FakeUpstream
+from backend.config import Config
+from backend.services.weather_service import AsyncOpenMeteoService
+
+THRESHOLD = 3
+
+
+def _service(upstream: FakeUpstream) -> AsyncOpenMeteoService:
+    service = upstream.point(AsyncOpenMeteoService())
+    for breaker in service.breakers.values():
+        breaker.failure_threshold = THRESHOLD
+    return service
+
+
+async def _timed_geocode(service, name: str):
+    start = time.perf_counter()
+    locations = await service.geocode_location(name, limit=1)
+    return locations, time.perf_counter() - start
+
+
+async def check_failing_photon(upstream: FakeUpstream):
+    upstream.reset()
+    upstream.fail_paths = {"/api/"}
+    service = _service(upstream)
+
+    for i in range(10):
+        locations, _ = await _timed_geocode(service, f"Failing {i}")
+        assert locations, "Nominatim fallback should answer"
+
+    assert upstream.hits["/api/"] == THRESHOLD, upstream.hits
+    assert upstream.hits["/search"] == 10, upstream.hits
+    assert service.breakers["photon"].state == "open"
+    print(f"1. failing Photon: {upstream.hits['/api/']} Photon calls for 10 lookups, breaker {service.breakers['photon'].stats()}")
+    await service.aclose()
+
+
+async def check_hanging_photon(upstream: FakeUpstream):
+    upstream.reset()
+    upstream.fail_paths = set()
+    upstream.delays = {"/api/": 2.0}
+    service = _service(upstream)
+    service.timeouts["photon"] = 0.3
+
+    latencies = []
+    for i in range(6):
+        _, elapsed = await _timed_geocode(service, f"Hanging {i}")
+        latencies.append(elapsed)
+
+    assert all(latency < 0.3 + 0.25 for latency in latencies[:THRESHOLD]), latencies
+    assert all(latency < 0.15 for latency in latencies[THRESHOLD:]), latencies
+    print("2. hanging Photon: " + ", ".join(f"{latency * 1000:.0f}ms" for latency in latencies))
+    await service.aclose()
+    return service
+
+
+async def check_recovery(upstream: FakeUpstream):
+    upstream.reset()
+    upstream.fail_paths = {"/api/"}
+    upstream.delays = {}
+    service = _service(upstream)
+    service.breakers["photon"].reset_timeout = 0.2
+
+    for i in range(THRESHOLD):
+        await service.geocode_location(f"Recover {i}", limit=1)
+    assert service.breakers["photon"].state == "open"
+
+    upstream.fail_paths = set()
+    await asyncio.sleep(0.25)
+    assert service.breakers["photon"].state == "half_open"
+    await service.geocode_location("Recovered", limit=1)
+    assert service.breakers["photon"].state == "closed"
+    assert upstream.hits["/api/"] == THRESHOLD + 1, upstream.hits
+    print(f"3. recovery: half-open trial closed the circuit, breaker {service.breakers['photon'].stats()}")
+    await service.aclose()
+
+
+async def check_hedging(upstream: FakeUpstream):
+    upstream.reset()
+    upstream.fail_paths = set()
+    upstream.delays = {"/api/": 0.02, "/search": 0.02}
+    Config.GEOCODE_HEDGE = True
+    service = _service(upstream)
+
+    # Warm up Photon's latency window while it is fast: no hedging expected
+    for i in range(25):
+        await service.geocode_location(f"Fast {i}", limit=1)
+    assert service.hedges_sent == 0, service.hedges_sent
+    assert upstream.hits["/search"] == 0, upstream.hits
+
+    upstream.delays["/api/"] = 1.5
+    latencies = []
+    for i in range(5):
+        _, elapsed = await _timed_geocode(service, f"Slow {i}")
+        latencies.append(elapsed)
+
+    assert service.hedges_won == 5, (service.hedges_sent, service.hedges_won)
+    assert max(latencies) < 0.3, latencies
+    print(
+        f"4. hedging: p95 delay {service.latency['photon'].stats()}, slow-Photon lookups "
+        + ", ".join(f"{latency * 1000:.0f}ms" for latency in latencies)
+        + f" (hedges sent {service.hedges_sent}, won {service.hedges_won})"
+    )
+    await service.aclose()
+
+
+async def check_both_failing(upstream: FakeUpstream):
+    upstream.reset()
+    upstream.fail_paths = {"/api/", "/search"}
+    upstream.delays = {}
+    for hedge in (False, True):
+        Config.GEOCODE_HEDGE = hedge
+        service = _service(upstream)
+        try:
+            await service.geocode_location("Nowhere", limit=1)
+        except Exception as e:
+            print(f"5. both failing (hedge={hedge}): raised {e}")
+        else:
+            raise AssertionError("geocoding should fail when both providers fail")
+        await service.aclose()
+
+
+async def main():
+    upstream = FakeUpstream(delay=0.01).start()
+    hedge = Config.GEOCODE_HEDGE
+    Config.GEOCODE_HEDGE = False
+    try:
+        await check_failing_photon(upstream)
+        await check_hanging_photon(upstream)
+        await check_recovery(upstream)
+        await check_hedging(upstream)
+        await check_both_failing(upstream)
+    finally:
+        Config.GEOCODE_HEDGE = hedge
+        upstream.stop()
+    print("OK: circuit breakers and hedging behave as expected")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,166 @@
+"""
+Local fake Photon / Nominatim / Open-Meteo server for benchmarks
+
+Runs a tiny asyncio HTTP/1.1 server (keep-alive capable) on a background
+thread so both sync and async clients can be pointed at it.
+"""
+import asyncio
+import json
+import threading
+import zlib
+from collections import Counter
+from functools import lru_cache
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from urllib.parse import urlsplit, parse_qs
+
+
+def _coordinates(name: str):
+    """Deterministic, distinct coordinates per place name"""
+    h = zlib.crc32(name.strip().lower().encode())
+    return round(-60 + (h % 12000) / 100, 4), round(-180 + (h // 12000 % 36000) / 100, 4)
+
+
+@lru_cache(maxsize=1024)
+def _forecast_document(lat: float, lon: float) -> Dict:
+    """A forecast response with current, 7 days hourly and 7 days daily data"""
+    start = datetime(2024, 1, 1)
+    hours = [(start + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M") for i in range(168)]
+    days = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "current": {
+            "temperature_2m": 21.3,
+            "relative_humidity_2m": 60,
+            "apparent_temperature": 20.8,
+            "precipitation": 0.0,
+            "weather_code": 2,
+            "wind_speed_10m": 3.4,
+            "pressure_msl": 1012.5
+        },
+        "hourly": {
+            "time": hours,
+            "temperature_2m": [20.0 + (i % 10) * 0.5 for i in range(168)],
+            "relative_humidity_2m": [55 + i % 20 for i in range(168)],
+            "apparent_temperature": [19.5 + (i % 10) * 0.5 for i in range(168)],
+            "precipitation_probability": [i % 100 for i in range(168)],
+            "weather_code": [(0, 1, 2, 3, 61, 95)[i % 6] for i in range(168)],
+            "wind_speed_10m": [2.0 + (i % 7) * 0.3 for i in range(168)]
+        },
+        "daily": {
+            "time": days,
+            "temperature_2m_max": [25.0 + i for i in range(7)],
+            "temperature_2m_min": [15.0 + i for i in range(7)],
+            "precipitation_probability_max": [10 * i for i in range(7)],
+            "weather_code": [(0, 2, 3, 61, 63, 71, 95)[i] for i in range(7)],
+            "wind_speed_10m_max": [5.0 + i for i in range(7)]
+        }
+    }
+
+
+class FakeUpstream:
+    """
+    Fake upstream server.
+
+    Args:
+        delay: Seconds to sleep before answering every request
+        delays: Optional per-path overrides, e.g. {"/api/": 2.0}
+        fail_paths: Paths that answer with HTTP 503
+    """
+
+    def __init__(self, delay: float = 0.05, delays: Optional[Dict[str, float]] = None, fail_paths=()):
+        self.delay = delay
+        self.delays = dict(delays or {})
+        self.fail_paths = set(fail_paths)
+        self.hits = Counter()
+        self.keys = Counter()
+        self.port = None
+        self._loop = None
+        self._server = None
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def point(self, service):
+        """Redirect an OpenMeteoService instance at this server"""
+        service.weather_url = f"{self.base_url}/v1/forecast"
+        service.geocoding_url = f"{self.base_url}/api/"
+        service.nominatim_url = f"{self.base_url}/search"
+        return service
+
+    def start(self):
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def stop(self):
+        """Stop accepting connections (the daemon thread exits with the process)"""
+        self._loop.call_soon_threadsafe(self._server.close)
+
+    def reset(self):
+        self.hits.clear()
+        self.keys.clear()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, "127.0.0.1", 0, backlog=4096)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                target = request_line.split()[1].decode()
+                status, body = await self._respond(target)
+                payload = json.dumps(body).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\nConnection: keep-alive\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, target: str):
+        parts = urlsplit(target)
+        path = parts.path
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        self.hits[path] += 1
+        self.keys[(path, query.get("q") or f"{query.get('latitude')},{query.get('longitude')}")] += 1
+
+        await asyncio.sleep(self.delays.get(path, self.delay))
+
+        if path in self.fail_paths:
+            return "503 Service Unavailable", {"error": "injected failure"}
+        if path == "/api/":
+            name = query.get("q", "Somewhere")
+            lat, lon = _coordinates(name)
+            return "200 OK", {"features": [{
+                "properties": {"name": name, "country": "Testland", "state": "", "type": "city"},
+                "geometry": {"coordinates": [lon, lat]}
+            }]}
+        if path == "/search":
+            name = query.get("q", "Somewhere")
+            lat, lon = _coordinates(name)
+            return "200 OK", [{"display_name": f"{name}, Testland", "lat": str(lat), "lon": str(lon), "type": "city"}]
+        if path == "/v1/forecast":
+            lats = [float(v) for v in query.get("latitude", "0").split(",")]
+            lons = [float(v) for v in query.get("longitude", "0").split(",")]
+            documents = [_forecast_document(lat, lon) for lat, lon in zip(lats, lons)]
+            return "200 OK", documents if len(documents) > 1 else documents[0]
+        return "404 Not Found", {"error": "not found"}
@@ -0,0 +1,48 @@
+"""
+Load test: concurrent cold-cache requests are coalesced into one upstream call per key
+
+Fires `callers` concurrent get_weather() calls spread over `cities` distinct
+names against a fresh service and a fake upstream, then checks that the
+upstream saw exactly one geocode and one forecast request per city.
+
+Usage:
+    python -m backend.benchmarks.load_singleflight [callers] [cities]
+"""
+import asyncio
+import sys
+import time
+
+from backend.benchmarks.fake_upstream import FakeUpstream
+from backend.services.weather_service import AsyncOpenMeteoService
+
+
+async def main(callers: int, cities: int):
+    upstream = FakeUpstream(delay=0.2).start()
+    service = upstream.point(AsyncOpenMeteoService())
+    names = [f"City {i}" for i in range(cities)]
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(service.get_weather(names[i % cities]) for i in range(callers)))
+    elapsed = time.perf_counter() - start
+
+    geocode_calls = {key: n for key, n in upstream.keys.items() if key[0] == "/api/"}
+    forecast_calls = {key: n for key, n in upstream.keys.items() if key[0] == "/v1/forecast"}
+
+    print(f"{callers} concurrent callers over {cities} cities in {elapsed * 1000:.0f} ms")
+    print(f"geocode requests:  {sum(geocode_calls.values())} (max per key {max(geocode_calls.values())})")
+    print(f"forecast requests: {sum(forecast_calls.values())} (max per key {max(forecast_calls.values())})")
+    print(f"coalescing: {service.flights.stats()}")
+
+    assert len(results) == callers
+    assert len(geocode_calls) == cities and max(geocode_calls.values()) == 1
+    assert max(forecast_calls.values()) == 1
+    print("OK: one upstream call per key per miss")
+
+    await service.aclose()
+    upstream.stop()
+
+
+if __name__ == "__main__":
+    n_callers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_cities = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    asyncio.run(main(n_callers, n_cities))
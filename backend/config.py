@@ -19,6 +19,97 @@ class Config:
     GOOGLE_SHEET_ID = os.getenv("GOOGLE_SHEET_ID")
     GOOGLE_CREDENTIALS_JSON = json.loads(os.getenv("GOOGLE_CREDENTIALS_JSON", "{}"))
     
+    # Database connection pool (auth database, DATABASE_URL)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    
+    # Async database engine (asyncpg, or aiosqlite for SQLite); DATABASE_ASYNC_URL defaults to DATABASE_URL with the async driver
+    DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+    DATABASE_ASYNC_URL = os.getenv("DATABASE_ASYNC_URL", "")
+    
+    # Weather history storage (sql = database with Sheets mirror, sheets = Sheets only)
+    HISTORY_BACKEND = os.getenv("HISTORY_BACKEND", "sql").lower()
+    HISTORY_DATABASE_URL = os.getenv("HISTORY_DATABASE_URL", "")  # e.g. sqlite:///./weather_history.db
+    HISTORY_SHEETS_MIRROR = os.getenv("HISTORY_SHEETS_MIRROR", "true").lower() == "true"
+    
+    # Google Sheets write-behind buffer
+    SHEETS_BUFFER_MAX_ROWS = int(os.getenv("SHEETS_BUFFER_MAX_ROWS", 5000))
+    SHEETS_BATCH_SIZE = int(os.getenv("SHEETS_BATCH_SIZE", 100))
+    SHEETS_FLUSH_INTERVAL = float(os.getenv("SHEETS_FLUSH_INTERVAL", 5))
+    SHEETS_PUT_TIMEOUT = float(os.getenv("SHEETS_PUT_TIMEOUT", 2))
+    SHEETS_SPILL_PATH = os.getenv("SHEETS_SPILL_PATH", "sheets_spill.jsonl")  # one file per process: sheets_spill.<pid>.jsonl
+    
+    # Google Sheets history index (recent rows kept in memory)
+    HISTORY_CACHE_ROWS = int(os.getenv("HISTORY_CACHE_ROWS", 500))
+    HISTORY_REFRESH_INTERVAL = float(os.getenv("HISTORY_REFRESH_INTERVAL", 10))
+    
+    # Upstream HTTP client (Open-Meteo, Photon, Nominatim)
+    UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", 10))
+    UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", 100))
+    UPSTREAM_MAX_KEEPALIVE = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", 20))
+    UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", 30))
+    UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "false").lower() == "true"
+    
+    # Upstream resilience (per-provider circuit breakers, geocoding timeout and hedging)
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+    CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", 30))
+    GEOCODE_TIMEOUT = float(os.getenv("GEOCODE_TIMEOUT", 4))
+    GEOCODE_HEDGE = os.getenv("GEOCODE_HEDGE", "false").lower() == "true"
+    GEOCODE_HEDGE_DEFAULT_DELAY = float(os.getenv("GEOCODE_HEDGE_DEFAULT_DELAY", 0.5))  # until enough Photon samples
+    GEOCODE_HEDGE_MIN_DELAY = float(os.getenv("GEOCODE_HEDGE_MIN_DELAY", 0.05))
+    GEOCODE_HEDGE_MAX_DELAY = float(os.getenv("GEOCODE_HEDGE_MAX_DELAY", 2))
+    
+    # Geocoding cache (coordinates of a place name rarely change)
+    GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", 10000))
+    GEOCODE_CACHE_TTL = float(os.getenv("GEOCODE_CACHE_TTL", 7 * 24 * 3600))
+    GEOCODE_NEGATIVE_TTL = float(os.getenv("GEOCODE_NEGATIVE_TTL", 3600))
+    
+    # Offline geocoding (GeoNames TSV such as cities500.txt, or its compiled .idx; empty disables)
+    GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", "")
+    GAZETTEER_MIN_POPULATION = int(os.getenv("GAZETTEER_MIN_POPULATION", 0))
+    GAZETTEER_FUZZY = os.getenv("GAZETTEER_FUZZY", "true").lower() == "true"  # near-miss spellings, only after Photon/Nominatim find nothing
+    SUGGEST_LEARNED_SIZE = int(os.getenv("SUGGEST_LEARNED_SIZE", 10000))  # geocoded places kept for typeahead
+    REVERSE_GEOCODE_MAX_KM = float(os.getenv("REVERSE_GEOCODE_MAX_KM", 25))  # nearest gazetteer place used to name a coordinate
+    
+    # Forecast cache (entries expire at the next expected model refresh)
+    FORECAST_CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", 5000))
+    FORECAST_GRID_DEGREES = float(os.getenv("FORECAST_GRID_DEGREES", 0.1))
+    MODEL_UPDATE_INTERVAL = float(os.getenv("MODEL_UPDATE_INTERVAL", 3600))
+    MODEL_UPDATE_OFFSET = float(os.getenv("MODEL_UPDATE_OFFSET", 0))
+    FORECAST_STALE_TTL = float(os.getenv("FORECAST_STALE_TTL", 3600))
+    
+    # Forecast prefetch: keep the most requested cells fresh across model runs
+    PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+    PREFETCH_TOP_K = int(os.getenv("PREFETCH_TOP_K", 100))
+    PREFETCH_BUDGET_PER_MINUTE = int(os.getenv("PREFETCH_BUDGET_PER_MINUTE", 60))  # upstream requests
+    PREFETCH_HALF_LIFE = float(os.getenv("PREFETCH_HALF_LIFE", 6 * 3600))  # popularity decay, seconds
+    PREFETCH_TRACKED = int(os.getenv("PREFETCH_TRACKED", 10000))
+    PREFETCH_LEAD = float(os.getenv("PREFETCH_LEAD", 300))  # hot cells stay fresh this long past a model run while being refreshed
+    
+    # Batch weather endpoint
+    BATCH_MAX_LOCATIONS = int(os.getenv("BATCH_MAX_LOCATIONS", 500))
+    BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", 100))
+    
+    # Live weather stream (SSE): one refresh loop per subscribed city, fanned out to subscribers
+    LIVE_MAX_SUBSCRIBERS = int(os.getenv("LIVE_MAX_SUBSCRIBERS", 20000))  # per worker
+    LIVE_MAX_CITIES = int(os.getenv("LIVE_MAX_CITIES", 10))  # per connection
+    LIVE_HEARTBEAT = float(os.getenv("LIVE_HEARTBEAT", 15))
+    LIVE_STALL_TIMEOUT = float(os.getenv("LIVE_STALL_TIMEOUT", 60))  # undelivered this long = slow consumer, disconnected
+    LIVE_MIN_INTERVAL = float(os.getenv("LIVE_MIN_INTERVAL", 60))  # also the retry delay after a failed fetch
+    LIVE_REFRESH_JITTER = float(os.getenv("LIVE_REFRESH_JITTER", 30))
+    
+    # API responses: skip response-model re-validation and encode with orjson when installed
+    FAST_JSON = os.getenv("FAST_JSON", "true").lower() == "true"
+    
+    # Request tracing (TRACE_EXPORT = file path for OTLP/JSON lines, "stdout", or empty to disable export)
+    TRACE_EXPORT = os.getenv("TRACE_EXPORT", "")
+    TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0.1))
+    SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 1000))  # 0 disables the slow-request log
+    SLOW_REQUEST_LOG = os.getenv("SLOW_REQUEST_LOG", "")  # file path; empty logs to stdout
+    
     # Server
     BACKEND_HOST = os.getenv("BACKEND_HOST", "0.0.0.0")
     BACKEND_PORT = int(os.getenv("BACKEND_PORT", 8000))
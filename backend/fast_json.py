@@ -0,0 +1,82 @@
+"""
+Fast JSON responses for list-heavy API payloads
+
+By default FastAPI re-validates a route's return value against its
+response_model, walks it with jsonable_encoder and only then calls
+json.dumps. Our payloads are built from already-validated data
+(WeatherData from the service, rows from the history store), so with
+FAST_JSON enabled routes return a FastJSONResponse instead:
+  - response models are created with model_construct (no validation)
+  - the body is encoded in one pass by orjson if installed, otherwise by
+    json.dumps with the same compact output FastAPI produces
+FastAPI skips response_model handling for Response objects, so the
+response_model declarations still document the schema in /docs.
+"""
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Optional
+
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, Response
+
+from backend.config import Config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Types neither encoder handles natively (same results as jsonable_encoder)"""
+    if isinstance(obj, BaseModel):
+        # Our API models have no aliases or custom serializers: the field dict is the JSON object
+        return obj.__dict__
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode an API payload (models, dicts, lists, nested models) to compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson (or compact json.dumps), models dumped directly"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def api_response(content: Any, response: Optional[Response] = None) -> Any:
+    """
+    Return value for a JSON route
+
+    Args:
+        content: Response model (ideally built with model_construct) or plain payload
+        response: The route's Response parameter, whose headers (ETag, Cache-Control...) are kept
+
+    Returns:
+        A FastJSONResponse when FAST_JSON is enabled, otherwise `content`
+        unchanged for FastAPI's validating serializer
+    """
+    if not Config.FAST_JSON:
+        return content
+    headers = None
+    if response is not None:
+        headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    return FastJSONResponse(content, headers=headers)
+
+
+def stats() -> dict:
+    return {"enabled": Config.FAST_JSON, "encoder": "orjson" if orjson is not None else "json"}
@@ -0,0 +1,59 @@
+"""
+Weather history model for the database
+"""
+from datetime import timezone
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index, func
+from backend.database import Base
+
+class WeatherRecord(Base):
+    """
+    Saved weather observation
+    
+    Fields:
+    - id: Primary key
+    - recorded_at: When the observation was saved (naive UTC)
+    - city, country: Location names as shown to the user
+    - temperature, feels_like, humidity, pressure, wind_speed: Measurements
+    - description, icon: Condition text and icon code
+    - user_id: User who saved it (nullable for imported rows)
+    """
+    __tablename__ = "weather_records"
+    
+    # No single-column indexes: the primary key and ix_weather_records_recorded_at_id cover these
+    id = Column(Integer, primary_key=True)
+    recorded_at = Column(DateTime, nullable=False)
+    city = Column(String(255), nullable=False)
+    country = Column(String(255), default="")
+    temperature = Column(Float, nullable=False)
+    feels_like = Column(Float)
+    humidity = Column(Integer)
+    pressure = Column(Float)
+    description = Column(String(255), default="")
+    icon = Column(String(16), default="")
+    wind_speed = Column(Float)
+    user_id = Column(Integer, nullable=True, index=True)
+    
+    __table_args__ = (
+        # Keyset pagination order, plus case-insensitive location filters
+        Index("ix_weather_records_recorded_at_id", "recorded_at", "id"),
+        Index("ix_weather_records_city_lower", func.lower(city), "recorded_at"),
+        Index("ix_weather_records_country_lower", func.lower(country), "recorded_at"),
+    )
+    
+    def to_record(self) -> dict:
+        """Same keys as a Google Sheets history row (timestamp in server-local time, like the sheet)"""
+        local_time = self.recorded_at.replace(tzinfo=timezone.utc).astimezone()
+        return {
+            "Timestamp": local_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "City": self.city,
+            "Country": self.country,
+            "Temperature (°C)": self.temperature,
+            "Feels Like (°C)": self.feels_like,
+            "Humidity (%)": self.humidity,
+            "Pressure (hPa)": self.pressure,
+            "Description": self.description,
+            "Wind Speed (m/s)": self.wind_speed
+        }
+    
+    def __repr__(self):
+        return f"<WeatherRecord {self.city} @ {self.recorded_at}>"
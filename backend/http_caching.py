@@ -0,0 +1,86 @@
+"""
+Conditional GET for forecast-backed API responses
+
+Validators come from the forecast bundle, not the rendered body:
+  - ETag: hash of the payload digest, the resolved location and the response
+    variant (e.g. format=columns), so it only changes when the forecast does
+  - Last-Modified: when the payload was fetched from Open-Meteo
+  - Cache-Control max-age: seconds until the next expected model run
+
+Routes check the request before mapping, so a 304 skips both mapping and
+serialization.
+"""
+import hashlib
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+def forecast_etag(bundle, variant: str = "") -> str:
+    """Weak ETag for one representation of a forecast bundle"""
+    location = bundle.location
+    source = f"{bundle.digest}|{location.get('name', '')}|{location.get('country', '')}|{variant}"
+    return 'W/"%s"' % hashlib.blake2b(source.encode(), digest_size=8).hexdigest()
+
+
+def cache_headers(bundle, etag: str, private: bool = False) -> Dict[str, str]:
+    """ETag, Last-Modified and Cache-Control for a forecast-backed response"""
+    max_age = max(0, int(bundle.expires_at - time.time()))
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(bundle.fetched_at, usegmt=True),
+        "Cache-Control": f"{'private' if private else 'public'}, max-age={max_age}"
+    }
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison"""
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == opaque:
+            return True
+    return False
+
+
+def _not_modified_since(header: str, fetched_at: float) -> bool:
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return False
+    return int(fetched_at) <= since
+
+
+def conditional_get(request: Request, response: Response, bundle, variant: str = "", private: bool = False) -> Optional[Response]:
+    """
+    Attach validators to `response`, or return a 304 if the client's copy is current
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted
+    without it (RFC 9110).
+
+    Args:
+        request: Incoming request
+        response: The route's Response parameter (headers are merged into the reply)
+        bundle: ForecastBundle the response is built from
+        variant: Distinguishes representations of the same bundle
+        private: Responses behind authentication must not be stored by shared caches
+
+    Returns:
+        A 304 Response to return as-is, or None to build the full response
+    """
+    etag = forecast_etag(bundle, variant)
+    headers = cache_headers(bundle, etag, private)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = bool(if_modified_since) and _not_modified_since(if_modified_since, bundle.fetched_at)
+
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -6,6 +6,7 @@ import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 from backend.database import Base, engine
 from backend.auth_models import User
+from backend.history_models import WeatherRecord
 import os
 from dotenv import load_dotenv
 
@@ -67,4 +68,4 @@ if __name__ == "__main__":
     print("=" * 50)
     print("🎉 Database initialization complete!")
     print("\nDatabase: weatherpro_db")
-    print("Tables: users")
+    print("Tables: users, weather_records")
@@ -1,25 +1,45 @@
 """
 FastAPI application for Weather + Google Sheets integration
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime
-from pathlib import Path
+from typing import Optional
 from backend.models import (
     WeatherResponse, 
+    CoordinateWeatherResponse,
+    DashboardResponse,
+    BatchWeatherRequest,
+    BatchWeatherResponse,
     SaveWeatherRequest, 
     HistoryResponse,
+    StreamTicketResponse,
     HealthResponse
 )
-from backend.services.weather_service import weather_service
+from backend.services.weather_service import async_weather_service
 from backend.services.sheets_service import sheets_service
+from backend.services.history_store import history_store, HistoryFilters, needs_backfill
+from backend.services.write_buffer import WriteBufferFull
+from backend.services.live_updates import live_weather, LiveHubFull
 
 # Import authentication
 from backend.auth_routes import router as auth_router
-from backend.auth import get_current_user
-from backend.auth_models import User
+from backend.auth import (
+    get_current_user, get_stream_user, create_stream_ticket, AuthenticatedUser, user_cache,
+    STREAM_TICKET_EXPIRE_SECONDS
+)
+from backend.password_hashing import password_hash_pool
+from backend.database import pool_stats, dispose_engines
+from backend import metrics
+from backend.tracing import TracingMiddleware, span
+from backend.static_assets import static_assets
+from backend.http_caching import conditional_get
+from backend.fast_json import api_response
+from backend import fast_json
+from backend.config import Config
 from fastapi import Depends
 
 # Initialize FastAPI app
@@ -38,23 +58,108 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route request counts, latency and in-flight requests for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Root span per request (sampled OTLP/JSON export and slow-request log)
+app.add_middleware(TracingMiddleware)
+
 # Include authentication routes
 app.include_router(auth_router)
 
-# Get frontend directory path (one level up from backend)
-BASE_DIR = Path(__file__).resolve().parent.parent
-FRONTEND_DIR = BASE_DIR / "frontend"
+# Scrape-time metrics from existing stats
+metrics.register_caches({
+    "geocode": async_weather_service.geocode_cache.stats,
+    "forecast": async_weather_service.forecast_cache.stats,
+    "auth_user": user_cache.stats
+})
+metrics.register_stats(
+    "upstream_coalesced_in_flight", "Distinct upstream requests currently shared by waiting callers", (),
+    lambda: {(): async_weather_service.flights.stats()["in_flight"]}
+)
+metrics.register_stats(
+    "circuit_breaker_open", "1 if the upstream's circuit is open (calls skipped), else 0", ("upstream",),
+    lambda: {(name,): int(breaker.state == "open") for name, breaker in async_weather_service.breakers.items()}
+)
+metrics.register_stats(
+    "circuit_breaker_rejected_total", "Calls skipped because the upstream's circuit was open", ("upstream",),
+    lambda: {(name,): breaker.rejected for name, breaker in async_weather_service.breakers.items()},
+    kind="counter"
+)
+metrics.register_stats(
+    "geocode_hedges_total", "Hedged Nominatim requests sent / won against a slow Photon", ("outcome",),
+    lambda: {("sent",): async_weather_service.hedges_sent, ("won",): async_weather_service.hedges_won},
+    kind="counter"
+)
+metrics.register_stats(
+    "sheets_buffer_pending_rows", "Rows waiting in the Sheets write-behind buffer", (),
+    lambda: {(): sheets_service.write_buffer.stats()["pending_rows"]} if sheets_service.write_buffer else {}
+)
+metrics.register_stats(
+    "db_pool_checked_out", "Database connections currently checked out", ("engine",),
+    lambda: {(name,): stats["checked_out"] for name, stats in pool_stats().items()}
+)
+metrics.register_stats(
+    "db_pool_saturation", "Checked-out connections / (pool size + max overflow)", ("engine",),
+    lambda: {(name,): stats["saturation"] for name, stats in pool_stats().items()}
+)
+metrics.register_stats(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up waiting for a connection", ("engine",),
+    lambda: {(name,): stats["timeouts"] for name, stats in pool_stats().items()},
+    kind="counter"
+)
+metrics.register_stats(
+    "forecast_prefetch_total", "Background refreshes of hot forecast cells", ("outcome",),
+    lambda: {
+        (outcome,): async_weather_service.prefetch.stats()[outcome]
+        for outcome in ("prefetched", "failed", "late")
+    },
+    kind="counter"
+)
+metrics.register_stats(
+    "live_weather_subscribers", "Open live weather streams on this worker", (),
+    lambda: {(): live_weather.stats()["subscribers"]}
+)
+metrics.register_stats(
+    "password_hash_admitted", "Password hash operations running or queued", (),
+    lambda: {(): password_hash_pool.stats()["admitted"]}
+)
+
+@app.on_event("startup")
+async def startup():
+    """Start background forecast prefetching for hot locations and check the history backfill"""
+    if Config.PREFETCH_ENABLED:
+        async_weather_service.prefetch.start()
+    try:
+        if await run_in_threadpool(needs_backfill, history_store):
+            print("⚠️  weather_records is empty but Google Sheets has history; "
+                  "run `python -m backend.services.history_store` once to import it")
+    except Exception as e:
+        print(f"⚠️  History backfill check failed: {str(e)}")
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Release pooled upstream and database connections and flush buffered Sheets rows"""
+    await live_weather.aclose()
+    await async_weather_service.aclose()
+    if hasattr(history_store, "close"):
+        await run_in_threadpool(history_store.close)
+    await run_in_threadpool(sheets_service.close)
+    password_hash_pool.shutdown()
+    await dispose_engines()
+
+# Forecast payloads: a list of per-hour/day objects, or one array per field
+FORECAST_FORMATS = "^(rows|columns)$"
 
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Serve frontend login page as default"""
-    login_file = FRONTEND_DIR / "login.html"
-    if login_file.exists():
-        return FileResponse(login_file)
-    # Fallback to index if login doesn't exist yet
-    index_file = FRONTEND_DIR / "index.html"
-    if index_file.exists():
-        return FileResponse(index_file)
+    response = static_assets.response("login.html", request.headers)
+    if response is None:
+        # Fallback to index if login doesn't exist yet
+        response = static_assets.response("index.html", request.headers)
+    if response is not None:
+        return response
     return {
         "message": "WeatherPro API with Authentication",
         "version": "2.0.0",
@@ -67,31 +172,34 @@ async def root():
         }
     }
 
+# Frontend files are served from the in-memory manifest built at startup
+# (fingerprinted CSS/JS, precompressed variants, ETag/304)
+
 # Serve frontend HTML pages
 @app.get("/{page_name}.html")
-async def serve_page(page_name: str):
+async def serve_page(page_name: str, request: Request):
     """Serve frontend HTML pages"""
-    page_file = FRONTEND_DIR / f"{page_name}.html"
-    if page_file.exists():
-        return FileResponse(page_file)
+    response = static_assets.response(f"{page_name}.html", request.headers)
+    if response is not None:
+        return response
     raise HTTPException(status_code=404, detail="Page not found")
 
 # Serve CSS files
 @app.get("/{file_name}.css")
-async def serve_css(file_name: str):
-    """Serve CSS files"""
-    css_file = FRONTEND_DIR / f"{file_name}.css"
-    if css_file.exists():
-        return FileResponse(css_file, media_type="text/css")
+async def serve_css(file_name: str, request: Request):
+    """Serve CSS files (style.css or its fingerprinted style.<hash>.css)"""
+    response = static_assets.response(f"{file_name}.css", request.headers)
+    if response is not None:
+        return response
     raise HTTPException(status_code=404, detail="CSS file not found")
 
 # Serve JavaScript files
 @app.get("/{file_name}.js")
-async def serve_js(file_name: str):
-    """Serve JavaScript files"""
-    js_file = FRONTEND_DIR / f"{file_name}.js"
-    if js_file.exists():
-        return FileResponse(js_file, media_type="application/javascript")
+async def serve_js(file_name: str, request: Request):
+    """Serve JavaScript files (app.js or its fingerprinted app.<hash>.js)"""
+    response = static_assets.response(f"{file_name}.js", request.headers)
+    if response is not None:
+        return response
     raise HTTPException(status_code=404, detail="JS file not found")
 
 @app.get("/api/health", response_model=HealthResponse)
@@ -103,14 +211,50 @@ async def health_check():
         timestamp=datetime.now().isoformat()
     )
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/stats")
+async def get_stats():
+    """Cache statistics for monitoring"""
+    return {
+        "geocode_cache": async_weather_service.geocode_cache.stats(),
+        "gazetteer": {
+            **async_weather_service.gazetteer.stats(),
+            "errors": async_weather_service.gazetteer_errors
+        } if async_weather_service.gazetteer else None,
+        "suggestions": async_weather_service.suggestions.stats(),
+        "forecast_cache": async_weather_service.forecast_cache.stats(),
+        "forecast_prefetch": async_weather_service.prefetch.stats(),
+        "upstream_coalescing": async_weather_service.flights.stats(),
+        "upstreams": {
+            name: {**breaker.stats(), "latency": async_weather_service.latency[name].stats()}
+            for name, breaker in async_weather_service.breakers.items()
+        },
+        "geocode_hedging": {
+            "enabled": Config.GEOCODE_HEDGE,
+            "hedges_sent": async_weather_service.hedges_sent,
+            "hedges_won": async_weather_service.hedges_won
+        },
+        "auth_user_cache": user_cache.stats(),
+        "password_hashing": password_hash_pool.stats(),
+        "db_pool": pool_stats(),
+        "static_assets": static_assets.stats(),
+        "json": fast_json.stats(),
+        "live_weather": live_weather.stats(),
+        "sheets_write_buffer": sheets_service.write_buffer.stats() if sheets_service.write_buffer else None
+    }
+
 
 @app.post("/api/weather/save")
 async def save_weather(
     request: SaveWeatherRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     """
-    Save weather data to Google Sheets (Protected - Requires Login)
+    Save weather data to the history database, mirrored to Google Sheets (Protected - Requires Login)
     
     Args:
         request: Weather data to save
@@ -122,55 +266,228 @@ async def save_weather(
     try:
         # Convert request to dict
         weather_dict = request.dict()
+        weather_dict["user_id"] = current_user.id
         
-        # Save to Google Sheets
-        success = sheets_service.save_weather(weather_dict)
+        # Save to the history store (Sheets mirror is written in the background)
+        success = await run_in_threadpool(history_store.save, weather_dict)
         
         if not success:
-            raise HTTPException(status_code=500, detail="Failed to save to Google Sheets")
+            raise HTTPException(status_code=500, detail="Failed to save weather data")
         
         return {
             "success": True,
-            "message": "Weather data saved to Google Sheets successfully"
+            "message": "Weather data saved successfully"
         }
         
+    except WriteBufferFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/weather/batch", response_model=BatchWeatherResponse)
+async def get_weather_batch(
+    request: BatchWeatherRequest,
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """
+    Get current weather for many cities or coordinates (Protected - Requires Login)
+    
+    Args:
+        request: List of city names or {"lat", "lon"} objects
+        current_user: Current logged-in user
+        
+    Returns:
+        One result per location in request order, with per-item errors
+    """
+    if len(request.locations) > Config.BATCH_MAX_LOCATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {Config.BATCH_MAX_LOCATIONS} locations per request"
+        )
+    
+    try:
+        queries = [
+            location if isinstance(location, str) else location.model_dump()
+            for location in request.locations
+        ]
+        results = await async_weather_service.get_weather_batch(queries)
+        
+        # Items are plain dicts (validated WeatherData inside); no model to construct
+        return api_response({
+            "success": True,
+            "data": results
+        })
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/weather/history", response_model=HistoryResponse)
 async def get_history(
-    limit: int = 50,
-    current_user: User = Depends(get_current_user)
+    limit: int = Query(50, ge=1, le=1000),
+    city: Optional[str] = None,
+    country: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_temp: Optional[float] = None,
+    max_temp: Optional[float] = None,
+    cursor: Optional[str] = None,
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     """
-    Get historical weather data from Google Sheets (Protected - Requires Login)
+    Get historical weather data from the history store (Protected - Requires Login)
     
     Args:
         limit: Maximum number of records to return (default: 50)
+        city, country: Exact (case-insensitive) location filters
+        since, until: Inclusive time range (ISO 8601)
+        min_temp, max_temp: Inclusive temperature range (°C)
+        cursor: `next_cursor` from the previous page
         current_user: Current logged-in user
         
     Returns:
-        List of historical weather records
+        One page of historical weather records, newest first, and the next cursor
     """
+    filters = HistoryFilters(
+        city=city,
+        country=country,
+        since=since,
+        until=until,
+        min_temp=min_temp,
+        max_temp=max_temp
+    )
+    
     try:
-        history = sheets_service.get_history(limit=limit)
+        history, next_cursor = await run_in_threadpool(
+            history_store.query, filters=filters, cursor=cursor, limit=limit
+        )
         
-        return HistoryResponse(
+        return api_response(HistoryResponse.model_construct(
             success=True,
-            data=history
-        )
+            data=history,
+            next_cursor=next_cursor
+        ))
         
+    except ValueError as e:
+        # Malformed cursor, or UnsupportedQuery from a backend that cannot filter
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/weather/stream/ticket", response_model=StreamTicketResponse)
+async def stream_ticket(current_user: AuthenticatedUser = Depends(get_current_user)):
+    """
+    Ticket for opening one live weather stream (Protected - Requires Login)
+
+    EventSource cannot send the Authorization header; the ticket goes in the
+    stream URL instead of the access token. It expires after
+    STREAM_TICKET_EXPIRE_SECONDS and can be used once.
+
+    Args:
+        current_user: Current logged-in user
+
+    Returns:
+        The ticket and its lifetime in seconds
+    """
+    return StreamTicketResponse(
+        ticket=create_stream_ticket(current_user),
+        expires_in=STREAM_TICKET_EXPIRE_SECONDS
+    )
+
+@app.get("/api/weather/stream")
+async def stream_weather(
+    cities: str = Query(..., description="Comma-separated city names"),
+    current_user: AuthenticatedUser = Depends(get_stream_user)
+):
+    """
+    Live current weather for one or more cities as Server-Sent Events (Protected - Requires Login)
+
+    Sends each city's latest conditions on connect and again whenever its
+    forecast is refreshed (one shared fetch per city, whatever the number of
+    subscribers). EventSource passes a ticket from POST
+    /api/weather/stream/ticket as ?ticket= instead of the Authorization header.
+
+    Args:
+        cities: Comma-separated city names (at most LIVE_MAX_CITIES)
+        current_user: Current logged-in user
+
+    Returns:
+        text/event-stream of `weather`, `error` and `close` events
+    """
+    names = [city.strip() for city in cities.split(",") if city.strip()]
+    if not names or len(names) > Config.LIVE_MAX_CITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Between 1 and {Config.LIVE_MAX_CITIES} cities per stream"
+        )
+
+    try:
+        subscription = live_weather.subscribe(names)
+    except LiveHubFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return StreamingResponse(
+        live_weather.stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/weather/at", response_model=CoordinateWeatherResponse)
+async def get_weather_at(
+    request: Request,
+    response: Response,
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """
+    Get current weather for a coordinate (Protected - Requires Login)
+
+    No geocoding round trip: the city and country are filled in from the
+    nearest place in the local gazetteer. The forecast comes from the grid
+    cell containing the point (shared with nearby coordinates until the next
+    model run). Supports If-None-Match / If-Modified-Since (304 until the
+    forecast changes).
+
+    Args:
+        lat: Latitude
+        lon: Longitude
+        current_user: Current logged-in user
+
+    Returns:
+        Weather data and the reverse-geocoded location
+    """
+    try:
+        bundle = await async_weather_service.get_forecast_bundle_at(lat, lon)
+        not_modified = conditional_get(request, response, bundle, private=True)
+        if not_modified is not None:
+            return not_modified
+
+        weather_data = async_weather_service.weather_view(bundle)
+
+        with span("response"):
+            return api_response(CoordinateWeatherResponse.model_construct(
+                success=True,
+                data=weather_data,
+                location=bundle.location
+            ), response)
+
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/weather/{city}", response_model=WeatherResponse)
 async def get_weather(
     city: str,
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     """
     Get current weather for a city (Protected - Requires Login)
     
+    Supports If-None-Match / If-Modified-Since (304 until the forecast changes).
+    
     Args:
         city: City name (e.g., "Mumbai", "London")
         current_user: Current logged-in user
@@ -179,40 +496,175 @@ async def get_weather(
         Weather data
     """
     try:
-        weather_data = weather_service.get_weather(city)
+        bundle = await async_weather_service.get_forecast_bundle(city)
+        not_modified = conditional_get(request, response, bundle, private=True)
+        if not_modified is not None:
+            return not_modified
+
+        weather_data = async_weather_service.weather_view(bundle)
         
-        if not weather_data:
-            raise HTTPException(status_code=404, detail=f"Weather data not found for {city}")
+        with span("response"):
+            return api_response(WeatherResponse.model_construct(
+                success=True,
+                data=weather_data
+            ), response)
         
-        return WeatherResponse(
-            success=True,
-            data=weather_data
-        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/dashboard/{city}", response_model=DashboardResponse)
+async def get_dashboard(
+    city: str,
+    request: Request,
+    response: Response,
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """
+    Get current weather, 48-hour and 7-day forecasts in one call (Protected - Requires Login)
+    
+    Uses one geocode and one combined upstream forecast request. Supports
+    If-None-Match / If-Modified-Since (304 until the forecast changes).
+    
+    Args:
+        city: City name
+        current_user: Current logged-in user
+        
+    Returns:
+        Current weather with hourly and daily forecasts
+    """
+    try:
+        bundle = await async_weather_service.get_forecast_bundle(city)
+        not_modified = conditional_get(request, response, bundle, variant="dashboard", private=True)
+        if not_modified is not None:
+            return not_modified
+
+        dashboard = async_weather_service.dashboard_view(bundle)
+        
+        with span("response"):
+            return api_response(DashboardResponse.model_construct(
+                success=True,
+                city=city,
+                data=dashboard["current"],
+                hourly=dashboard["hourly"],
+                daily=dashboard["daily"]
+            ), response)
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/forecast/hourly/at")
+async def get_hourly_forecast_at(
+    request: Request,
+    response: Response,
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    format: str = Query("rows", pattern=FORECAST_FORMATS)
+):
+    """
+    Get 48-hour hourly forecast for a coordinate's grid cell (no geocoding)
+
+    Args:
+        lat: Latitude
+        lon: Longitude
+        format: "rows" (list of objects) or "columns" (parallel arrays per field)
+
+    Returns:
+        Hourly forecast data and the reverse-geocoded location
+    """
+    try:
+        bundle = await async_weather_service.get_forecast_bundle_at(lat, lon)
+        not_modified = conditional_get(request, response, bundle, variant=f"hourly-{format}")
+        if not_modified is not None:
+            return not_modified
+
+        return api_response({
+            "success": True,
+            "city": bundle.location["name"],
+            "location": bundle.location,
+            "format": format,
+            "data": async_weather_service.hourly_view(bundle, columnar=format == "columns")
+        }, response)
+
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/forecast/daily/at")
+async def get_daily_forecast_at(
+    request: Request,
+    response: Response,
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    format: str = Query("rows", pattern=FORECAST_FORMATS)
+):
+    """
+    Get 8-day daily forecast for a coordinate's grid cell (no geocoding)
+
+    Args:
+        lat: Latitude
+        lon: Longitude
+        format: "rows" (list of objects) or "columns" (parallel arrays per field)
+
+    Returns:
+        Daily forecast data and the reverse-geocoded location
+    """
+    try:
+        bundle = await async_weather_service.get_forecast_bundle_at(lat, lon)
+        not_modified = conditional_get(request, response, bundle, variant=f"daily-{format}")
+        if not_modified is not None:
+            return not_modified
+
+        return api_response({
+            "success": True,
+            "city": bundle.location["name"],
+            "location": bundle.location,
+            "format": format,
+            "data": async_weather_service.daily_view(bundle, columnar=format == "columns")
+        }, response)
+
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/forecast/hourly/{city}")
-async def get_hourly_forecast(city: str):
+async def get_hourly_forecast(
+    city: str,
+    request: Request,
+    response: Response,
+    format: str = Query("rows", pattern=FORECAST_FORMATS)
+):
     """
     Get 48-hour hourly forecast for a city
     
+    Supports If-None-Match / If-Modified-Since (304 until the forecast changes).
+    
     Args:
         city: City name
+        format: "rows" (list of objects) or "columns" (parallel arrays per field)
         
     Returns:
-        List of hourly forecast data
+        Hourly forecast data
     """
     try:
-        hourly_data = weather_service.get_hourly_forecast(city)
+        bundle = await async_weather_service.get_forecast_bundle(city)
+        not_modified = conditional_get(request, response, bundle, variant=f"hourly-{format}")
+        if not_modified is not None:
+            return not_modified
+
+        hourly_data = async_weather_service.hourly_view(bundle, columnar=format == "columns")
         
-        return {
+        return api_response({
             "success": True,
             "city": city,
+            "format": format,
             "data": hourly_data
-        }
+        }, response)
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -220,30 +672,69 @@ async def get_hourly_forecast(city: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/forecast/daily/{city}")
-async def get_daily_forecast(city: str):
+async def get_daily_forecast(
+    city: str,
+    request: Request,
+    response: Response,
+    format: str = Query("rows", pattern=FORECAST_FORMATS)
+):
     """
     Get 8-day daily forecast for a city
     
+    Supports If-None-Match / If-Modified-Since (304 until the forecast changes).
+    
     Args:
         city: City name
+        format: "rows" (list of objects) or "columns" (parallel arrays per field)
         
     Returns:
-        List of daily forecast data
+        Daily forecast data
     """
     try:
-        daily_data = weather_service.get_daily_forecast(city)
+        bundle = await async_weather_service.get_forecast_bundle(city)
+        not_modified = conditional_get(request, response, bundle, variant=f"daily-{format}")
+        if not_modified is not None:
+            return not_modified
+
+        daily_data = async_weather_service.daily_view(bundle, columnar=format == "columns")
         
-        return {
+        return api_response({
             "success": True,
             "city": city,
+            "format": format,
             "data": daily_data
-        }
+        }, response)
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/geocode/suggest")
+async def suggest_locations(q: str = "", limit: int = Query(8, ge=1, le=10)):
+    """
+    Typeahead suggestions for a partial location name
+
+    Served from the local gazetteer and previously geocoded places; never
+    calls an upstream geocoder.
+
+    Args:
+        q: Name prefix as typed
+        limit: Max results (default: 8)
+
+    Returns:
+        List of matching locations, most popular first
+    """
+    try:
+        return {
+            "success": True,
+            "query": q,
+            "data": async_weather_service.suggest(q, limit)
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/geocode/{query}")
 async def geocode_location(query: str, limit: int = 5):
     """
@@ -257,7 +748,7 @@ async def geocode_location(query: str, limit: int = 5):
         List of matching locations
     """
     try:
-        locations = weather_service.geocode_location(query, limit)
+        locations = await async_weather_service.geocode_location(query, limit)
         
         return {
             "success": True,
@@ -270,7 +761,6 @@ async def geocode_location(query: str, limit: int = 5):
 
 if __name__ == "__main__":
     import uvicorn
-    from backend.config import Config
     
     uvicorn.run(
         "main:app",
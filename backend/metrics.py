@@ -0,0 +1,332 @@
+"""
+Prometheus-style metrics (text exposition format, no external dependency)
+
+Counters, gauges and histograms are kept in plain dicts keyed by label
+values, so recording is a lock, a dict update and (for histograms) one
+bisect. Values that already live elsewhere (cache stats, pool occupancy) are
+read only when /metrics is scraped, through callback collectors.
+"""
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Tuple
+
+# Upstream latencies: Sheets/Nominatim calls can take seconds, cache-warm DB queries well under 1 ms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[Tuple[str, Tuple, float]]:
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield self.name, labels, value
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self) -> Iterable[Tuple[str, Tuple, float]]:
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", labels + (_format_value(bound),), cumulative
+            yield f"{self.name}_count", labels, cumulative
+            yield f"{self.name}_sum", labels, total
+
+    def label_names_for(self, sample_name: str) -> Tuple[str, ...]:
+        return self.labelnames + ("le",) if sample_name.endswith("_bucket") else self.labelnames
+
+
+class CallbackGauge:
+    """
+    Gauge (or counter) whose values are computed at scrape time
+
+    Args:
+        fn: Returns {label_values_tuple: value}; exceptions skip the metric for that scrape
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...], fn: Callable[[], Dict[Tuple, float]], kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.fn = fn
+        self.kind = kind
+
+    def samples(self) -> Iterable[Tuple[str, Tuple, float]]:
+        try:
+            values = self.fn()
+        except Exception:
+            return
+        for labels, value in values.items():
+            if value is not None:
+                yield self.name, labels, value
+
+
+class Registry:
+    """Collection of metrics rendered together for /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample_name, labels, value in metric.samples():
+                names = metric.label_names_for(sample_name) if isinstance(metric, Histogram) else metric.labelnames
+                lines.append(f"{sample_name}{_format_labels(names, labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# ===== Upstreams (Photon, Nominatim, Open-Meteo, Google Sheets, database) =====
+
+UPSTREAM_REQUESTS = registry.register(Counter(
+    "upstream_requests_total", "Calls made to an upstream service", ("upstream",)
+))
+UPSTREAM_ERRORS = registry.register(Counter(
+    "upstream_errors_total", "Upstream calls that raised", ("upstream",)
+))
+UPSTREAM_LATENCY = registry.register(Histogram(
+    "upstream_request_duration_seconds", "Upstream call latency", ("upstream",)
+))
+UPSTREAM_IN_FLIGHT = registry.register(Gauge(
+    "upstream_in_flight", "Upstream calls currently in progress", ("upstream",)
+))
+UPSTREAM_BACKGROUND_FAILURES = registry.register(Counter(
+    "upstream_background_failures_total",
+    "Background upstream refreshes that failed; callers kept the stale data", ("upstream", "stage")
+))
+
+# ===== HTTP routes =====
+
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests handled", ("method", "route", "status")
+))
+HTTP_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+))
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled"
+))
+
+# ===== Database sessions =====
+
+DB_SESSIONS_IN_FLIGHT = registry.register(Gauge(
+    "db_sessions_in_flight", "Database sessions currently open (run_db)"
+))
+
+
+class upstream_call:
+    """
+    Context manager timing one upstream call
+
+    Usage:
+        with upstream_call("open_meteo"):
+            response = requests.get(...)
+    """
+
+    __slots__ = ("upstream", "start")
+
+    def __init__(self, upstream: str):
+        self.upstream = upstream
+
+    def __enter__(self):
+        UPSTREAM_IN_FLIGHT.inc(self.upstream)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # A cancelled call (e.g. the losing side of a hedged request) is not an upstream error
+        failed = exc_type is not None and not issubclass(exc_type, asyncio.CancelledError)
+        record_upstream(self.upstream, time.perf_counter() - self.start, failed=failed)
+        UPSTREAM_IN_FLIGHT.dec(self.upstream)
+        return False
+
+
+def record_upstream(upstream: str, seconds: float, failed: bool = False):
+    """Record one finished upstream call"""
+    UPSTREAM_REQUESTS.inc(upstream)
+    UPSTREAM_LATENCY.observe(seconds, upstream)
+    if failed:
+        UPSTREAM_ERRORS.inc(upstream)
+
+
+def register_stats(name: str, help: str, labelnames: Tuple[str, ...], fn: Callable[[], Dict[Tuple, float]], kind: str = "gauge"):
+    """Expose values computed at scrape time (e.g. from an existing stats() method)"""
+    return registry.register(CallbackGauge(name, help, labelnames, fn, kind))
+
+
+def register_caches(caches: Dict[str, Callable[[], Dict]]):
+    """
+    Expose hit/miss counters and hit ratio for caches with a stats() method
+
+    Args:
+        caches: {cache name: stats function returning hits/misses/size/hit_ratio}
+    """
+    def collect(field):
+        def values():
+            result = {}
+            for name, stats in caches.items():
+                snapshot = stats()
+                if field in snapshot:
+                    result[(name,)] = snapshot[field]
+            return result
+        return values
+
+    register_stats("cache_hits_total", "Cache lookups served from the cache", ("cache",), collect("hits"), kind="counter")
+    register_stats("cache_stale_hits_total", "Cache lookups served stale while revalidating", ("cache",), collect("stale_hits"), kind="counter")
+    register_stats("cache_misses_total", "Cache lookups that missed", ("cache",), collect("misses"), kind="counter")
+    register_stats("cache_evictions_total", "Entries evicted to stay within maxsize", ("cache",), collect("evictions"), kind="counter")
+    register_stats("cache_entries", "Entries currently cached", ("cache",), collect("size"))
+    register_stats("cache_hit_ratio", "Share of lookups served from the cache", ("cache",), collect("hit_ratio"))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route request counts, latency and in-flight requests
+
+    Routes are labelled by their path template (e.g. /api/weather/{city}) so
+    label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._paths: Dict = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = self._route_label(scope)
+            HTTP_LATENCY.observe(time.perf_counter() - start, scope["method"], route)
+            HTTP_REQUESTS.inc(scope["method"], route, status[0])
+            HTTP_IN_FLIGHT.dec()
+
+    def _route_label(self, scope) -> str:
+        route = scope.get("route")
+        if route is not None and hasattr(route, "path"):
+            return route.path
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._paths.get(endpoint)
+        if path is None:
+            app = scope.get("app")
+            routes = getattr(getattr(app, "router", None), "routes", [])
+            self._paths = {getattr(r, "endpoint", None): getattr(r, "path", "") for r in routes}
+            path = self._paths.get(endpoint, getattr(endpoint, "__name__", "unknown"))
+        return path
+
+
+def _observe_queries():
+    """Time every SQL statement on every engine as upstream=<dialect name>"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        record_upstream(conn.engine.dialect.name, time.perf_counter() - started)
+
+    @event.listens_for(Engine, "handle_error")
+    def failed(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            record_upstream(context.engine.dialect.name, time.perf_counter() - starts.pop(), failed=True)
+
+
+_observe_queries()
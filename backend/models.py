@@ -2,7 +2,7 @@
 Pydantic models for request/response validation
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List, Union
 from datetime import datetime
 
 class WeatherData(BaseModel):
@@ -24,6 +24,39 @@ class WeatherResponse(BaseModel):
     data: Optional[WeatherData] = None
     error: Optional[str] = None
 
+class DashboardResponse(BaseModel):
+    """API response for current weather plus hourly and daily forecasts"""
+    success: bool
+    city: str
+    data: Optional[WeatherData] = None
+    hourly: list = []
+    daily: list = []
+    error: Optional[str] = None
+
+class Coordinates(BaseModel):
+    """A latitude/longitude pair"""
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+
+class CoordinateWeatherResponse(WeatherResponse):
+    """API response for weather at a coordinate, with the reverse-geocoded location"""
+    location: Optional[dict] = None
+
+class BatchWeatherRequest(BaseModel):
+    """Request model for current weather at many locations"""
+    locations: List[Union[str, Coordinates]]
+
+class BatchWeatherItem(BaseModel):
+    """Result for one location of a batch request"""
+    success: bool
+    data: Optional[WeatherData] = None
+    error: Optional[str] = None
+
+class BatchWeatherResponse(BaseModel):
+    """API response for a batch weather request (same order as the request)"""
+    success: bool
+    data: List[BatchWeatherItem] = []
+
 class SaveWeatherRequest(BaseModel):
     """Request model for saving weather data"""
     city: str
@@ -40,8 +73,14 @@ class HistoryResponse(BaseModel):
     """Response model for historical weather data"""
     success: bool
     data: Optional[list] = None
+    next_cursor: Optional[str] = None
     error: Optional[str] = None
 
+class StreamTicketResponse(BaseModel):
+    """Single-use ticket for opening a live weather stream"""
+    ticket: str
+    expires_in: int
+
 class HealthResponse(BaseModel):
     """Health check response"""
     status: str
@@ -0,0 +1,146 @@
+"""
+Bounded worker pool for bcrypt password hashing
+
+bcrypt deliberately burns tens of milliseconds of CPU per call. Running it on
+the event loop stalls every other request on the worker, so signup/login hand
+it to a small dedicated thread pool instead (bcrypt releases the GIL while
+hashing). Admission is limited globally, so a login storm queues for a bounded
+time and then fails fast, and per account, so one email cannot monopolise the
+pool.
+"""
+import asyncio
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Threads running bcrypt (roughly the CPU cores you are willing to spend on it)
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hash operations admitted at once (running + queued for a worker)
+AUTH_HASH_MAX_PENDING = int(os.getenv("AUTH_HASH_MAX_PENDING", "64"))
+# Seconds a request waits for admission before it is rejected
+AUTH_HASH_QUEUE_TIMEOUT = float(os.getenv("AUTH_HASH_QUEUE_TIMEOUT", "5"))
+# Concurrent hash operations allowed for a single account
+AUTH_HASH_PER_ACCOUNT = int(os.getenv("AUTH_HASH_PER_ACCOUNT", "2"))
+
+
+class HashPoolBusy(Exception):
+    """Raised when no hashing slot frees up within the queue timeout"""
+
+
+class TooManyAttempts(HashPoolBusy):
+    """Raised when one account already has its maximum concurrent attempts in flight"""
+
+
+class PasswordHashPool:
+    """
+    Run password hash/verify calls on a dedicated, size-limited thread pool
+
+    Args:
+        workers: Number of hashing threads
+        max_pending: Global limit on admitted (running + queued) operations
+        queue_timeout: Seconds to wait for admission before raising HashPoolBusy
+        per_account: Concurrent operations allowed per account key
+    """
+
+    def __init__(self, workers: int, max_pending: int, queue_timeout: float, per_account: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.per_account = per_account
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = None  # asyncio.Semaphore, created on first use inside the event loop
+        self._accounts = defaultdict(int)
+
+        self.completed = 0
+        self.rejected_busy = 0
+        self.rejected_account = 0
+
+    async def run(self, account: str, fn, *args):
+        """
+        Run fn(*args) on the hashing pool
+
+        Args:
+            account: Key for the per-account limit (normalised email)
+            fn: Blocking hash/verify function
+
+        Raises:
+            TooManyAttempts: If the account is over its concurrency limit
+            HashPoolBusy: If the pool stays saturated for queue_timeout seconds
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+        account = (account or "").strip().lower()
+        if self._accounts[account] >= self.per_account:
+            self.rejected_account += 1
+            raise TooManyAttempts("Too many concurrent attempts for this account, try again shortly")
+
+        self._accounts[account] += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._release_account(account)
+            self.rejected_busy += 1
+            raise HashPoolBusy("Authentication is busy, try again shortly")
+        except BaseException:
+            self._release_account(account)
+            raise
+
+        try:
+            job = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            self._release_account(account)
+            raise
+        # Admission ends when bcrypt does: a cancelled request must not free
+        # its slot while the hash keeps a worker busy
+        loop = asyncio.get_running_loop()
+        job.add_done_callback(lambda done: self._call_in_loop(loop, self._finish, account, done))
+        return await asyncio.wrap_future(job, loop=loop)
+
+    @staticmethod
+    def _call_in_loop(loop, callback, *args):
+        # Runs on the bcrypt thread (or wherever the job was cancelled)
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(callback, *args)
+
+    def _finish(self, account: str, job):
+        self._slots.release()
+        self._release_account(account)
+        if not job.cancelled() and job.exception() is None:
+            self.completed += 1
+
+    def _release_account(self, account: str):
+        self._accounts[account] -= 1
+        if not self._accounts[account]:
+            del self._accounts[account]
+
+    def shutdown(self):
+        """Stop the hashing threads (call on application shutdown)"""
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        """Pool counters for monitoring"""
+        admitted = self.max_pending - self._slots._value if self._slots is not None else 0
+        return {
+            "workers": self.workers,
+            "admitted": admitted,
+            "max_pending": self.max_pending,
+            "accounts_in_flight": len(self._accounts),
+            "completed": self.completed,
+            "rejected_busy": self.rejected_busy,
+            "rejected_account": self.rejected_account
+        }
+
+
+# Singleton instance
+password_hash_pool = PasswordHashPool(
+    workers=AUTH_HASH_WORKERS,
+    max_pending=AUTH_HASH_MAX_PENDING,
+    queue_timeout=AUTH_HASH_QUEUE_TIMEOUT,
+    per_account=AUTH_HASH_PER_ACCOUNT
+)
@@ -1,7 +1,7 @@
 """
 Services package initialization
 """
-from backend.services.weather_service import weather_service
+from backend.services.weather_service import async_weather_service
 from backend.services.sheets_service import sheets_service
 
-__all__ = ['weather_service', 'sheets_service']
+__all__ = ['async_weather_service', 'sheets_service']
@@ -0,0 +1,219 @@
+"""
+In-process caches used by the weather services
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Returned by TTLCache.get() on a miss so that cached None/[] values are distinguishable
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache with per-entry expiry and hit/miss counters
+
+    Args:
+        maxsize: Maximum number of entries kept (least recently used are evicted)
+        ttl: Default time-to-live in seconds
+        negative_ttl: Time-to-live for "not found" (empty) values; defaults to ttl
+    """
+
+    def __init__(self, maxsize: int, ttl: float, negative_ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value or MISSING"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value; empty values use the negative TTL unless ttl is given"""
+        if ttl is None:
+            ttl = self.ttl if value else self.negative_ttl
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """Drop a single entry"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class CacheEntry:
+    """A cached upstream payload with its fetch time and model-refresh expiry (epoch seconds)"""
+    __slots__ = ("value", "fetched_at", "expires_at", "stale_until", "_digest")
+
+    def __init__(self, value: Any, fetched_at: float, expires_at: float, stale_until: float):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self._digest: Optional[str] = None
+
+    @property
+    def digest(self) -> str:
+        """Content hash of the payload (computed once; identical payloads hash alike across workers)"""
+        if self._digest is None:
+            encoded = json.dumps(self.value, sort_keys=True, separators=(",", ":")).encode()
+            self._digest = hashlib.blake2b(encoded, digest_size=8).hexdigest()
+        return self._digest
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def max_age(self) -> int:
+        """Seconds until the next expected model refresh"""
+        return max(0, int(self.expires_at - time.time()))
+
+
+class ForecastCache:
+    """
+    Forecast payload cache keyed by model grid cell and requested variables
+
+    Entries expire at the next expected model refresh (every `update_interval`
+    seconds, shifted by `update_offset` for publication delay) rather than after
+    a fixed TTL. Expired entries stay servable for `stale_ttl` seconds so callers
+    can return them immediately while revalidating in the background.
+
+    Args:
+        maxsize: Maximum number of grid cells kept (LRU eviction)
+        grid: Grid resolution in degrees used to snap coordinates
+        update_interval: Model refresh interval in seconds
+        update_offset: Delay after each interval boundary before new data is available
+        stale_ttl: How long an expired entry may still be served while revalidating
+    """
+
+    def __init__(self, maxsize: int, grid: float, update_interval: float, update_offset: float = 0, stale_ttl: float = 0):
+        self.maxsize = maxsize
+        self.grid = grid
+        self.update_interval = update_interval
+        self.update_offset = update_offset
+        self.stale_ttl = stale_ttl
+        self._data: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def snap(self, lat: float, lon: float) -> Tuple[float, float]:
+        """Round coordinates to the centre of their grid cell"""
+        return (
+            round(round(lat / self.grid) * self.grid, 4),
+            round(round(lon / self.grid) * self.grid, 4)
+        )
+
+    def key(self, lat: float, lon: float, params: Dict) -> Tuple:
+        """Cache key from snapped coordinates and the non-coordinate request parameters"""
+        variables = tuple(sorted(
+            (name, str(value)) for name, value in params.items() if name not in ("latitude", "longitude")
+        ))
+        return self.snap(lat, lon) + (variables,)
+
+    def next_refresh(self, now: float) -> float:
+        """Epoch time of the next expected model refresh after `now`"""
+        cycles = (now - self.update_offset) // self.update_interval
+        return (cycles + 1) * self.update_interval + self.update_offset
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        """Return a fresh or still-servable stale entry, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry.stale_until <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            if entry.expires_at <= now:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def set(self, key: Hashable, value: Any, grace: float = 0) -> CacheEntry:
+        """
+        Store a freshly fetched payload
+
+        Args:
+            key: Cache key
+            value: Upstream payload
+            grace: Seconds the entry stays fresh past the next model refresh
+                (used by the prefetcher, which refreshes it within that window)
+        """
+        now = time.time()
+        expires_at = self.next_refresh(now) + grace
+        entry = CacheEntry(value, now, expires_at, expires_at + self.stale_ttl)
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        """Return an entry without touching counters or LRU order"""
+        return self._data.get(key)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+        }
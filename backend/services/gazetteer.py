@@ -0,0 +1,563 @@
+"""
+Offline geocoder backed by a memory-mapped gazetteer index
+
+The index is compiled once from a GeoNames-style TSV (e.g. cities500.txt from
+https://download.geonames.org/export/dump/) into a flat binary file:
+
+    header | place records | name keys sorted by (key, -population)
+           | heavy-prefix records | grid cells | places by cell | string blob
+
+Opening it maps the file and reads the header, so startup cost does not grow
+with the gazetteer. A lookup is a binary search over the fixed-size key
+records, i.e. a few dozen mmap reads. Prefixes shared by more than
+HEAVY_PREFIX keys ("s", "san", ...) store their most populous places, so a
+prefix lookup never scans more than HEAVY_PREFIX keys.
+
+For reverse geocoding, places are also bucketed into a CELL_DEGREES grid
+(row-major cell ids, so one grid row is a contiguous run of cells); the
+nearest place is found by scanning rings of cells around the query point.
+
+If countryInfo.txt and admin1CodesASCII.txt sit next to the TSV, country and
+state names are resolved from them; otherwise ISO codes are used.
+"""
+import heapq
+import math
+import mmap
+import os
+import re
+import struct
+import unicodedata
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from backend.config import Config
+
+MAGIC = b"GZIX"
+VERSION = 3
+HEADER = struct.Struct("<4sIIIIIQQQQQQ")      # magic, version, places, keys, prefixes, cells, then section offsets
+PLACE = struct.Struct("<ddIIHIHIH2sB")        # lat, lon, population, name, country, state (offset/len), cc, type
+KEY = struct.Struct("<IHHI")                  # key offset, key length, padding, place index
+HEAVY_PREFIX = 128
+PREFIX_TOP = 10
+PREFIX = struct.Struct(f"<IH2x{PREFIX_TOP}I")  # prefix offset, prefix length, top places (NO_PLACE padded)
+NO_PLACE = 0xFFFFFFFF
+CELL = struct.Struct("<II")                   # cell id, first entry in the places-by-cell list (plus a sentinel)
+PLACE_ID = struct.Struct("<I")
+LAT_LON = struct.Struct("<dd")
+CELL_DEGREES = 0.25
+GRID_ROWS = int(180 / CELL_DEGREES)
+GRID_COLUMNS = int(360 / CELL_DEGREES)
+MAX_RINGS = 12
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+PLACE_TYPES = ("city", "town", "village", "locality")
+
+_POPULATION = struct.Struct("<I")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize(text: str) -> str:
+    """Case-, accent- and punctuation-insensitive form used for index keys"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+def _place_type(feature_class: str, population: int) -> int:
+    if feature_class != "P":
+        return PLACE_TYPES.index("locality")
+    if population >= 100_000:
+        return PLACE_TYPES.index("city")
+    if population >= 10_000:
+        return PLACE_TYPES.index("town")
+    return PLACE_TYPES.index("village")
+
+
+def _read_lookup(path: str, key_column: int, value_column: int) -> Dict[str, str]:
+    """Load a code -> name table (GeoNames countryInfo / admin1Codes format) if present"""
+    table = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as source:
+            for line in source:
+                if line.startswith("#"):
+                    continue
+                columns = line.rstrip("\n").split("\t")
+                if len(columns) > max(key_column, value_column):
+                    table[columns[key_column]] = columns[value_column]
+    return table
+
+
+def _utf8(text: str, limit: int = 65535) -> bytes:
+    """UTF-8 encoding of `text`, cut to at most `limit` bytes on a character boundary"""
+    data = text.encode("utf-8")
+    if len(data) <= limit:
+        return data
+    return data[:limit].decode("utf-8", "ignore").encode("utf-8")
+
+
+def _cell(lat: float, lon: float) -> Tuple[int, int]:
+    """Grid (row, column) containing a coordinate"""
+    row = min(GRID_ROWS - 1, max(0, int((lat + 90) / CELL_DEGREES)))
+    column = int(((lon + 180) % 360) / CELL_DEGREES) % GRID_COLUMNS
+    return row, column
+
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+def _top_places(entries: List[Tuple[bytes, int, int]]) -> List[int]:
+    """Most populous distinct places among (key, -population, place) entries"""
+    top = []
+    for _, _, place in heapq.nsmallest(PREFIX_TOP * 2, entries, key=lambda entry: entry[1]):
+        if place not in top:
+            top.append(place)
+    return top[:PREFIX_TOP]
+
+
+def _heavy_prefixes(keys: List[Tuple[bytes, int, int]]) -> List[Tuple[bytes, List[int]]]:
+    """(prefix, top places) for every prefix of the sorted keys matching more than HEAVY_PREFIX of them"""
+    heavy = []
+    ranges = [(b"", 0, len(keys))]
+    while ranges:
+        prefix, start, end = ranges.pop()
+        if end - start <= HEAVY_PREFIX:
+            continue
+        if prefix:
+            heavy.append((prefix, _top_places(keys[start:end])))
+        depth = len(prefix) + 1
+        index = start
+        while index < end:
+            if len(keys[index][0]) < depth:  # the key equal to the prefix sorts first
+                index += 1
+                continue
+            child = keys[index][0][:depth]
+            child_end = index
+            while child_end < end and keys[child_end][0][:depth] == child:
+                child_end += 1
+            ranges.append((child, index, child_end))
+            index = child_end
+    heavy.sort()
+    return heavy
+
+
+def build_index(tsv_path: str, index_path: str, min_population: int = 0) -> int:
+    """
+    Compile a GeoNames TSV into the binary index format
+
+    Args:
+        tsv_path: GeoNames dump (geonameid, name, asciiname, alternatenames, lat, lon, class, code, cc, ..., admin1, ..., population, ...)
+        index_path: Output file (written atomically)
+        min_population: Skip places smaller than this
+
+    Returns:
+        Number of places indexed
+    """
+    directory = os.path.dirname(os.path.abspath(tsv_path))
+    countries = _read_lookup(os.path.join(directory, "countryInfo.txt"), 0, 4)
+    states = _read_lookup(os.path.join(directory, "admin1CodesASCII.txt"), 0, 1)
+
+    blob = bytearray()
+    interned: Dict[str, Tuple[int, int]] = {}
+
+    def add_string(text: str, intern: bool = False) -> Tuple[int, int]:
+        if intern and text in interned:
+            return interned[text]
+        data = _utf8(text)
+        ref = (len(blob), len(data))
+        blob.extend(data)
+        if intern:
+            interned[text] = ref
+        return ref
+
+    places = bytearray()
+    keys: List[Tuple[bytes, int, int]] = []  # (normalized key, -population, place index)
+    cells: List[Tuple[int, int]] = []  # (cell id, place index)
+    count = 0
+    with open(tsv_path, encoding="utf-8") as source:
+        for line in source:
+            columns = line.rstrip("\n").split("\t")
+            if len(columns) < 15:
+                continue
+            try:
+                lat, lon = float(columns[4]), float(columns[5])
+                population = int(columns[14] or 0)
+            except ValueError:
+                continue
+            if population < min_population:
+                continue
+
+            name, ascii_name, country_code = columns[1], columns[2], columns[8]
+            name_ref = add_string(name)
+            country_ref = add_string(countries.get(country_code, country_code), intern=True)
+            state_ref = add_string(states.get(f"{country_code}.{columns[10]}", ""), intern=True)
+            places.extend(PLACE.pack(
+                lat, lon, min(population, 0xFFFFFFFF),
+                name_ref[0], name_ref[1], country_ref[0], country_ref[1], state_ref[0], state_ref[1],
+                country_code.encode("ascii", "replace")[:2].ljust(2), _place_type(columns[6], population)
+            ))
+            for key in {normalize(name), normalize(ascii_name)} - {""}:
+                keys.append((_utf8(key), -population, count))
+            row, column = _cell(lat, lon)
+            cells.append((row * GRID_COLUMNS + column, count))
+            count += 1
+
+    keys.sort()
+    key_records = bytearray()
+    for key, _, place in keys:
+        offset, length = add_string(key.decode("utf-8"), intern=True)
+        key_records.extend(KEY.pack(offset, length, 0, place))
+
+    heavy = _heavy_prefixes(keys)
+    prefix_records = bytearray()
+    for prefix, top in heavy:
+        offset = len(blob)
+        blob.extend(prefix)  # may end mid-character, so stored as raw bytes
+        prefix_records.extend(PREFIX.pack(offset, len(prefix), *(top + [NO_PLACE] * (PREFIX_TOP - len(top)))))
+
+    cells.sort()
+    cell_records = bytearray()
+    spatial = bytearray()
+    for position, (cell, place) in enumerate(cells):
+        if position == 0 or cells[position - 1][0] != cell:
+            cell_records.extend(CELL.pack(cell, position))
+        spatial.extend(PLACE_ID.pack(place))
+    cell_count = len(cell_records) // CELL.size
+    cell_records.extend(CELL.pack(NO_PLACE, len(cells)))
+
+    places_off = HEADER.size
+    keys_off = places_off + len(places)
+    prefixes_off = keys_off + len(key_records)
+    cells_off = prefixes_off + len(prefix_records)
+    spatial_off = cells_off + len(cell_records)
+    blob_off = spatial_off + len(spatial)
+    # Every worker compiles at import: each writes its own file, the last rename wins
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as out:
+            out.write(HEADER.pack(
+                MAGIC, VERSION, count, len(keys), len(heavy), cell_count,
+                places_off, keys_off, prefixes_off, cells_off, spatial_off, blob_off
+            ))
+            out.write(places)
+            out.write(key_records)
+            out.write(prefix_records)
+            out.write(cell_records)
+            out.write(spatial)
+            out.write(blob)
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+class Gazetteer:
+    """
+    Read-only view over a compiled gazetteer index
+
+    Args:
+        index_path: File produced by build_index()
+    """
+
+    def __init__(self, index_path: str):
+        self.path = index_path
+        self._file = open(index_path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.places, self.keys, self.prefixes, self.cells, self._places_off, self._keys_off,
+         self._prefixes_off, self._cells_off, self._spatial_off, self._blob_off) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{index_path} is not a gazetteer index (version {VERSION})")
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    # ===== Low-level access =====
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._blob_off + offset
+        return self._map[start:start + length].decode("utf-8")
+
+    def _key(self, index: int) -> bytes:
+        offset, length, _, _ = KEY.unpack_from(self._map, self._keys_off + index * KEY.size)
+        start = self._blob_off + offset
+        return self._map[start:start + length]
+
+    def _key_place(self, index: int) -> int:
+        return KEY.unpack_from(self._map, self._keys_off + index * KEY.size)[3]
+
+    def _population(self, place: int) -> int:
+        return _POPULATION.unpack_from(self._map, self._places_off + place * PLACE.size + 16)[0]
+
+    def place(self, index: int) -> Dict:
+        """Location dict (same shape as the remote geocoders return) for a place record"""
+        lat, lon, population, name_off, name_len, country_off, country_len, state_off, state_len, code, kind = \
+            PLACE.unpack_from(self._map, self._places_off + index * PLACE.size)
+        return {
+            "name": self._string(name_off, name_len),
+            "country": self._string(country_off, country_len),
+            "state": self._string(state_off, state_len),
+            "lat": round(lat, 5),
+            "lon": round(lon, 5),
+            "type": PLACE_TYPES[kind] if kind < len(PLACE_TYPES) else "locality",
+            "country_code": code.decode("ascii").strip(),
+            "population": population,
+            "source": "gazetteer"
+        }
+
+    def _lower_bound(self, key: bytes) -> int:
+        low, high = 0, self.keys
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _heavy_top(self, prefix: bytes) -> Optional[List[int]]:
+        """Stored top places for a heavy prefix, or None if the prefix is not heavy"""
+        low, high = 0, self.prefixes
+        while low < high:
+            middle = (low + high) // 2
+            offset, length, *top = PREFIX.unpack_from(self._map, self._prefixes_off + middle * PREFIX.size)
+            start = self._blob_off + offset
+            stored = self._map[start:start + length]
+            if stored == prefix:
+                return [place for place in top if place != NO_PLACE]
+            if stored < prefix:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def _prefix_range(self, prefix: bytes) -> Tuple[int, int]:
+        """[start, end) of keys starting with prefix"""
+        start = self._lower_bound(prefix)
+        end = self._lower_bound(prefix + b"\xff") if prefix else self.keys
+        return start, end
+
+    # ===== Lookups =====
+
+    def exact(self, name: str) -> Iterator[int]:
+        """Place indexes whose name normalizes to `name`, most populous first"""
+        key = normalize(name).encode("utf-8")
+        index = self._lower_bound(key)
+        while index < self.keys and self._key(index) == key:
+            yield self._key_place(index)
+            index += 1
+
+    def prefix(self, text: str, limit: int = PREFIX_TOP) -> List[Dict]:
+        """
+        Places whose name starts with `text`, most populous first
+
+        Args:
+            text: Name prefix
+            limit: Max results (at most PREFIX_TOP for heavy prefixes)
+        """
+        key = normalize(text).encode("utf-8")
+        if not key:
+            return []
+        places = self._heavy_top(key)
+        if places is None:
+            start, end = self._prefix_range(key)
+            places = {self._key_place(index) for index in range(start, end)}
+        return [self.place(place) for place in heapq.nlargest(limit, places, key=self._population)]
+
+    def fuzzy(self, name: str, scan: int = 2000) -> List[int]:
+        """
+        Place indexes one edit (insertion, deletion, substitution or adjacent
+        transposition) away from `name`, most populous first
+
+        Only keys sharing the first two characters are considered, which
+        covers typical typos while keeping the scan short.
+        """
+        key = normalize(name).encode("utf-8")
+        if len(key) < 4:
+            return []
+        start, end = self._prefix_range(key[:2])
+        matches = set()
+        for index in range(start, min(end, start + scan)):
+            offset, length, _, place = KEY.unpack_from(self._map, self._keys_off + index * KEY.size)
+            if abs(length - len(key)) <= 1:
+                candidate = self._map[self._blob_off + offset:self._blob_off + offset + length]
+                if _one_edit(key, candidate):
+                    matches.add(place)
+        return sorted(matches, key=self._population, reverse=True)
+
+    def search(self, query: str, limit: int = 5, fuzzy: bool = False) -> List[Dict]:
+        """
+        Geocode a free-text query ("Springfield", "Springfield, Illinois", "Paris, FR")
+
+        Parts after the first comma must match the country, country code or
+        state. Callers should only ask for near misses once the remote
+        geocoders found nothing, since a typo match can shadow a real place
+        that is missing from the gazetteer.
+
+        Args:
+            query: Place name, optionally with qualifiers
+            limit: Max results
+            fuzzy: Match names one edit away instead of exact names
+
+        Returns:
+            Location dicts (most populous first), or [] on a miss
+        """
+        name, *qualifiers = [part for part in (p.strip() for p in query.split(",")) if part] or [""]
+        qualifiers = [normalize(q) for q in qualifiers]
+
+        def accept(place: Dict) -> bool:
+            fields = (normalize(place["country"]), place["country_code"].lower(), normalize(place["state"]))
+            return all(any(field.startswith(q) for field in fields if field) for q in qualifiers)
+
+        results = []
+        seen = set()
+        for index in (self.fuzzy if fuzzy else self.exact)(name):
+            if index in seen:
+                continue
+            seen.add(index)
+            place = self.place(index)
+            if accept(place):
+                results.append(place)
+                if len(results) >= limit:
+                    break
+        return results
+
+    def _cell_record(self, index: int) -> Tuple[int, int]:
+        return CELL.unpack_from(self._map, self._cells_off + index * CELL.size)
+
+    def _row_places(self, row: int, first: int, last: int) -> Iterator[int]:
+        """Place indexes in grid columns first..last (inclusive, no wrap) of one row"""
+        low, high = 0, self.cells
+        target = row * GRID_COLUMNS + first
+        while low < high:
+            middle = (low + high) // 2
+            if self._cell_record(middle)[0] < target:
+                low = middle + 1
+            else:
+                high = middle
+        end_cell = row * GRID_COLUMNS + last
+        index = low
+        while index < self.cells and self._cell_record(index)[0] <= end_cell:
+            index += 1
+        start, end = self._cell_record(low)[1], self._cell_record(index)[1]
+        for position in range(start, end):
+            yield PLACE_ID.unpack_from(self._map, self._spatial_off + position * PLACE_ID.size)[0]
+
+    def _ring_places(self, row: int, column: int, ring: int) -> Iterator[int]:
+        """Place indexes in the cells exactly `ring` cells away from (row, column)"""
+        def row_span(r: int, first: int, last: int) -> Iterator[int]:
+            if not 0 <= r < GRID_ROWS:
+                return
+            first, last = first % GRID_COLUMNS, last % GRID_COLUMNS
+            if first <= last:
+                yield from self._row_places(r, first, last)
+            else:  # wraps around the antimeridian
+                yield from self._row_places(r, first, GRID_COLUMNS - 1)
+                yield from self._row_places(r, 0, last)
+
+        if ring == 0:
+            yield from row_span(row, column, column)
+            return
+        yield from row_span(row - ring, column - ring, column + ring)
+        yield from row_span(row + ring, column - ring, column + ring)
+        for r in range(row - ring + 1, row + ring):
+            yield from row_span(r, column - ring, column - ring)
+            yield from row_span(r, column + ring, column + ring)
+
+    def reverse(self, lat: float, lon: float, max_km: float = 25.0) -> Optional[Dict]:
+        """
+        Nearest place to a coordinate
+
+        Rings of grid cells are scanned outwards until no unscanned cell can
+        be closer than the best match so far.
+
+        Args:
+            lat: Latitude
+            lon: Longitude
+            max_km: Ignore places further away than this
+
+        Returns:
+            Location dict with "distance_km", or None if nothing is within max_km
+        """
+        row, column = _cell(lat, lon)
+        # Narrowest cell width in the search area (cells shrink towards the poles)
+        widest_lat = min(89.0, abs(lat) + max_km / KM_PER_DEGREE)
+        step = CELL_DEGREES * KM_PER_DEGREE * max(math.cos(math.radians(widest_lat)), 0.01)
+        best_km, best_place = math.inf, None
+        for ring in range(min(MAX_RINGS, int(max_km / step) + 1) + 1):
+            if best_place is not None and best_km <= (ring - 1) * step:
+                break
+            for place in self._ring_places(row, column, ring):
+                place_lat, place_lon = LAT_LON.unpack_from(self._map, self._places_off + place * PLACE.size)
+                distance = _haversine_km(lat, lon, place_lat, place_lon)
+                if distance < best_km:
+                    best_km, best_place = distance, place
+        if best_place is None or best_km > max_km:
+            return None
+        location = self.place(best_place)
+        location["distance_km"] = round(best_km, 2)
+        return location
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "places": self.places,
+            "keys": self.keys,
+            "heavy_prefixes": self.prefixes,
+            "grid_cells": self.cells
+        }
+
+
+def _one_edit(a: bytes, b: bytes) -> bool:
+    """True if a and b differ by at most one edit (Damerau: a swap of neighbours counts as one)"""
+    if a == b:
+        return True
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        if a[i + 1:] == b[i + 1:]:
+            return True
+        return i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+    return len(b) - len(a) == 1 and a[i:] == b[i + 1:]
+
+
+def _index_version(index_path: str) -> Optional[int]:
+    try:
+        with open(index_path, "rb") as index:
+            magic, version = struct.unpack("<4sI", index.read(8))
+    except (OSError, struct.error):
+        return None
+    return version if magic == MAGIC else None
+
+
+def open_gazetteer(path: str) -> Optional[Gazetteer]:
+    """
+    Open GAZETTEER_PATH, compiling a TSV into `<path>.idx` first if needed
+
+    Returns:
+        Gazetteer, or None if no path is configured or loading fails
+    """
+    if not path:
+        return None
+    try:
+        index_path = path
+        if not path.endswith(".idx"):
+            index_path = f"{path}.idx"
+            if (_index_version(index_path) != VERSION
+                    or os.path.getmtime(index_path) < os.path.getmtime(path)):
+                count = build_index(path, index_path, Config.GAZETTEER_MIN_POPULATION)
+                print(f"ℹ️  Compiled gazetteer index with {count} places: {index_path}")
+        return Gazetteer(index_path)
+    except Exception as e:
+        print(f"⚠️  WARNING: Local gazetteer unavailable, using remote geocoding only: {str(e)}")
+        return None
+
+
+# Singleton instance
+gazetteer = open_gazetteer(Config.GAZETTEER_PATH)
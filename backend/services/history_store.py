@@ -0,0 +1,389 @@
+"""
+Weather history storage backends
+
+The SQL store is the source of truth for history; Google Sheets is kept as a
+mirror that is written in the background. Times are stored as naive UTC;
+the sheet keeps showing server-local time.
+
+Existing sheet history is imported once into an empty table with:
+
+    python -m backend.services.history_store
+"""
+import base64
+import json
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, create_engine, func, or_
+from sqlalchemy.orm import sessionmaker
+from backend.config import Config
+from backend.database import Base
+from backend.history_models import WeatherRecord
+
+
+SHEETS_EPOCH = datetime(1899, 12, 30)  # day 0 of Google Sheets date serial numbers
+
+
+class UnsupportedQuery(ValueError):
+    """Raised when a history backend cannot apply the requested filters or pagination"""
+
+
+def to_utc(value: datetime) -> datetime:
+    """Naive UTC form of a datetime; naive inputs are taken as server-local time"""
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def now_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class HistoryFilters:
+    """Optional filters for history queries (all bounds inclusive; naive times are server-local)"""
+    city: Optional[str] = None
+    country: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    min_temp: Optional[float] = None
+    max_temp: Optional[float] = None
+    
+    def is_empty(self) -> bool:
+        return all(value is None for value in vars(self).values())
+
+
+def encode_cursor(recorded_at: datetime, record_id: int) -> str:
+    """Opaque keyset cursor pointing just after (recorded_at, id)"""
+    raw = json.dumps([recorded_at.isoformat(), record_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        recorded_at, record_id = json.loads(raw)
+        return datetime.fromisoformat(recorded_at), int(record_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class HistoryStore(ABC):
+    """Interface for weather history backends"""
+    
+    @abstractmethod
+    def save(self, weather_data: Dict) -> bool:
+        """
+        Save one weather observation
+        
+        Args:
+            weather_data: Dictionary containing weather information
+            
+        Returns:
+            True if successful
+        """
+    
+    @abstractmethod
+    def get_history(self, limit: int = 50) -> List[Dict]:
+        """
+        Get the most recent observations, newest first
+        
+        Args:
+            limit: Maximum number of records to return
+            
+        Returns:
+            List of records keyed like the Google Sheets columns
+        """
+    
+    def query(
+        self,
+        filters: Optional[HistoryFilters] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Filtered, keyset-paginated history, newest first
+        
+        Args:
+            filters: Optional HistoryFilters
+            cursor: next_cursor from a previous page, or None for the first page
+            limit: Page size
+            
+        Returns:
+            (records, next_cursor); next_cursor is None on the last page
+            
+        Raises:
+            UnsupportedQuery: If the backend cannot filter or paginate
+            ValueError: If the cursor is malformed
+        """
+        if (filters is None or filters.is_empty()) and cursor is None:
+            return self.get_history(limit=limit), None
+        raise UnsupportedQuery("This history backend does not support filters or pagination")
+
+
+class SQLHistoryStore(HistoryStore):
+    """History in a SQL table (PostgreSQL, or SQLite for local runs)"""
+    
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self._tables_ready = False
+        self._lock = threading.Lock()
+    
+    def _ensure_table(self):
+        """Create the weather_records table on first use"""
+        if self._tables_ready:
+            return
+        with self._lock:
+            if not self._tables_ready:
+                engine = self.session_factory.kw["bind"]
+                Base.metadata.create_all(bind=engine, tables=[WeatherRecord.__table__])
+                self._tables_ready = True
+    
+    def save(self, weather_data: Dict) -> bool:
+        self._ensure_table()
+        record = WeatherRecord(
+            recorded_at=to_utc(weather_data.get("recorded_at") or now_utc()),
+            city=weather_data.get("city", ""),
+            country=weather_data.get("country", ""),
+            temperature=weather_data.get("temperature", 0),
+            feels_like=weather_data.get("feels_like", 0),
+            humidity=weather_data.get("humidity", 0),
+            pressure=weather_data.get("pressure", 0),
+            description=weather_data.get("description", ""),
+            icon=weather_data.get("icon", ""),
+            wind_speed=weather_data.get("wind_speed", 0),
+            user_id=weather_data.get("user_id")
+        )
+        with self.session_factory() as db:
+            db.add(record)
+            db.commit()
+        return True
+    
+    def get_history(self, limit: int = 50) -> List[Dict]:
+        records, _ = self.query(limit=limit)
+        return records
+    
+    def query(
+        self,
+        filters: Optional[HistoryFilters] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Keyset pagination over (recorded_at, id): each page is an index range
+        scan starting after the previous page's last row, never an OFFSET.
+        """
+        self._ensure_table()
+        filters = filters or HistoryFilters()
+        conditions = []
+        
+        if filters.city is not None:
+            conditions.append(func.lower(WeatherRecord.city) == filters.city.lower())
+        if filters.country is not None:
+            conditions.append(func.lower(WeatherRecord.country) == filters.country.lower())
+        if filters.since is not None:
+            conditions.append(WeatherRecord.recorded_at >= to_utc(filters.since))
+        if filters.until is not None:
+            conditions.append(WeatherRecord.recorded_at <= to_utc(filters.until))
+        if filters.min_temp is not None:
+            conditions.append(WeatherRecord.temperature >= filters.min_temp)
+        if filters.max_temp is not None:
+            conditions.append(WeatherRecord.temperature <= filters.max_temp)
+        if cursor is not None:
+            after_time, after_id = decode_cursor(cursor)
+            conditions.append(or_(
+                WeatherRecord.recorded_at < after_time,
+                and_(WeatherRecord.recorded_at == after_time, WeatherRecord.id < after_id)
+            ))
+        
+        with self.session_factory() as db:
+            rows = (
+                db.query(WeatherRecord)
+                .filter(*conditions)
+                .order_by(WeatherRecord.recorded_at.desc(), WeatherRecord.id.desc())
+                .limit(limit + 1)
+                .all()
+            )
+            page = rows[:limit]
+            next_cursor = None
+            if len(rows) > limit and page:
+                next_cursor = encode_cursor(page[-1].recorded_at, page[-1].id)
+            return [record.to_record() for record in page], next_cursor
+    
+    def is_empty(self) -> bool:
+        self._ensure_table()
+        with self.session_factory() as db:
+            return db.query(WeatherRecord.id).first() is None
+    
+    def import_records(self, records: List[Dict], batch_size: int = 1000) -> int:
+        """
+        Bulk-insert history rows keyed like the Google Sheets columns
+        
+        Args:
+            records: Sheet records, oldest first (timestamps in server-local time)
+            batch_size: Rows per commit
+            
+        Returns:
+            Number of rows imported
+        """
+        self._ensure_table()
+        count = 0
+        with self.session_factory() as db:
+            for start in range(0, len(records), batch_size):
+                db.add_all(_record_from_sheet(record) for record in records[start:start + batch_size])
+                db.commit()
+                count += len(records[start:start + batch_size])
+        return count
+
+
+def _number(value, cast=float):
+    """Sheet cell as a number (blank -> 0)"""
+    return cast(value) if value != "" else cast(0)
+
+
+def _sheet_time(value) -> datetime:
+    """Sheet timestamp (text, or a date serial if the sheet parsed it) in naive UTC"""
+    if isinstance(value, (int, float)):
+        return to_utc(SHEETS_EPOCH + timedelta(days=value))
+    return to_utc(datetime.strptime(str(value), "%Y-%m-%d %H:%M:%S"))
+
+
+def _record_from_sheet(record: Dict) -> WeatherRecord:
+    return WeatherRecord(
+        recorded_at=_sheet_time(record["Timestamp"]),
+        city=str(record["City"]),
+        country=str(record["Country"]),
+        temperature=_number(record["Temperature (°C)"]),
+        feels_like=_number(record["Feels Like (°C)"]),
+        humidity=_number(record["Humidity (%)"], lambda v: int(float(v))),
+        pressure=_number(record["Pressure (hPa)"]),
+        description=str(record["Description"]),
+        icon="",
+        wind_speed=_number(record["Wind Speed (m/s)"])
+    )
+
+
+class SheetsHistoryStore(HistoryStore):
+    """History stored only in Google Sheets"""
+    
+    def __init__(self, sheets_service):
+        self.sheets_service = sheets_service
+    
+    def save(self, weather_data: Dict) -> bool:
+        return self.sheets_service.save_weather(weather_data)
+    
+    def get_history(self, limit: int = 50) -> List[Dict]:
+        return self.sheets_service.get_history(limit=limit)
+
+
+class MirroredHistoryStore(HistoryStore):
+    """
+    Write to a primary store, then copy each save to a mirror in the background
+    
+    Reads are always served by the primary. Mirror failures are logged and
+    never fail the request.
+    """
+    
+    def __init__(self, primary: HistoryStore, mirror: HistoryStore):
+        self.primary = primary
+        self.mirror = mirror
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-mirror")
+    
+    def save(self, weather_data: Dict) -> bool:
+        weather_data = dict(weather_data, recorded_at=weather_data.get("recorded_at") or now_utc())
+        success = self.primary.save(weather_data)
+        self._executor.submit(self._mirror, weather_data)
+        return success
+    
+    def _mirror(self, weather_data: Dict):
+        try:
+            self.mirror.save(weather_data)
+        except Exception as e:
+            print(f"⚠️  History mirror write failed: {str(e)}")
+    
+    def get_history(self, limit: int = 50) -> List[Dict]:
+        return self.primary.get_history(limit=limit)
+    
+    def query(self, filters=None, cursor=None, limit: int = 50):
+        return self.primary.query(filters=filters, cursor=cursor, limit=limit)
+    
+    def close(self):
+        """Wait for queued mirror writes"""
+        self._executor.shutdown(wait=True)
+
+
+def _history_session_factory():
+    """Session factory for HISTORY_DATABASE_URL, or the main database if unset"""
+    if not Config.HISTORY_DATABASE_URL:
+        from backend.database import SessionLocal
+        return SessionLocal
+    
+    url = Config.HISTORY_DATABASE_URL
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def build_history_store() -> HistoryStore:
+    """Create the configured history backend (HISTORY_BACKEND=sql|sheets)"""
+    from backend.services.sheets_service import sheets_service
+    
+    if Config.HISTORY_BACKEND == "sheets":
+        return SheetsHistoryStore(sheets_service)
+    
+    store = SQLHistoryStore(_history_session_factory())
+    if Config.HISTORY_SHEETS_MIRROR and sheets_service.initialized:
+        return MirroredHistoryStore(store, SheetsHistoryStore(sheets_service))
+    return store
+
+def sql_store(store: HistoryStore) -> Optional[SQLHistoryStore]:
+    """The SQL store behind a configured backend, if any"""
+    if isinstance(store, MirroredHistoryStore):
+        store = store.primary
+    return store if isinstance(store, SQLHistoryStore) else None
+
+
+def needs_backfill(store: HistoryStore) -> bool:
+    """True if the SQL table is empty while Google Sheets holds the history"""
+    from backend.services.sheets_service import sheets_service
+    
+    sql = sql_store(store)
+    return sql is not None and sheets_service.initialized and sql.is_empty()
+
+
+def backfill_from_sheets(store: HistoryStore) -> int:
+    """
+    One-time import of the Google Sheet history into an empty SQL table
+    
+    Returns:
+        Number of rows imported
+        
+    Raises:
+        ValueError: If the backend is not SQL, Sheets is unavailable, or the table already has rows
+    """
+    from backend.services.sheets_service import sheets_service
+    
+    sql = sql_store(store)
+    if sql is None:
+        raise ValueError("HISTORY_BACKEND is not sql; nothing to backfill")
+    if not sheets_service.initialized:
+        raise ValueError("Google Sheets is not available")
+    if not sql.is_empty():
+        raise ValueError("weather_records already has rows; backfill only runs on an empty table")
+    return sql.import_records(sheets_service.all_records())
+
+# Singleton instance
+history_store = build_history_store()
+
+
+if __name__ == "__main__":
+    print("🔧 Importing Google Sheets history into weather_records...")
+    try:
+        print(f"✅ Imported {backfill_from_sheets(history_store)} rows")
+    except ValueError as e:
+        print(f"ℹ️  {e}")
+    finally:
+        if hasattr(history_store, "close"):
+            history_store.close()
@@ -0,0 +1,281 @@
+"""
+Live weather subscriptions (Server-Sent Events)
+
+Each subscribed city has one refresh loop that reads it through the
+forecast cache once per model run and fans the update out to every
+subscriber, so open tabs no longer poll /api/weather/{city}.
+
+Every connection holds at most one pending event per city: a newer
+update replaces an undelivered one, so a slow client only ever skips
+intermediate states and its memory stays bounded. A client that has left
+an event or heartbeat undelivered for LIVE_STALL_TIMEOUT is disconnected,
+checked on every publish and every heartbeat interval.
+"""
+import asyncio
+import random
+import time
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from backend.config import Config
+from backend.fast_json import dumps
+from backend.tracing import detached_task
+from backend.services.weather_service import async_weather_service
+
+HEARTBEAT = b": ping\n\n"
+
+
+class LiveHubFull(Exception):
+    """Raised when the worker already holds LIVE_MAX_SUBSCRIBERS connections"""
+
+
+def _frame(event: str, payload: Dict, event_id: str = "") -> bytes:
+    """One SSE message (encoded once, shared by every subscriber)"""
+    head = f"event: {event}\n" + (f"id: {event_id}\n" if event_id else "")
+    return head.encode() + b"data: " + dumps(payload) + b"\n\n"
+
+
+class Subscription:
+    """One streaming connection: its cities and the latest undelivered event per city"""
+    __slots__ = ("cities", "pending", "pending_since", "wakeup", "superseded", "closed", "reason")
+
+    def __init__(self, cities: List[str]):
+        self.cities = cities
+        self.pending: Dict[str, bytes] = {}
+        self.pending_since: Optional[float] = None
+        self.wakeup = asyncio.Event()
+        self.superseded = 0
+        self.closed = False
+        self.reason = ""
+
+    def stalled(self, now: float) -> bool:
+        """Whether something has been waiting for the client longer than LIVE_STALL_TIMEOUT"""
+        return self.pending_since is not None and now - self.pending_since > Config.LIVE_STALL_TIMEOUT
+
+    def offer(self, key: str, frame: bytes, now: float) -> bool:
+        """Queue an event; False if the consumer has stalled and the subscription was closed"""
+        if self.closed:
+            return False
+        if self.stalled(now):
+            self.close("slow consumer")
+            return False
+        if key in self.pending:
+            self.superseded += 1
+            del self.pending[key]  # re-insert so events stay in arrival order
+        if self.pending_since is None:
+            self.pending_since = now
+        self.pending[key] = frame
+        self.wakeup.set()
+        return True
+
+    def take(self) -> Optional[bytes]:
+        """Oldest pending event, or None (it counts as undelivered until delivered() is called)"""
+        if not self.pending:
+            return None
+        return self.pending.pop(next(iter(self.pending)))
+
+    def sending(self, now: float):
+        """A heartbeat is being written: a client that stops reading stalls on it too"""
+        if self.pending_since is None:
+            self.pending_since = now
+
+    def delivered(self, now: float):
+        """The client accepted the last event or heartbeat"""
+        self.pending_since = now if self.pending else None
+
+    def close(self, reason: str = ""):
+        if self.closed:
+            return
+        self.closed = True
+        self.reason = reason
+        self.wakeup.set()
+
+
+class _Topic:
+    """Subscribers of one city, its refresh loop and the last event sent"""
+    __slots__ = ("city", "subscribers", "task", "frame", "digest")
+
+    def __init__(self, city: str):
+        self.city = city
+        self.subscribers: Set[Subscription] = set()
+        self.task: Optional[asyncio.Task] = None
+        self.frame: Optional[bytes] = None
+        self.digest = ""
+
+
+class LiveWeatherHub:
+    """
+    Fan-out of current weather to streaming subscribers
+
+    Args:
+        service: AsyncOpenMeteoService used by the refresh loops
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.topics: Dict[str, _Topic] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self.subscribers = 0
+        self.published = 0
+        self.fetch_errors = 0
+        self.slow_disconnects = 0
+
+    @staticmethod
+    def _key(city: str) -> str:
+        return " ".join(city.lower().split())
+
+    def subscribe(self, cities: List[str]) -> Subscription:
+        """
+        Register a connection for one or more cities
+
+        New subscribers get each city's latest event right away; a city's
+        refresh loop starts with its first subscriber.
+
+        Raises:
+            LiveHubFull: Too many open subscriptions on this worker
+        """
+        if self.subscribers >= Config.LIVE_MAX_SUBSCRIBERS:
+            raise LiveHubFull(f"Too many live subscriptions (max {Config.LIVE_MAX_SUBSCRIBERS})")
+
+        names = {}
+        for city in cities:
+            names.setdefault(self._key(city), city.strip())
+        subscription = Subscription(list(names))
+        self.subscribers += 1
+        now = time.time()
+        for key, city in names.items():
+            topic = self.topics.get(key)
+            if topic is None:
+                topic = self.topics[key] = _Topic(city)
+                # Not part of the subscribing request's trace
+                topic.task = detached_task(self._refresh(key, topic))
+            topic.subscribers.add(subscription)
+            if topic.frame is not None:
+                subscription.offer(key, topic.frame, now)
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = detached_task(self._sweep())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Drop a connection; a city's refresh loop stops with its last subscriber"""
+        if subscription.cities is None:
+            return
+        for key in subscription.cities:
+            topic = self.topics.get(key)
+            if topic is None:
+                continue
+            topic.subscribers.discard(subscription)
+            if not topic.subscribers:
+                topic.task.cancel()
+                del self.topics[key]
+        subscription.cities = None
+        subscription.close()
+        self.subscribers -= 1
+
+    async def stream(self, subscription: Subscription) -> AsyncIterator[bytes]:
+        """SSE body for one connection: events as they arrive, heartbeats while idle"""
+        try:
+            while True:
+                frame = subscription.take()
+                if frame is not None:
+                    yield frame
+                    subscription.delivered(time.time())
+                    continue
+                if subscription.closed:
+                    if subscription.reason:
+                        yield _frame("close", {"reason": subscription.reason})
+                    return
+                subscription.wakeup.clear()
+                try:
+                    await asyncio.wait_for(subscription.wakeup.wait(), Config.LIVE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    subscription.sending(time.time())
+                    yield HEARTBEAT
+                    subscription.delivered(time.time())
+        finally:
+            self.unsubscribe(subscription)
+
+    def _publish(self, key: str, topic: _Topic, frame: bytes):
+        topic.frame = frame
+        self.published += 1
+        now = time.time()
+        for subscription in list(topic.subscribers):
+            if not subscription.offer(key, frame, now):
+                if subscription.reason == "slow consumer":
+                    self.slow_disconnects += 1
+                self.unsubscribe(subscription)
+
+    async def _sweep(self):
+        """Disconnect stalled consumers every heartbeat interval, also while their cities publish nothing"""
+        while self.subscribers:
+            await asyncio.sleep(Config.LIVE_HEARTBEAT)
+            now = time.time()
+            stalled = {
+                subscription
+                for topic in self.topics.values()
+                for subscription in topic.subscribers
+                if subscription.stalled(now)
+            }
+            for subscription in stalled:
+                subscription.close("slow consumer")
+                self.slow_disconnects += 1
+                self.unsubscribe(subscription)
+
+    def _retire(self, key: str, topic: _Topic):
+        """Drop a city that cannot be refreshed; subscriptions left without cities are closed"""
+        if self.topics.get(key) is topic:
+            del self.topics[key]
+        for subscription in topic.subscribers:
+            if subscription.cities is not None and key in subscription.cities:
+                subscription.cities.remove(key)
+                if not subscription.cities:
+                    subscription.close("no valid cities")
+
+    async def _refresh(self, key: str, topic: _Topic):
+        """Fetch the city once per model run and publish when the forecast changed"""
+        while True:
+            delay = Config.LIVE_MIN_INTERVAL
+            try:
+                bundle = await self.service.get_forecast_bundle(topic.city)
+            except ValueError as e:
+                # Unknown place: tell subscribers once and stop tracking it
+                self._publish(key, topic, _frame("error", {"city": topic.city, "error": str(e)}))
+                self._retire(key, topic)
+                return
+            except Exception:
+                self.fetch_errors += 1
+            else:
+                if bundle.digest != topic.digest:
+                    topic.digest = bundle.digest
+                    payload = {
+                        "city": topic.city,
+                        "location": bundle.location,
+                        "data": self.service.weather_view(bundle),
+                        "fetched_at": bundle.fetched_at,
+                        "expires_at": bundle.expires_at
+                    }
+                    self._publish(key, topic, _frame("weather", payload, bundle.digest))
+                delay = max(delay, bundle.expires_at - time.time())
+            # Jitter spreads the refreshes of many cities after a model run
+            await asyncio.sleep(delay + random.uniform(0, Config.LIVE_REFRESH_JITTER))
+
+    async def aclose(self):
+        """Close every subscription and stop the refresh loops"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        for topic in list(self.topics.values()):
+            for subscription in list(topic.subscribers):
+                subscription.close("server shutdown")
+            topic.task.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            "subscribers": self.subscribers,
+            "cities": len(self.topics),
+            "published": self.published,
+            "fetch_errors": self.fetch_errors,
+            "slow_disconnects": self.slow_disconnects
+        }
+
+
+# Singleton instance
+live_weather = LiveWeatherHub(async_weather_service)
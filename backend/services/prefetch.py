@@ -0,0 +1,209 @@
+"""
+Background prefetch of hot forecast cells
+
+Every forecast lookup counts towards its grid cell's popularity (an
+exponentially decaying counter). A scheduler keeps the top-K cells fresh
+across model runs: cells it refreshes stay fresh for a lead time past the
+next model boundary, and it refreshes them again inside that window, once
+the new run is available but before their entries expire. Refreshes are
+paced evenly at the per-minute budget, most popular cells first, so a
+model boundary never turns into a burst of upstream requests.
+"""
+import asyncio
+import heapq
+import time
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+MIN_SCORE = 1.0  # roughly one request per half-life; colder cells are never prefetched
+MIN_SLEEP = 0.01  # added to every wait so an early wake-up does not spin
+MAX_SLEEP = 60.0
+
+
+class PopularityCounter:
+    """
+    Request counts per key that halve every `half_life` seconds
+
+    Args:
+        half_life: Seconds for a count to decay to half
+        maxsize: Keys tracked; the less popular half is dropped when full
+    """
+
+    def __init__(self, half_life: float, maxsize: int):
+        self.half_life = half_life
+        self.maxsize = maxsize
+        self._counts: Dict[Hashable, list] = {}  # key -> [score, updated_at, value]
+
+    def _decayed(self, score: float, updated_at: float, now: float) -> float:
+        return score * 0.5 ** ((now - updated_at) / self.half_life)
+
+    def add(self, key: Hashable, value: Any, now: Optional[float] = None):
+        """Count one request for `key`; `value` is kept for the scheduler (e.g. coordinates)"""
+        now = time.time() if now is None else now
+        slot = self._counts.get(key)
+        if slot is None:
+            if len(self._counts) >= self.maxsize:
+                self._trim(now)
+            self._counts[key] = [1.0, now, value]
+        else:
+            slot[0] = self._decayed(slot[0], slot[1], now) + 1
+            slot[1] = now
+            slot[2] = value
+
+    def _trim(self, now: float):
+        ranked = heapq.nlargest(
+            self.maxsize // 2, self._counts.items(),
+            key=lambda item: self._decayed(item[1][0], item[1][1], now)
+        )
+        self._counts = dict(ranked)
+
+    def top(self, k: int, now: Optional[float] = None) -> List[Tuple[float, Hashable, Any]]:
+        """(score, key, value) of the k most popular keys, best first"""
+        now = time.time() if now is None else now
+        return heapq.nlargest(
+            k,
+            ((self._decayed(score, updated_at, now), key, value) for key, (score, updated_at, value) in self._counts.items()),
+            key=lambda item: item[0]
+        )
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+
+class PrefetchScheduler:
+    """
+    Keeps the most requested forecast cells warm
+
+    Args:
+        service: AsyncOpenMeteoService whose forecast cache is refreshed
+        top_k: Cells kept warm
+        budget_per_minute: Upstream requests the scheduler may make per minute (one every 60/budget seconds)
+        half_life: Popularity half-life in seconds
+        tracked: Cells whose popularity is tracked
+        lead: Seconds a refreshed cell stays fresh past the next model boundary,
+            i.e. the window in which the scheduler refreshes it again
+    """
+
+    def __init__(self, service, top_k: int, budget_per_minute: int, half_life: float, tracked: int, lead: float = 0):
+        self.service = service
+        self.top_k = top_k
+        self.budget_per_minute = budget_per_minute
+        self.lead = lead
+        self.popularity = PopularityCounter(half_life, tracked)
+        self._next_slot = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        self._hot: Set[Hashable] = set()
+        self._retry_at: Dict[Hashable, float] = {}  # failed cells wait MAX_SLEEP before the next attempt
+        self.prefetched = 0
+        self.failed = 0
+        self.late = 0
+
+    def record(self, key: Hashable, lat: float, lon: float):
+        """Count a forecast lookup for a cache key (coordinates of the latest request in the cell)"""
+        self.popularity.add(key, (lat, lon))
+
+    def grace(self, key: Hashable) -> float:
+        """Extra freshness for an entry fetched for `key` (the lead while the cell is kept warm, else 0)"""
+        return self.lead if self._task is not None and key in self._hot else 0
+
+    def start(self):
+        """Start the scheduler loop (inside the running event loop)"""
+        if self._task is None and self.top_k > 0 and self.budget_per_minute > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the loop and cancel refreshes still in progress"""
+        tasks = list(self._refreshing.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def due(self, now: float) -> Tuple[List[Tuple[Hashable, float, float, float]], float]:
+        """
+        Hot cells that need a fetch, most popular first
+
+        A cell is due once the model run after its last fetch is available,
+        or right away if it is not cached.
+
+        Returns:
+            (key, lat, lon, expires_at) of due cells (expires_at 0 if not
+            cached), and when the next hot cell becomes due
+        """
+        cache = self.service.forecast_cache
+        due = []
+        # Entries refresh at model-run boundaries, so wake at the next one even if no hot cell is cached yet
+        next_due = min(now + MAX_SLEEP, cache.next_refresh(now))
+        hot = set()
+        for score, key, (lat, lon) in self.popularity.top(self.top_k, now):
+            if score < MIN_SCORE:
+                break
+            hot.add(key)
+            if key in self._refreshing or self._retry_at.get(key, 0) > now:
+                continue
+            entry = cache.peek(key)
+            if entry is None:
+                due.append((key, lat, lon, 0.0))
+                continue
+            due_at = cache.next_refresh(entry.fetched_at)
+            if due_at <= now:
+                due.append((key, lat, lon, entry.expires_at))
+            else:
+                next_due = min(next_due, due_at)
+        self._hot = hot
+        return due, next_due
+
+    async def run_once(self) -> float:
+        """Start the next refresh if one is due and the budget allows; returns when to run next (epoch seconds)"""
+        now = time.time()
+        self._retry_at = {key: at for key, at in self._retry_at.items() if at > now}
+        due, next_due = self.due(now)
+        if not due:
+            return next_due
+        if now < self._next_slot:
+            return self._next_slot
+
+        key, lat, lon, expires_at = due[0]
+        if expires_at <= now:
+            self.late += 1  # already expired (or never cached): lookups were stale or missed meanwhile
+        interval = 60 / self.budget_per_minute
+        # Catch up by at most one slot after an oversleep, never burst
+        self._next_slot = max(self._next_slot, now - interval) + interval
+        task = asyncio.create_task(self.service.refresh(lat, lon, grace=self.lead))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return self._next_slot if len(due) > 1 else min(next_due, self._next_slot)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        self._refreshing.pop(key, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self.failed += 1
+            self._retry_at[key] = time.time() + MAX_SLEEP
+        else:
+            self.prefetched += 1
+
+    async def _run(self):
+        while True:
+            try:
+                next_run = await self.run_once()
+            except Exception as e:
+                print(f"⚠️  Forecast prefetch failed: {str(e)}")
+                next_run = time.time() + MAX_SLEEP
+            await asyncio.sleep(min(MAX_SLEEP, max(0.0, next_run - time.time()) + MIN_SLEEP))
+
+    def stats(self) -> Dict:
+        return {
+            "running": self._task is not None,
+            "tracked": len(self.popularity),
+            "top_k": self.top_k,
+            "budget_per_minute": self.budget_per_minute,
+            "lead": self.lead,
+            "refreshing": len(self._refreshing),
+            "prefetched": self.prefetched,
+            "failed": self.failed,
+            "late": self.late
+        }
@@ -0,0 +1,126 @@
+"""
+Circuit breakers and latency tracking for upstream providers
+"""
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    closed -> open after `failure_threshold` consecutive failures; calls are
+    rejected immediately for `reset_timeout` seconds. Then one trial call is
+    let through (half-open): success closes the circuit, failure re-opens it.
+
+    Args:
+        name: Upstream name (used in errors and stats)
+        failure_threshold: Consecutive failures that open the circuit
+        reset_timeout: Seconds the circuit stays open before a trial call
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_call(self):
+        """
+        Admit a call or raise CircuitOpen
+
+        In the half-open state only one trial call is admitted at a time.
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        self.rejected += 1
+        raise CircuitOpen(f"{self.name} circuit is open, skipping")
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self._trial_in_flight:
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def release(self):
+        """Call finished without a verdict (e.g. cancelled): free the half-open trial slot"""
+        self._trial_in_flight = False
+
+    def stats(self) -> Dict:
+        """Breaker state for monitoring"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected
+        }
+
+
+class LatencyTracker:
+    """
+    Recent latencies of one upstream, for choosing a hedge delay
+
+    Args:
+        window: Number of recent samples kept
+        min_samples: Below this, hedge_delay() returns `default`
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def hedge_delay(self, default: float, low: float, high: float) -> float:
+        """p95 of recent latencies clamped to [low, high], or `default` while warming up"""
+        if len(self._samples) < self.min_samples:
+            return default
+        return min(high, max(low, self.percentile(0.95)))
+
+    def stats(self) -> Dict:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "samples": len(self._samples),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+        }
@@ -1,11 +1,133 @@
 """
 Google Sheets service for reading/writing weather data
 """
+import re
+import threading
+import time
 import gspread
+from collections import deque
+from itertools import islice
 from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime
 from typing import List, Dict, Optional
 from backend.config import Config
+from backend.services.write_buffer import WriteBehindBuffer, WriteBufferFull
+from backend.metrics import upstream_call
+
+SHEET_HEADERS = [
+    "Timestamp", "City", "Country", "Temperature (°C)", 
+    "Feels Like (°C)", "Humidity (%)", "Pressure (hPa)", 
+    "Description", "Wind Speed (m/s)"
+]
+LAST_COLUMN = "I"
+
+
+def row_to_record(row: list) -> Dict:
+    """Map a sheet row to a header-keyed dict like get_all_records()"""
+    return {header: (row[i] if i < len(row) else "") for i, header in enumerate(SHEET_HEADERS)}
+
+
+class SheetHistoryIndex:
+    """
+    Local index of the most recent sheet rows
+    
+    Remembers the last sheet row it has seen and only reads rows after it
+    (one open-ended range read from the tail), keeping the newest rows in a
+    ring buffer. The first load scans backwards from the end of the grid in
+    windows, so reading the latest N rows costs O(N) regardless of sheet size.
+    """
+    
+    def __init__(self, worksheet, capacity: int, refresh_interval: float):
+        self.worksheet = worksheet
+        self.capacity = capacity
+        self.refresh_interval = refresh_interval
+        self.records = deque(maxlen=capacity)  # oldest -> newest
+        self.last_row: Optional[int] = None    # last sheet row reflected in `records`
+        self.appended_through = 0              # last sheet row written by our own appends
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+    
+    def latest(self, limit: int) -> List[Dict]:
+        """Newest-first records, refreshing from the sheet tail when due"""
+        with self._lock:
+            if self.last_row is None:
+                self._load_initial()
+            elif time.monotonic() - self._refreshed_at >= self.refresh_interval:
+                self._load_new_rows()
+            return list(islice(reversed(self.records), limit))
+    
+    def record_append(self, rows: List[list], updated_range: str):
+        """
+        Add rows we appended ourselves, if they directly follow the known tail
+        
+        Args:
+            rows: Rows written by append_rows
+            updated_range: `updates.updatedRange` from the append response (e.g. "Sheet1!A12:I14")
+        """
+        match = re.search(r"![A-Z]+(\d+):[A-Z]+(\d+)$", updated_range or "")
+        with self._lock:
+            if match:
+                self.appended_through = max(self.appended_through, int(match.group(2)))
+            if self.last_row is None:
+                return
+            if match and int(match.group(1)) == self.last_row + 1:
+                self.records.extend(row_to_record(row) for row in rows)
+                self.last_row = int(match.group(2))
+            else:
+                # Someone else wrote in between; pick everything up on the next read
+                self._refreshed_at = 0.0
+    
+    def watermark(self) -> int:
+        """
+        Last sheet row known to be written, without a Sheets call once loaded
+        
+        Every row up to it is already in the sheet, and rows appended later
+        land after it, so read_tail(count, end=watermark()) sees exactly the
+        rows written before this call.
+        """
+        with self._lock:
+            if self.last_row is None:
+                self._load_initial()
+            return max(self.last_row, self.appended_through)
+    
+    def read_tail(self, count: int, end: Optional[int] = None) -> List[Dict]:
+        """Newest-first last `count` non-empty rows up to sheet row `end` (default: the whole grid), read backwards in windows"""
+        rows, _ = self._scan_tail(count, end)
+        return [row_to_record(row) for row in reversed(rows)]
+    
+    def _scan_tail(self, count: int, end: Optional[int] = None):
+        """Return (last `count` non-empty rows oldest-first, sheet row number of the last one)"""
+        end = end or max(self.worksheet.row_count, 1)
+        window = max(count, 200)
+        rows: List[list] = []
+        last_row = None
+        while end > 1 and len(rows) < count:
+            start = max(2, end - window + 1)
+            with upstream_call("google_sheets"):
+                values = self.worksheet.get(f"A{start}:{LAST_COLUMN}{end}", value_render_option="UNFORMATTED_VALUE")
+            filled = [i for i, row in enumerate(values) if any(cell != "" for cell in row)]
+            if last_row is None and filled:
+                last_row = start + filled[-1]
+            rows = [values[i] for i in filled] + rows
+            end = start - 1
+        return rows[-count:], (last_row or 1)
+    
+    def _load_initial(self):
+        rows, last_row = self._scan_tail(self.capacity)
+        self.records.clear()
+        self.records.extend(row_to_record(row) for row in rows)
+        self.last_row = last_row
+        # The grid may have grown since the worksheet metadata was fetched
+        self._load_new_rows()
+    
+    def _load_new_rows(self):
+        with upstream_call("google_sheets"):
+            values = self.worksheet.get(f"A{self.last_row + 1}:{LAST_COLUMN}", value_render_option="UNFORMATTED_VALUE")
+        self.records.extend(row_to_record(row) for row in values if any(cell != "" for cell in row))
+        self.last_row += len(values)
+        self._refreshed_at = time.monotonic()
+    
+
 
 class SheetsService:
     """Service for interacting with Google Sheets"""
@@ -14,10 +136,25 @@ class SheetsService:
         self.sheet_id = Config.GOOGLE_SHEET_ID
         self.credentials_dict = Config.GOOGLE_CREDENTIALS_JSON
         self.worksheet = None
+        self.write_buffer = None
+        self.history_index = None
         self.initialized = False
         try:
             self._initialize_sheet()
             self.initialized = True
+            self.history_index = SheetHistoryIndex(
+                self.worksheet,
+                capacity=Config.HISTORY_CACHE_ROWS,
+                refresh_interval=Config.HISTORY_REFRESH_INTERVAL
+            )
+            self.write_buffer = WriteBehindBuffer(
+                flush_fn=self._append_rows,
+                max_rows=Config.SHEETS_BUFFER_MAX_ROWS,
+                batch_size=Config.SHEETS_BATCH_SIZE,
+                flush_interval=Config.SHEETS_FLUSH_INTERVAL,
+                spill_path=Config.SHEETS_SPILL_PATH or None,
+                put_timeout=Config.SHEETS_PUT_TIMEOUT
+            )
         except Exception as e:
             print(f"⚠️  WARNING: Google Sheets initialization failed: {str(e)}")
             print(f"⚠️  Weather functionality will work, but saving to Sheets will be disabled.")
@@ -49,16 +186,13 @@ class SheetsService:
         """Ensure the sheet has proper headers"""
         try:
             # Check if first row has headers
-            first_row = self.worksheet.row_values(1)
+            with upstream_call("google_sheets"):
+                first_row = self.worksheet.row_values(1)
             
             if not first_row or first_row[0] != "Timestamp":
                 # Set headers
-                headers = [
-                    "Timestamp", "City", "Country", "Temperature (°C)", 
-                    "Feels Like (°C)", "Humidity (%)", "Pressure (hPa)", 
-                    "Description", "Wind Speed (m/s)"
-                ]
-                self.worksheet.insert_row(headers, 1)
+                with upstream_call("google_sheets"):
+                    self.worksheet.insert_row(SHEET_HEADERS, 1)
                 
         except Exception as e:
             raise Exception(f"Failed to set headers: {str(e)}")
@@ -67,6 +201,9 @@ class SheetsService:
         """
         Save weather data to Google Sheets
         
+        The row is acknowledged once it is in the write-behind buffer (and its
+        spill file); it reaches the sheet with the next batched append_rows call.
+        
         Args:
             weather_data: Dictionary containing weather information
             
@@ -80,7 +217,8 @@ class SheetsService:
             )
         
         try:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            # Server-local time; a timezone-aware recorded_at (from the SQL mirror) is converted
+            timestamp = (weather_data.get("recorded_at") or datetime.now()).astimezone().strftime("%Y-%m-%d %H:%M:%S")
             
             row = [
                 timestamp,
@@ -94,16 +232,39 @@ class SheetsService:
                 weather_data.get("wind_speed", 0)
             ]
             
-            self.worksheet.append_row(row)
+            self.write_buffer.put(row)
             return True
             
+        except WriteBufferFull:
+            raise
         except Exception as e:
             raise Exception(f"Failed to save to Google Sheets: {str(e)}")
     
+    def all_records(self) -> List[Dict]:
+        """Every non-empty data row, oldest first (one range read; used to backfill the SQL store)"""
+        with upstream_call("google_sheets"):
+            values = self.worksheet.get(f"A2:{LAST_COLUMN}", value_render_option="UNFORMATTED_VALUE")
+        return [row_to_record(row) for row in values if any(cell != "" for cell in row)]
+    
+    def _append_rows(self, rows: List[list]):
+        """Write a batch of buffered rows with a single Sheets API call"""
+        with upstream_call("google_sheets"):
+            response = self.worksheet.append_rows(rows)
+        updated_range = (response or {}).get("updates", {}).get("updatedRange", "")
+        self.history_index.record_append(rows, updated_range)
+    
+    def close(self):
+        """Flush buffered rows (call on application shutdown)"""
+        if self.write_buffer is not None:
+            self.write_buffer.close()
+    
     def get_history(self, limit: int = 50) -> List[Dict]:
         """
         Get historical weather data from Google Sheets
         
+        Served from the local history index (plus rows still waiting in the
+        write buffer); only rows added since the last read are fetched.
+        
         Args:
             limit: Maximum number of records to return
             
@@ -117,13 +278,24 @@ class SheetsService:
             )
         
         try:
-            # Get all records
-            all_records = self.worksheet.get_all_records()
-            
-            # Return latest records (reverse order)
-            recent_records = list(reversed(all_records))[:limit]
+            # No flush in between, so a row is either still pending or already in the index, never both
+            with self.write_buffer.paused():
+                # Rows not flushed yet are the newest ones
+                pending = [
+                    row_to_record(row)
+                    for row in islice(reversed(self.write_buffer.pending()), limit)
+                ]
+                
+                remaining = limit - len(pending)
+                if remaining <= 0:
+                    return pending
+                if remaining <= self.history_index.capacity:
+                    return pending + self.history_index.latest(remaining)
+                # Rows flushed from now on land after the watermark
+                watermark = self.history_index.watermark()
             
-            return recent_records
+            # Larger than the ring buffer: read just enough rows from the tail, without holding off flushes
+            return pending + self.history_index.read_tail(remaining, end=watermark)
             
         except Exception as e:
             raise Exception(f"Failed to read from Google Sheets: {str(e)}")
@@ -0,0 +1,66 @@
+"""
+Request coalescing for concurrent identical upstream calls
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent async calls by key
+
+    The first caller for a key starts the call; every caller that arrives
+    while it is in flight awaits the same result (or exception) instead of
+    issuing its own upstream request.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn() once per key among concurrent callers
+
+        Args:
+            key: Identity of the call
+            fn: Zero-argument coroutine function performing the call
+
+        Returns:
+            The shared result of fn()
+        """
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.followers += 1
+
+        # Shield so that one cancelled caller does not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether a call for `key` is currently in flight"""
+        return key in self._calls
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict:
+        """Coalescing counters for monitoring"""
+        return {
+            "in_flight": len(self._calls),
+            "upstream_calls": self.leaders,
+            "coalesced_calls": self.followers
+        }
@@ -0,0 +1,83 @@
+"""
+Typeahead suggestions learned from geocoding results
+"""
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, List, Tuple
+
+from backend.services.gazetteer import normalize
+
+PlaceKey = Tuple[str, float, float]
+
+
+def place_key(location: Dict) -> PlaceKey:
+    """Identity of a place across providers: normalized name and ~1 km rounded coordinates"""
+    return normalize(location.get("name", "")), round(float(location["lat"]), 2), round(float(location["lon"]), 2)
+
+
+class SuggestionIndex:
+    """
+    Places returned by geocode_location, searchable by name prefix
+
+    Names live in a sorted list, so a prefix lookup is one bisect plus a
+    short scan. Each place counts how often it was the chosen (first)
+    result, which is used as its popularity.
+
+    Args:
+        maxsize: Places kept; the least popular is evicted when full
+        scan: Max names examined per lookup (bounds latency for 1-letter prefixes)
+    """
+
+    def __init__(self, maxsize: int = 10000, scan: int = 1024):
+        self.maxsize = maxsize
+        self.scan = scan
+        self._names: List[Tuple[str, PlaceKey]] = []
+        self._entries: Dict[PlaceKey, list] = {}  # key -> [location, popularity]
+        self._lock = threading.Lock()
+
+    def record(self, locations: List[Dict]):
+        """Learn geocoding results; the first one counts as picked"""
+        with self._lock:
+            for position, location in enumerate(locations):
+                try:
+                    key = place_key(location)
+                except (KeyError, TypeError, ValueError):
+                    continue
+                entry = self._entries.get(key)
+                if entry is None:
+                    if len(self._entries) >= self.maxsize:
+                        self._evict()
+                    entry = self._entries[key] = [{
+                        field: location.get(field, "") for field in ("name", "country", "state", "lat", "lon", "type")
+                    }, 0]
+                    insort(self._names, (key[0], key))
+                if position == 0:
+                    entry[1] += 1
+
+    def _evict(self):
+        key = min(self._entries, key=lambda k: self._entries[k][1])
+        del self._entries[key]
+        self._names.pop(bisect_left(self._names, (key[0], key)))
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Tuple[Dict, int]]:
+        """
+        Learned places whose name starts with `prefix`, most popular first
+
+        Returns:
+            [(location, popularity)]
+        """
+        text = normalize(prefix)
+        if not text:
+            return []
+        matches = []
+        with self._lock:
+            index = bisect_left(self._names, (text,))
+            end = min(len(self._names), index + self.scan)
+            while index < end and self._names[index][0].startswith(text):
+                matches.append(self._entries[self._names[index][1]])
+                index += 1
+        matches.sort(key=lambda entry: -entry[1])
+        return [(dict(location), popularity) for location, popularity in matches[:limit]]
+
+    def stats(self) -> Dict:
+        return {"size": len(self._entries), "maxsize": self.maxsize}
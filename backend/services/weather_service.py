@@ -2,68 +2,626 @@
 Open-Meteo Weather Service - FREE, No API Key Required!
 Supports villages and small locations via coordinates
 """
-import requests
-from typing import Optional, Dict, List
+import asyncio
+import time
+import httpx
+from dataclasses import dataclass
+from typing import Optional, Dict, List, Union
 from datetime import datetime
+from backend.config import Config
 from backend.models import WeatherData
+from backend.services.cache import TTLCache, ForecastCache, CacheEntry, MISSING
+from backend.services.singleflight import SingleFlight
+from backend.services.resilience import CircuitBreaker, CircuitOpen, LatencyTracker
+from backend.services.gazetteer import gazetteer
+from backend.services.suggest import SuggestionIndex, place_key
+from backend.services.prefetch import PrefetchScheduler
+from backend.metrics import upstream_call, UPSTREAM_BACKGROUND_FAILURES
+from backend.tracing import span, current_span
+
+CURRENT_VARIABLES = "temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,weather_code,wind_speed_10m,pressure_msl"
+HOURLY_VARIABLES = "temperature_2m,relative_humidity_2m,apparent_temperature,precipitation_probability,weather_code,wind_speed_10m"
+DAILY_VARIABLES = "temperature_2m_max,temperature_2m_min,precipitation_probability_max,weather_code,wind_speed_10m_max"
+NOMINATIM_HEADERS = {
+    "User-Agent": "WeatherApp/1.0"
+}
+
+# WMO weather code -> description
+WEATHER_DESCRIPTIONS = {
+    0: "Clear Sky",
+    1: "Mainly Clear",
+    2: "Partly Cloudy",
+    3: "Overcast",
+    45: "Foggy",
+    48: "Depositing Rime Fog",
+    51: "Light Drizzle",
+    53: "Moderate Drizzle",
+    55: "Dense Drizzle",
+    61: "Slight Rain",
+    63: "Moderate Rain",
+    65: "Heavy Rain",
+    71: "Slight Snow",
+    73: "Moderate Snow",
+    75: "Heavy Snow",
+    77: "Snow Grains",
+    80: "Slight Rain Showers",
+    81: "Moderate Rain Showers",
+    82: "Violent Rain Showers",
+    85: "Slight Snow Showers",
+    86: "Heavy Snow Showers",
+    95: "Thunderstorm",
+    96: "Thunderstorm with Slight Hail",
+    99: "Thunderstorm with Heavy Hail"
+}
+
+
+def _rounded(values: List, count: int) -> List:
+    """First `count` values rounded to one decimal"""
+    return [round(value, 1) for value in values[:count]]
+
+
+def _padded(values: List, count: int, fill=0) -> List:
+    """First `count` values, padded with `fill` if the column is shorter"""
+    values = values[:count]
+    return values + [fill] * (count - len(values))
+
+
+def _labels(stamps: List[datetime], fmt: str, key) -> List[str]:
+    """strftime labels, formatted once per distinct key(stamp) and shared"""
+    formatted: Dict = {}
+    labels = []
+    for stamp in stamps:
+        k = key(stamp)
+        label = formatted.get(k)
+        if label is None:
+            label = formatted[k] = stamp.strftime(fmt)
+        labels.append(label)
+    return labels
+
+
+@dataclass
+class ForecastBundle:
+    """One geocoded location plus a combined current/hourly/daily forecast response"""
+    location: Dict
+    data: Dict
+    fetched_at: float
+    expires_at: float
+    digest: str = ""
+
 
 class OpenMeteoService:
-    """Service for Open-Meteo API (Free, unlimited)"""
-    
+    """
+    Service for Open-Meteo API (Free, unlimited)
+
+    Holds the caches, the local gazetteer lookups and the request building and
+    response mapping; the upstream calls live in AsyncOpenMeteoService.
+    """
+
     def __init__(self):
         self.weather_url = "https://api.open-meteo.com/v1/forecast"
         self.geocoding_url = "https://photon.komoot.io/api/"
         self.nominatim_url = "https://nominatim.openstreetmap.org/search"
-    
-    def geocode_location(self, query: str, limit: int = 5) -> List[Dict]:
+        self.gazetteer = gazetteer
+        self.gazetteer_errors = 0
+        self.suggestions = SuggestionIndex(maxsize=Config.SUGGEST_LEARNED_SIZE)
+        self.geocode_cache = TTLCache(
+            maxsize=Config.GEOCODE_CACHE_SIZE,
+            ttl=Config.GEOCODE_CACHE_TTL,
+            negative_ttl=Config.GEOCODE_NEGATIVE_TTL
+        )
+        self.forecast_cache = ForecastCache(
+            maxsize=Config.FORECAST_CACHE_SIZE,
+            grid=Config.FORECAST_GRID_DEGREES,
+            update_interval=Config.MODEL_UPDATE_INTERVAL,
+            update_offset=Config.MODEL_UPDATE_OFFSET,
+            stale_ttl=Config.FORECAST_STALE_TTL
+        )
+
+    def _geocode_local(self, query: str, limit: int, fuzzy: bool = False) -> List[Dict]:
+        """Offline lookup in the gazetteer index, exact names or near misses ([] if disabled or no match)"""
+        if self.gazetteer is None or (fuzzy and not Config.GAZETTEER_FUZZY):
+            return []
+        try:
+            return self.gazetteer.search(query, limit=limit, fuzzy=fuzzy)
+        except Exception as e:
+            # Fall through to the remote geocoders; counted in /api/stats and recorded on the trace
+            self.gazetteer_errors += 1
+            current_span().set("gazetteer.error", str(e))
+            return []
+
+    def reverse_geocode(self, lat: float, lon: float) -> Dict:
+        """
+        Location dict for a coordinate, named after the nearest gazetteer place
+
+        The coordinates themselves are kept; only the name, state and country
+        come from the gazetteer.
+        Without a gazetteer, or with no place within REVERSE_GEOCODE_MAX_KM,
+        the location is named after its coordinates.
+
+        Args:
+            lat: Latitude
+            lon: Longitude
+
+        Returns:
+            Location dict
+        """
+        location = self._coordinate_location(lat, lon)
+        if self.gazetteer is None:
+            return location
+        try:
+            place = self.gazetteer.reverse(lat, lon, max_km=Config.REVERSE_GEOCODE_MAX_KM)
+        except Exception as e:
+            self.gazetteer_errors += 1
+            current_span().set("gazetteer.error", str(e))
+            return location
+        if place:
+            location.update({
+                "name": place["name"],
+                "country": place["country"],
+                "state": place["state"],
+                "distance_km": place["distance_km"]
+            })
+        return location
+
+    def suggest(self, query: str, limit: int = 8) -> List[Dict]:
+        """
+        Typeahead suggestions for a partial place name (no upstream calls)
+
+        Places previously returned by geocode_location are ranked by how often
+        they were picked, ahead of gazetteer places ranked by population.
+
+        Args:
+            query: Name prefix as typed
+            limit: Max results
+
+        Returns:
+            List of locations (with "popularity" and, when known, "population")
+        """
+        merged: Dict = {}
+        for location, popularity in self.suggestions.suggest(query, limit):
+            merged[place_key(location)] = {**location, "popularity": popularity}
+        if self.gazetteer is not None:
+            for location in self.gazetteer.prefix(query, limit):
+                known = merged.get(place_key(location))
+                if known is not None:
+                    known["population"] = location["population"]
+                else:
+                    merged[place_key(location)] = {**location, "popularity": 0}
+        ranked = sorted(merged.values(), key=lambda l: (-l["popularity"], -l.get("population", 0)))
+        return ranked[:limit]
+
+    # ===== Request building and response mapping =====
+
+    def _geocode_key(self, query: str, limit: int):
+        """Cache key: case- and whitespace-insensitive query plus limit"""
+        return (" ".join(query.lower().split()), limit)
+
+    def _bundle(self, location: Dict, entry: CacheEntry) -> ForecastBundle:
+        """Wrap a cached forecast payload for a location"""
+        return ForecastBundle(
+            location=location,
+            data=entry.value,
+            fetched_at=entry.fetched_at,
+            expires_at=entry.expires_at,
+            digest=entry.digest
+        )
+
+    def _first_location(self, city: str, locations: List[Dict]) -> Dict:
+        """Return the best geocoding match or raise ValueError"""
+        if not locations:
+            raise ValueError(f"Location '{city}' not found")
+        return locations[0]
+
+    def _coordinate_location(self, lat: float, lon: float) -> Dict:
+        """Location dict for a raw coordinate pair (no geocoding)"""
+        return {
+            "name": f"{lat:.4f}, {lon:.4f}",
+            "country": "",
+            "state": "",
+            "lat": lat,
+            "lon": lon,
+            "type": "coordinates"
+        }
+
+    def _forecast_params(self, lat, lon) -> Dict:
+        """Open-Meteo query parameters for current + hourly + 7-day daily data in one call (lat/lon may be comma-separated lists)"""
+        return {
+            "latitude": lat,
+            "longitude": lon,
+            "current": CURRENT_VARIABLES,
+            "hourly": HOURLY_VARIABLES,
+            "daily": DAILY_VARIABLES,
+            "timezone": "auto",
+            "forecast_days": 7
+        }
+
+    def _parse_photon(self, data: Dict) -> List[Dict]:
+        """Map a Photon GeoJSON response to location dicts"""
+        locations = []
+
+        for feature in data.get("features", []):
+            props = feature.get("properties", {})
+            coords = feature.get("geometry", {}).get("coordinates", [])
+
+            if len(coords) >= 2:
+                locations.append({
+                    "name": props.get("name", "Unknown"),
+                    "country": props.get("country", ""),
+                    "state": props.get("state", ""),
+                    "lat": coords[1],
+                    "lon": coords[0],
+                    "type": props.get("type", "location")
+                })
+
+        return locations
+
+    def _parse_nominatim(self, data: List[Dict]) -> List[Dict]:
+        """Map a Nominatim search response to location dicts"""
+        locations = []
+
+        for item in data:
+            locations.append({
+                "name": item.get("display_name", "").split(",")[0],
+                "country": item.get("display_name", "").split(",")[-1].strip(),
+                "state": "",
+                "lat": float(item.get("lat", 0)),
+                "lon": float(item.get("lon", 0)),
+                "type": item.get("type", "location")
+            })
+
+        return locations
+
+    def _build_weather_data(self, location: Dict, data: Dict) -> WeatherData:
+        """Build WeatherData from the `current` block of a forecast response"""
+        current = data.get("current", {})
+
+        # Map weather code to description
+        weather_code = current.get("weather_code", 0)
+        description = self._get_weather_description(weather_code)
+        icon = self._get_weather_icon(weather_code)
+
+        return WeatherData(
+            city=location["name"],
+            temperature=round(current.get("temperature_2m", 0), 1),
+            feels_like=round(current.get("apparent_temperature", 0), 1),
+            humidity=current.get("relative_humidity_2m", 0),
+            pressure=current.get("pressure_msl", 0),
+            description=description,
+            icon=icon,
+            wind_speed=round(current.get("wind_speed_10m", 0), 1),
+            country=location.get("country", "")
+        )
+
+    def _build_hourly_forecast(self, data: Dict) -> List[Dict]:
+        """Build the 48-hour list from the `hourly` block of a forecast response"""
+        return self._rows(self._build_hourly_columns(data))
+
+    def _build_hourly_columns(self, data: Dict) -> Dict[str, List]:
+        """
+        Build the 48-hour forecast as parallel arrays, one list per field
+
+        Date/time labels and weather-code lookups are computed once per
+        distinct value instead of once per hour.
+        """
+        hourly = data.get("hourly", {})
+        times = hourly.get("time", [])[:48]
+        count = len(times)
+        stamps = [datetime.fromisoformat(t.replace('Z', '+00:00')) for t in times]
+        descriptions, icons = self._code_columns(hourly.get("weather_code", [])[:count])
+
+        return {
+            "dt": [int(dt.timestamp()) for dt in stamps],
+            "time": _labels(stamps, "%I:%M %p", lambda dt: (dt.hour, dt.minute)),
+            "date": _labels(stamps, "%a, %b %d", lambda dt: dt.date()),
+            "temp": _rounded(hourly.get("temperature_2m", []), count),
+            "feels_like": _rounded(hourly.get("apparent_temperature", []), count),
+            "humidity": hourly.get("relative_humidity_2m", [])[:count],
+            "description": descriptions,
+            "icon": icons,
+            "pop": _padded(hourly.get("precipitation_probability", []), count),
+            "wind_speed": _rounded(hourly.get("wind_speed_10m", []), count)
+        }
+
+    def _build_daily_forecast(self, data: Dict) -> List[Dict]:
+        """Build the 7-day list from the `daily` block of a forecast response"""
+        return self._rows(self._build_daily_columns(data))
+
+    def _build_daily_columns(self, data: Dict) -> Dict[str, List]:
+        """Build the 7-day forecast as parallel arrays, one list per field"""
+        daily = data.get("daily", {})
+        times = daily.get("time", [])
+        count = len(times)
+        stamps = [datetime.fromisoformat(t) for t in times]
+        temp_max = daily.get("temperature_2m_max", [])[:count]
+        temp_min = daily.get("temperature_2m_min", [])[:count]
+        descriptions, icons = self._code_columns(daily.get("weather_code", [])[:count])
+
+        return {
+            "dt": [int(dt.timestamp()) for dt in stamps],
+            "date": [dt.strftime("%a, %b %d") for dt in stamps],
+            "temp_min": _rounded(temp_min, count),
+            "temp_max": _rounded(temp_max, count),
+            "temp_avg": [round((high + low) / 2, 1) for high, low in zip(temp_max, temp_min)],
+            "humidity": [0] * count,  # Not available in daily
+            "description": descriptions,
+            "icon": icons,
+            "pop": _padded(daily.get("precipitation_probability_max", []), count),
+            "wind_speed": _rounded(daily.get("wind_speed_10m_max", []), count)
+        }
+
+    def _code_columns(self, codes: List[int]):
+        """Description and icon columns for a weather-code column (one lookup per distinct code)"""
+        labels = {code: (self._get_weather_description(code), self._get_weather_icon(code)) for code in set(codes)}
+        return [labels[code][0] for code in codes], [labels[code][1] for code in codes]
+
+    def _rows(self, columns: Dict[str, List]) -> List[Dict]:
+        """Row-per-entry view of a columnar forecast (the original response format)"""
+        fields = list(columns)
+        return [dict(zip(fields, values)) for values in zip(*columns.values())]
+
+    # ===== Views of a forecast bundle (routes map only after their ETag check) =====
+
+    def weather_view(self, bundle: ForecastBundle) -> WeatherData:
+        """Current conditions from a bundle"""
+        with span("mapping"):
+            return self._build_weather_data(bundle.location, bundle.data)
+
+    def hourly_view(self, bundle: ForecastBundle, columnar: bool = False) -> Union[List[Dict], Dict[str, List]]:
+        """48-hour forecast from a bundle (rows, or parallel arrays with columnar=True)"""
+        with span("mapping"):
+            return self._build_hourly_columns(bundle.data) if columnar else self._build_hourly_forecast(bundle.data)
+
+    def daily_view(self, bundle: ForecastBundle, columnar: bool = False) -> Union[List[Dict], Dict[str, List]]:
+        """7-day forecast from a bundle (rows, or parallel arrays with columnar=True)"""
+        with span("mapping"):
+            return self._build_daily_columns(bundle.data) if columnar else self._build_daily_forecast(bundle.data)
+
+    def dashboard_view(self, bundle: ForecastBundle) -> Dict:
+        """Current, hourly and daily views from a bundle"""
+        with span("mapping"):
+            return self._build_dashboard(bundle)
+
+    def _build_dashboard(self, bundle: ForecastBundle) -> Dict:
+        """Build every city view from one combined forecast response"""
+        return {
+            "location": bundle.location,
+            "current": self._build_weather_data(bundle.location, bundle.data),
+            "hourly": self._build_hourly_forecast(bundle.data),
+            "daily": self._build_daily_forecast(bundle.data)
+        }
+
+    def _get_weather_description(self, code: int) -> str:
+        """Map WMO weather code to description"""
+        return WEATHER_DESCRIPTIONS.get(code, "Unknown")
+
+    def _get_weather_icon(self, code: int) -> str:
+        """Map WMO code to icon code"""
+        # Simplified icon mapping
+        if code == 0:
+            return "01d"
+        elif code in [1, 2]:
+            return "02d"
+        elif code == 3:
+            return "03d"
+        elif code in [45, 48]:
+            return "50d"
+        elif code in [51, 53, 55, 61, 63, 65, 80, 81, 82]:
+            return "10d"
+        elif code in [71, 73, 75, 77, 85, 86]:
+            return "13d"
+        elif code in [95, 96, 99]:
+            return "11d"
+        else:
+            return "01d"
+
+
+class AsyncOpenMeteoService(OpenMeteoService):
+    """
+    Non-blocking Open-Meteo, Photon and Nominatim calls for use inside async routes.
+
+    All upstream calls go through one shared httpx.AsyncClient, so TCP/TLS
+    connections to Photon, Nominatim and Open-Meteo are pooled and kept alive
+    across requests instead of being opened per call.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._revalidating: Dict = {}
+        self.flights = SingleFlight()
+        self.breakers = {
+            name: CircuitBreaker(name, Config.CIRCUIT_FAILURE_THRESHOLD, Config.CIRCUIT_RESET_TIMEOUT)
+            for name in ("photon", "nominatim", "open_meteo")
+        }
+        self.latency = {name: LatencyTracker() for name in self.breakers}
+        self.timeouts = {"photon": Config.GEOCODE_TIMEOUT, "nominatim": Config.GEOCODE_TIMEOUT}
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.prefetch = PrefetchScheduler(
+            self,
+            top_k=Config.PREFETCH_TOP_K,
+            budget_per_minute=Config.PREFETCH_BUDGET_PER_MINUTE,
+            half_life=Config.PREFETCH_HALF_LIFE,
+            tracked=Config.PREFETCH_TRACKED,
+            lead=Config.PREFETCH_LEAD
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared pooled HTTP client (created lazily inside the running loop)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(Config.UPSTREAM_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=Config.UPSTREAM_MAX_CONNECTIONS,
+                    max_keepalive_connections=Config.UPSTREAM_MAX_KEEPALIVE,
+                    keepalive_expiry=Config.UPSTREAM_KEEPALIVE_EXPIRY
+                ),
+                http2=Config.UPSTREAM_HTTP2
+            )
+        return self._client
+
+    async def aclose(self):
+        """Stop prefetching and revalidation, then close the shared client (call on application shutdown)"""
+        await self.prefetch.stop()
+        revalidating = list(self._revalidating.values())
+        for task in revalidating:
+            task.cancel()
+        await asyncio.gather(*revalidating, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_json(self, url: str, params: Dict, headers: Optional[Dict] = None, upstream: str = "open_meteo"):
+        """
+        GET a JSON document from an upstream (timed under `upstream` in /metrics)
+
+        Raises:
+            CircuitOpen: If the upstream's circuit breaker is open (no request is made)
         """
-        Geocode location using Photon (supports villages!)
-        
+        breaker = self.breakers[upstream]
+        breaker.before_call()
+        start = time.perf_counter()
+        try:
+            with span(upstream), upstream_call(upstream):
+                response = await self.client.get(
+                    url, params=params, headers=headers,
+                    timeout=self.timeouts.get(upstream, httpx.USE_CLIENT_DEFAULT)
+                )
+                response.raise_for_status()
+                data = response.json()
+        except asyncio.CancelledError:
+            # Lost a hedge race: the elapsed time is still a useful (lower-bound) sample
+            self.latency[upstream].record(time.perf_counter() - start)
+            breaker.release()
+            raise
+        except httpx.HTTPStatusError as e:
+            status = e.response.status_code
+            if status >= 500 or status == 429:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        self.latency[upstream].record(time.perf_counter() - start)
+        breaker.record_success()
+        return data
+
+    async def geocode_location(self, query: str, limit: int = 5) -> List[Dict]:
+        """
+        Geocode location from the local gazetteer, else Photon falling back to Nominatim
+
+        Exact gazetteer names are answered locally; near-miss spellings from
+        the gazetteer are the last resort, after the remote geocoders found
+        nothing or failed.
+
         Args:
             query: Location name (city, village, etc.)
             limit: Max results
-            
+
         Returns:
             List of locations with coordinates
         """
+        key = self._geocode_key(query, limit)
+        with span("geocode", query=key[0]) as geocode_span:
+            local = self._geocode_local(query, limit)
+            if local:
+                geocode_span.set("cache", "gazetteer")
+                self.suggestions.record(local)
+                return local
+            locations = self.geocode_cache.get(key)
+            geocode_span.set("cache", "miss" if locations is MISSING else "hit")
+            try:
+                if locations is MISSING:
+                    # Concurrent misses for the same query share one upstream lookup
+                    async def load():
+                        result = await self._geocode_remote(query, limit)
+                        self.geocode_cache.set(key, result)
+                        return result
+
+                    locations = await self.flights.do(("geocode",) + key, load)
+            except Exception:
+                locations = self._geocode_local(query, limit, fuzzy=True)
+                if not locations:
+                    raise
+                geocode_span.set("cache", "gazetteer-fuzzy")
+            if not locations:
+                locations = self._geocode_local(query, limit, fuzzy=True)
+                if locations:
+                    geocode_span.set("cache", "gazetteer-fuzzy")
+            self.suggestions.record(locations)
+            return locations
+
+    async def _geocode_remote(self, query: str, limit: int) -> List[Dict]:
+        """
+        Geocode via Photon with Nominatim fallback (uncached)
+
+        A provider whose circuit is open is skipped without waiting. With
+        GEOCODE_HEDGE enabled, Nominatim is raced against a slow Photon call.
+        """
+        if Config.GEOCODE_HEDGE:
+            return await self._geocode_hedged(query, limit)
+
         try:
-            # Try Photon first (better for villages)
-            params = {
-                "q": query,
-                "limit": limit
-            }
-            
-            response = requests.get(self.geocoding_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            locations = []
-            
-            for feature in data.get("features", []):
-                props = feature.get("properties", {})
-                coords = feature.get("geometry", {}).get("coordinates", [])
-                
-                if len(coords) >= 2:
-                    locations.append({
-                        "name": props.get("name", "Unknown"),
-                        "country": props.get("country", ""),
-                        "state": props.get("state", ""),
-                        "lat": coords[1],
-                        "lon": coords[0],
-                        "type": props.get("type", "location")
-                    })
-            
-            # Fallback to Nominatim if Photon fails
+            locations = await self._photon_geocode(query, limit)
+
+            # Fallback to Nominatim if Photon finds nothing
             if not locations:
-                locations = self._nominatim_geocode(query, limit)
-            
+                locations = await self._nominatim_geocode(query, limit)
+
             return locations
-            
+
         except Exception as e:
-            # Try Nominatim as backup
-            return self._nominatim_geocode(query, limit)
-    
-    def _nominatim_geocode(self, query: str, limit: int) -> List[Dict]:
+            # Try Nominatim as backup (immediately if Photon's circuit is open)
+            return await self._nominatim_geocode(query, limit)
+
+    async def _geocode_hedged(self, query: str, limit: int) -> List[Dict]:
+        """
+        Start Photon; if it has not answered within its recent p95 latency, also
+        start Nominatim and use whichever returns a usable result first
+        """
+        photon = asyncio.ensure_future(self._photon_geocode(query, limit))
+        delay = self.latency["photon"].hedge_delay(
+            Config.GEOCODE_HEDGE_DEFAULT_DELAY, Config.GEOCODE_HEDGE_MIN_DELAY, Config.GEOCODE_HEDGE_MAX_DELAY
+        )
+        done, _ = await asyncio.wait({photon}, timeout=delay)
+        if photon in done and not photon.exception() and photon.result():
+            return photon.result()
+
+        hedged = photon not in done
+        if hedged:
+            self.hedges_sent += 1
+        nominatim = asyncio.ensure_future(self._nominatim_geocode(query, limit))
+        pending = {photon, nominatim} - done
+        answered_empty = photon in done and not photon.exception()
+        try:
+            # First non-empty answer wins; empty answers only count once both are in
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    if task.exception():
+                        continue
+                    if task.result():
+                        if hedged and task is nominatim:
+                            self.hedges_won += 1
+                        return task.result()
+                    answered_empty = True
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if answered_empty:
+            return []
+        raise nominatim.exception()
+
+    async def _photon_geocode(self, query: str, limit: int) -> List[Dict]:
+        """Primary geocoding with Photon"""
+        data = await self._get_json(self.geocoding_url, {"q": query, "limit": limit}, upstream="photon")
+        return self._parse_photon(data)
+
+    async def _nominatim_geocode(self, query: str, limit: int) -> List[Dict]:
         """Backup geocoding with Nominatim"""
         try:
             params = {
@@ -71,243 +629,284 @@ class OpenMeteoService:
                 "format": "json",
                 "limit": limit
             }
-            headers = {
-                "User-Agent": "WeatherApp/1.0"
-            }
-            
-            response = requests.get(self.nominatim_url, params=params, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            locations = []
-            
-            for item in data:
-                locations.append({
-                    "name": item.get("display_name", "").split(",")[0],
-                    "country": item.get("display_name", "").split(",")[-1].strip(),
-                    "state": "",
-                    "lat": float(item.get("lat", 0)),
-                    "lon": float(item.get("lon", 0)),
-                    "type": item.get("type", "location")
-                })
-            
-            return locations
-            
+            data = await self._get_json(self.nominatim_url, params, headers=NOMINATIM_HEADERS, upstream="nominatim")
+            return self._parse_nominatim(data)
+
         except Exception as e:
             raise Exception(f"Geocoding failed: {str(e)}")
-    
-    def get_weather(self, city: str) -> Optional[WeatherData]:
+
+    async def get_forecast_bundle(self, city: str) -> ForecastBundle:
+        """Geocode a location and fetch current, hourly and daily data in one call"""
+        location = self._first_location(city, await self.geocode_location(city, limit=1))
+        entry = await self._cached_forecast(location["lat"], location["lon"])
+        return self._bundle(location, entry)
+
+    async def get_forecast_bundle_at(self, lat: float, lon: float) -> ForecastBundle:
+        """Current, hourly and daily data for a coordinate's grid cell (local reverse geocoding, no geocode call)"""
+        with span("geocode", cache="reverse"):
+            location = self.reverse_geocode(lat, lon)
+        entry = await self._cached_forecast(lat, lon)
+        return self._bundle(location, entry)
+
+    async def _cached_forecast(self, lat: float, lon: float) -> CacheEntry:
+        """
+        Forecast payload for the grid cell containing (lat, lon)
+
+        Entries are keyed by grid cell, but the upstream is asked for the
+        caller's own coordinates (so Open-Meteo picks the elevation of the
+        requested point, not of the cell centre); later callers in the same
+        cell share that payload until the next model run. A stale entry is
+        returned immediately and refreshed in the background
+        (stale-while-revalidate); only a miss waits for the upstream.
+        """
+        params = self._forecast_params(lat, lon)
+        key = self.forecast_cache.key(lat, lon, params)
+        self.prefetch.record(key, lat, lon)
+
+        with span("forecast", cell=f"{key[0]},{key[1]}") as forecast_span:
+            entry = self.forecast_cache.get(key)
+            if entry is None:
+                forecast_span.set("cache", "miss")
+                # Concurrent misses for the same cell share one upstream request
+                return await self.flights.do(
+                    ("forecast",) + key, lambda: self._fetch_forecast(key, params, self.prefetch.grace(key))
+                )
+
+            forecast_span.set("cache", "hit" if entry.fresh else "stale")
+            if not entry.fresh:
+                self._schedule_revalidation(key, params)
+            return entry
+
+    async def _fetch_forecast(self, key, params: Dict, grace: float = 0) -> CacheEntry:
+        """Fetch a forecast payload from Open-Meteo and store it in the cache"""
+        return self.forecast_cache.set(key, await self._get_json(self.weather_url, params), grace=grace)
+
+    def forecast_entry(self, lat: float, lon: float) -> Optional[CacheEntry]:
+        """Cached forecast for the grid cell containing (lat, lon), without counting a lookup"""
+        params = self._forecast_params(lat, lon)
+        return self.forecast_cache.peek(self.forecast_cache.key(lat, lon, params))
+
+    async def refresh(self, lat: float, lon: float, grace: float = 0) -> CacheEntry:
         """
-        Get current weather for any location (including villages!)
-        
+        Fetch the forecast for the grid cell containing (lat, lon) now, whatever its cache state
+
+        Shares the upstream request with any miss or revalidation of the
+        same cell already in flight.
+
         Args:
-            city: City/village name
-            
+            lat: Latitude
+            lon: Longitude
+            grace: Seconds the new entry stays fresh past the next model refresh
+
         Returns:
-            WeatherData object
+            The cache entry now stored for the cell
         """
+        params = self._forecast_params(lat, lon)
+        key = self.forecast_cache.key(lat, lon, params)
+        return await self.flights.do(("forecast",) + key, lambda: self._fetch_forecast(key, params, grace))
+
+    def _schedule_revalidation(self, key, params: Dict):
+        """Start a background refresh of a stale entry unless one is already running"""
+        if key not in self._revalidating:
+            self._revalidating[key] = asyncio.create_task(self._revalidate(key, params))
+
+    async def _revalidate(self, key, params: Dict):
+        """Background refresh of a stale forecast entry"""
         try:
-            # First geocode to get coordinates
-            locations = self.geocode_location(city, limit=1)
-            if not locations:
-                raise ValueError(f"Location '{city}' not found")
-            
-            location = locations[0]
-            lat = location["lat"]
-            lon = location["lon"]
-            
-            # Get weather from Open-Meteo
-            params = {
-                "latitude": lat,
-                "longitude": lon,
-                "current": "temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,weather_code,wind_speed_10m,pressure_msl",
-                "timezone": "auto"
-            }
-            
-            response = requests.get(self.weather_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            current = data.get("current", {})
-            
-            # Map weather code to description
-            weather_code = current.get("weather_code", 0)
-            description = self._get_weather_description(weather_code)
-            icon = self._get_weather_icon(weather_code)
-            
-            weather_data = WeatherData(
-                city=location["name"],
-                temperature=round(current.get("temperature_2m", 0), 1),
-                feels_like=round(current.get("apparent_temperature", 0), 1),
-                humidity=current.get("relative_humidity_2m", 0),
-                pressure=current.get("pressure_msl", 0),
-                description=description,
-                icon=icon,
-                wind_speed=round(current.get("wind_speed_10m", 0), 1),
-                country=location.get("country", "")
+            await self.flights.do(
+                ("forecast",) + key, lambda: self._fetch_forecast(key, params, self.prefetch.grace(key))
             )
-            
-            return weather_data
-            
+        except Exception:
+            # Keep serving the stale entry; the next request retries
+            UPSTREAM_BACKGROUND_FAILURES.inc("open_meteo", "forecast_revalidation")
+        finally:
+            self._revalidating.pop(key, None)
+
+    async def get_weather(self, city: str) -> Optional[WeatherData]:
+        """Get current weather for any location (including villages!)"""
+        try:
+            bundle = await self.get_forecast_bundle(city)
+            return self.weather_view(bundle)
+
         except ValueError as e:
             raise e
         except Exception as e:
             raise Exception(f"Failed to fetch weather: {str(e)}")
-    
-    def get_hourly_forecast(self, city: str) -> List[Dict]:
-        """Get 48-hour forecast"""
+
+    async def get_weather_at(self, lat: float, lon: float) -> Dict:
+        """Get current weather for a coordinate, with the reverse-geocoded location"""
         try:
-            locations = self.geocode_location(city, limit=1)
-            if not locations:
-                raise ValueError(f"Location '{city}' not found")
-            
-            location = locations[0]
-            
-            params = {
-                "latitude": location["lat"],
-                "longitude": location["lon"],
-                "hourly": "temperature_2m,relative_humidity_2m,apparent_temperature,precipitation_probability,weather_code,wind_speed_10m",
-                "timezone": "auto",
-                "forecast_days": 2
-            }
-            
-            response = requests.get(self.weather_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            hourly = data.get("hourly", {})
-            
-            forecast = []
-            times = hourly.get("time", [])
-            temps = hourly.get("temperature_2m", [])
-            humidity = hourly.get("relative_humidity_2m", [])
-            feels_like = hourly.get("apparent_temperature", [])
-            pop = hourly.get("precipitation_probability", [])
-            weather_codes = hourly.get("weather_code", [])
-            wind = hourly.get("wind_speed_10m", [])
-            
-            for i in range(min(48, len(times))):
-                dt = datetime.fromisoformat(times[i].replace('Z', '+00:00'))
-                forecast.append({
-                    "dt": int(dt.timestamp()),
-                    "time": dt.strftime("%I:%M %p"),
-                    "date": dt.strftime("%a, %b %d"),
-                    "temp": round(temps[i], 1),
-                    "feels_like": round(feels_like[i], 1),
-                    "humidity": humidity[i],
-                    "description": self._get_weather_description(weather_codes[i]),
-                    "icon": self._get_weather_icon(weather_codes[i]),
-                    "pop": pop[i] if i < len(pop) else 0,
-                    "wind_speed": round(wind[i], 1)
-                })
-            
-            return forecast
-            
+            bundle = await self.get_forecast_bundle_at(lat, lon)
+            return {"location": bundle.location, "data": self.weather_view(bundle)}
+
+        except ValueError as e:
+            raise e
+        except Exception as e:
+            raise Exception(f"Failed to fetch weather: {str(e)}")
+
+    async def get_hourly_forecast(self, city: str, columnar: bool = False) -> Union[List[Dict], Dict[str, List]]:
+        """Get 48-hour forecast (rows, or parallel arrays with columnar=True)"""
+        try:
+            bundle = await self.get_forecast_bundle(city)
+            return self.hourly_view(bundle, columnar)
+
         except Exception as e:
             raise Exception(f"Failed to get hourly forecast: {str(e)}")
-    
-    def get_daily_forecast(self, city: str) -> List[Dict]:
-        """Get 7-day forecast"""
+
+    async def get_daily_forecast(self, city: str, columnar: bool = False) -> Union[List[Dict], Dict[str, List]]:
+        """Get 7-day forecast (rows, or parallel arrays with columnar=True)"""
         try:
-            locations = self.geocode_location(city, limit=1)
-            if not locations:
-                raise ValueError(f"Location '{city}' not found")
-            
-            location = locations[0]
-            
-            params = {
-                "latitude": location["lat"],
-                "longitude": location["lon"],
-                "daily": "temperature_2m_max,temperature_2m_min,precipitation_probability_max,weather_code,wind_speed_10m_max",
-                "timezone": "auto",
-                "forecast_days": 7
-            }
-            
-            response = requests.get(self.weather_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            daily = data.get("daily", {})
-            
-            forecast = []
-            times = daily.get("time", [])
-            temp_max = daily.get("temperature_2m_max", [])
-            temp_min = daily.get("temperature_2m_min", [])
-            pop = daily.get("precipitation_probability_max", [])
-            weather_codes = daily.get("weather_code", [])
-            wind = daily.get("wind_speed_10m_max", [])
-            
-            for i in range(len(times)):
-                dt = datetime.fromisoformat(times[i])
-                temp_avg = (temp_max[i] + temp_min[i]) / 2
-                
-                forecast.append({
-                    "dt": int(dt.timestamp()),
-                    "date": dt.strftime("%a, %b %d"),
-                    "temp_min": round(temp_min[i], 1),
-                    "temp_max": round(temp_max[i], 1),
-                    "temp_avg": round(temp_avg, 1),
-                    "humidity": 0,  # Not available in daily
-                    "description": self._get_weather_description(weather_codes[i]),
-                    "icon": self._get_weather_icon(weather_codes[i]),
-                    "pop": pop[i] if i < len(pop) else 0,
-                    "wind_speed": round(wind[i], 1)
-                })
-            
-            return forecast
-            
+            bundle = await self.get_forecast_bundle(city)
+            return self.daily_view(bundle, columnar)
+
         except Exception as e:
             raise Exception(f"Failed to get daily forecast: {str(e)}")
-    
-    def _get_weather_description(self, code: int) -> str:
-        """Map WMO weather code to description"""
-        weather_codes = {
-            0: "Clear Sky",
-            1: "Mainly Clear",
-            2: "Partly Cloudy",
-            3: "Overcast",
-            45: "Foggy",
-            48: "Depositing Rime Fog",
-            51: "Light Drizzle",
-            53: "Moderate Drizzle",
-            55: "Dense Drizzle",
-            61: "Slight Rain",
-            63: "Moderate Rain",
-            65: "Heavy Rain",
-            71: "Slight Snow",
-            73: "Moderate Snow",
-            75: "Heavy Snow",
-            77: "Snow Grains",
-            80: "Slight Rain Showers",
-            81: "Moderate Rain Showers",
-            82: "Violent Rain Showers",
-            85: "Slight Snow Showers",
-            86: "Heavy Snow Showers",
-            95: "Thunderstorm",
-            96: "Thunderstorm with Slight Hail",
-            99: "Thunderstorm with Heavy Hail"
-        }
-        return weather_codes.get(code, "Unknown")
-    
-    def _get_weather_icon(self, code: int) -> str:
-        """Map WMO code to icon code"""
-        # Simplified icon mapping
-        if code == 0:
-            return "01d"
-        elif code in [1, 2]:
-            return "02d"
-        elif code == 3:
-            return "03d"
-        elif code in [45, 48]:
-            return "50d"
-        elif code in [51, 53, 55, 61, 63, 65, 80, 81, 82]:
-            return "10d"
-        elif code in [71, 73, 75, 77, 85, 86]:
-            return "13d"
-        elif code in [95, 96, 99]:
-            return "11d"
-        else:
-            return "01d"
+
+    async def get_hourly_forecast_at(self, lat: float, lon: float, columnar: bool = False) -> Dict:
+        """Get 48-hour forecast for a coordinate, with the reverse-geocoded location"""
+        try:
+            bundle = await self.get_forecast_bundle_at(lat, lon)
+            return {"location": bundle.location, "data": self.hourly_view(bundle, columnar)}
+
+        except ValueError as e:
+            raise e
+        except Exception as e:
+            raise Exception(f"Failed to get hourly forecast: {str(e)}")
+
+    async def get_daily_forecast_at(self, lat: float, lon: float, columnar: bool = False) -> Dict:
+        """Get 7-day forecast for a coordinate, with the reverse-geocoded location"""
+        try:
+            bundle = await self.get_forecast_bundle_at(lat, lon)
+            return {"location": bundle.location, "data": self.daily_view(bundle, columnar)}
+
+        except ValueError as e:
+            raise e
+        except Exception as e:
+            raise Exception(f"Failed to get daily forecast: {str(e)}")
+
+    async def get_weather_batch(self, queries: List[Union[str, Dict]]) -> List[Dict]:
+        """
+        Current weather for many locations with as few upstream calls as possible
+
+        Names are geocoded concurrently (through the geocode cache). Each
+        location is looked up under the same forecast-cache key as a single
+        /api/weather request, so cached cells are shared with the other
+        routes. The remaining cells are fetched with Open-Meteo's
+        multi-location support (comma-separated latitude/longitude lists) in
+        chunks of BATCH_CHUNK_SIZE; every cell goes through the single-flight
+        coalescer, so a cell that is already being fetched by another request
+        is joined rather than fetched again.
+
+        Args:
+            queries: City names or {"lat": ..., "lon": ...} dicts
+
+        Returns:
+            One {"success", "data", "error"} dict per query, in input order
+        """
+        results: List[Dict] = [None] * len(queries)
+
+        # 1. Resolve every query to a location (geocoding misses concurrently)
+        async def resolve(query):
+            if isinstance(query, str):
+                return self._first_location(query, await self.geocode_location(query, limit=1))
+            return self._coordinate_location(query["lat"], query["lon"])
+
+        locations = await asyncio.gather(*(resolve(q) for q in queries), return_exceptions=True)
+
+        # 2. Serve cached cells (revalidating stale ones); collect the rest per cell
+        pending: Dict = {}
+        for index, location in enumerate(locations):
+            if isinstance(location, Exception):
+                results[index] = {"success": False, "data": None, "error": str(location)}
+                continue
+            params = self._forecast_params(location["lat"], location["lon"])
+            key = self.forecast_cache.key(location["lat"], location["lon"], params)
+            self.prefetch.record(key, location["lat"], location["lon"])
+            entry = self.forecast_cache.get(key)
+            if entry is None:
+                pending.setdefault(key, (location["lat"], location["lon"], []))[2].append(index)
+                continue
+            if not entry.fresh:
+                self._schedule_revalidation(key, params)
+            results[index] = self._batch_item(location, entry.value)
+
+        # 3. Fetch missing cells in multi-location chunks, coalesced per cell
+        if pending:
+            entries = await self._fetch_forecast_batch(pending)
+            for key, (_, _, indexes) in pending.items():
+                for index in indexes:
+                    entry = entries[key]
+                    if isinstance(entry, Exception):
+                        results[index] = {"success": False, "data": None, "error": f"Failed to fetch weather: {entry}"}
+                    else:
+                        results[index] = self._batch_item(locations[index], entry.value)
+
+        return results
+
+    async def _fetch_forecast_batch(self, cells: Dict) -> Dict:
+        """
+        Fetch forecasts for {key: (lat, lon, ...)} cells; returns {key: CacheEntry or Exception}
+
+        Cells already in flight are joined; the others are requested in
+        chunks, and each cell's share of its chunk is published under the
+        same single-flight key as _cached_forecast uses.
+        """
+        missing = [key for key in cells if ("forecast",) + key not in self.flights]
+        size = Config.BATCH_CHUNK_SIZE
+        chunks = [missing[i:i + size] for i in range(0, len(missing), size)]
+
+        async def fetch(chunk):
+            params = self._forecast_params(
+                ",".join(str(cells[key][0]) for key in chunk),
+                ",".join(str(cells[key][1]) for key in chunk)
+            )
+            data = await self._get_json(self.weather_url, params)
+            # Open-Meteo returns a list for several locations and a single object for one
+            documents = data if isinstance(data, list) else [data]
+            if len(documents) != len(chunk):
+                raise Exception(f"Expected {len(chunk)} locations, got {len(documents)}")
+            return {
+                key: self.forecast_cache.set(key, document, grace=self.prefetch.grace(key))
+                for key, document in zip(chunk, documents)
+            }
+
+        requests_by_key: Dict = {}
+        for chunk in chunks:
+            request = asyncio.ensure_future(fetch(chunk))
+            # Mark a failure as retrieved even if every cell of the chunk joined another call
+            request.add_done_callback(lambda done: done.cancelled() or done.exception())
+            for key in chunk:
+                requests_by_key[key] = request
+
+        async def share(key):
+            request = requests_by_key.get(key)
+            if request is not None:
+                return (await asyncio.shield(request))[key]
+            # Joined an in-flight call, or its own call finished in the meantime: fetch just this cell
+            lat, lon = cells[key][:2]
+            return await self._fetch_forecast(key, self._forecast_params(lat, lon), self.prefetch.grace(key))
+
+        keys = list(cells)
+        outcomes = await asyncio.gather(
+            *(self.flights.do(("forecast",) + key, lambda key=key: share(key)) for key in keys),
+            return_exceptions=True
+        )
+        return dict(zip(keys, outcomes))
+
+    def _batch_item(self, location: Dict, data: Dict) -> Dict:
+        """Successful batch entry built with the same mapping as get_weather"""
+        return {"success": True, "data": self._build_weather_data(location, data), "error": None}
+
+    async def get_dashboard(self, city: str) -> Dict:
+        """Current weather, 48-hour and 7-day forecasts from a single upstream fetch"""
+        try:
+            bundle = await self.get_forecast_bundle(city)
+            return self.dashboard_view(bundle)
+
+        except ValueError as e:
+            raise e
+        except Exception as e:
+            raise Exception(f"Failed to fetch dashboard: {str(e)}")
 
 # Singleton instance
-weather_service = OpenMeteoService()
+async_weather_service = AsyncOpenMeteoService()
@@ -0,0 +1,322 @@
+"""
+Write-behind buffer for batching rows to a slow sink (Google Sheets)
+"""
+import glob
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process adoption of spill files
+    fcntl = None
+
+
+class WriteBufferFull(Exception):
+    """Raised when the buffer stays full for longer than the put timeout"""
+
+
+class WriteBehindBuffer:
+    """
+    Bounded in-memory row buffer flushed in batches by a background thread
+
+    Rows are acknowledged as soon as they are buffered and appended to a spill
+    file, so a crash loses nothing. Each process writes its own spill file
+    (the pid is added to `spill_path`) and holds a lock on it; on startup,
+    files whose owner is gone are replayed and removed. Concurrent put()
+    calls share one fsync, and a successful flush appends a commit marker
+    instead of rewriting the file, which is truncated once nothing is
+    pending. Flushes happen when `batch_size` rows are waiting or every
+    `flush_interval` seconds, whichever comes first.
+
+    Args:
+        flush_fn: Called with a list of rows; must raise on failure
+        max_rows: Buffer capacity; put() blocks when it is reached
+        batch_size: Maximum rows per flush_fn call
+        flush_interval: Seconds between time-triggered flushes
+        spill_path: JSON-lines file used for durability, e.g. "sheets_spill.jsonl"
+            becomes "sheets_spill.<pid>.jsonl" (None disables it)
+        put_timeout: Seconds put() waits for space before raising WriteBufferFull
+    """
+
+    def __init__(
+        self,
+        flush_fn: Callable[[List[list]], None],
+        max_rows: int = 5000,
+        batch_size: int = 100,
+        flush_interval: float = 5.0,
+        spill_path: Optional[str] = None,
+        put_timeout: float = 2.0
+    ):
+        self.flush_fn = flush_fn
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self.put_timeout = put_timeout
+
+        self._rows = deque()
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._closed = False
+        self._failing = False
+        self._spill = None
+        self._written = 0   # spill records written (rows and commit markers)
+        self._synced = 0    # ...of which known to be on disk
+
+        self.flushed_rows = 0
+        self.failed_flushes = 0
+
+        self._replay_spill()
+        self._thread = threading.Thread(target=self._run, name="sheets-write-behind", daemon=True)
+        self._thread.start()
+
+    def put(self, row: list):
+        """
+        Buffer one row (durably, if a spill file is configured)
+
+        Raises:
+            WriteBufferFull: If no space frees up within put_timeout
+        """
+        with self._lock:
+            if self._closed:
+                raise WriteBufferFull("Write buffer is closed")
+            deadline = time.monotonic() + self.put_timeout
+            while len(self._rows) >= self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise WriteBufferFull(f"Write buffer full ({self.max_rows} rows pending)")
+                self._not_full.wait(remaining)
+
+            self._rows.append(row)
+            position = self._append_spill(row)
+
+            if len(self._rows) >= self.batch_size and not self._failing:
+                self._wakeup.notify()
+
+        if position:
+            self._sync_spill(position)
+
+    def pending(self) -> List[list]:
+        """Snapshot of rows not yet flushed (oldest first)"""
+        with self._lock:
+            return list(self._rows)
+
+    def paused(self):
+        """
+        Context manager that holds off flushes (waiting for one in progress)
+
+        While it is held no row moves from pending() to the sink, so readers
+        can combine pending() with what the sink already has without seeing
+        a row twice or not at all. put() is not blocked.
+        """
+        return self._flush_lock
+
+    def flush(self) -> int:
+        """Flush everything currently buffered; returns the number of rows written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._rows[i] for i in range(min(self.batch_size, len(self._rows)))]
+                if not batch:
+                    return written
+                self.flush_fn(batch)
+                self._commit(len(batch))
+                written += len(batch)
+
+    def close(self, timeout: float = 30.0):
+        """Stop the flusher thread and write out remaining rows"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+        self._thread.join(timeout)
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"⚠️  Final Sheets flush failed, {len(self._rows)} rows kept in spill file: {str(e)}")
+        with self._sync_lock:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+
+    def stats(self) -> dict:
+        """Buffer counters for monitoring"""
+        return {
+            "pending_rows": len(self._rows),
+            "max_rows": self.max_rows,
+            "flushed_rows": self.flushed_rows,
+            "failed_flushes": self.failed_flushes
+        }
+
+    def _run(self):
+        delay = self.flush_interval
+        while True:
+            with self._lock:
+                if not self._closed and (self._failing or len(self._rows) < self.batch_size):
+                    self._wakeup.wait(delay)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+                self._failing = False
+                delay = self.flush_interval
+            except Exception as e:
+                # Back off (e.g. Sheets write quota) and keep rows for the retry
+                self._failing = True
+                self.failed_flushes += 1
+                delay = min(delay * 2, 300)
+                print(f"⚠️  Sheets flush failed, retrying in {delay:.0f}s: {str(e)}")
+
+    def _commit(self, count: int):
+        """Drop `count` flushed rows and record that in the spill file"""
+        with self._lock:
+            for _ in range(count):
+                self._rows.popleft()
+            self.flushed_rows += count
+            # Never drained under sustained load: compact below (rare, bounded by max_rows)
+            compact = self._spill is not None and self._rows and self._written >= 4 * self.max_rows
+            position = 0
+            if self._spill is not None and not self._rows:
+                # Nothing pending: start the file over instead of growing it
+                self._spill.truncate(0)
+                position = self._written = self._written + 1
+            elif not compact:
+                position = self._append_spill({"committed": count})
+            self._not_full.notify_all()
+        if compact:
+            with self._sync_lock, self._lock:
+                self._compact_spill()
+        elif position:
+            self._sync_spill(position)
+
+    def _append_spill(self, record) -> int:
+        """Write a row or commit marker (caller holds _lock); returns its position for _sync_spill, 0 without a spill file"""
+        if self._spill is None:
+            return 0
+        self._spill.write(json.dumps(record) + "\n")
+        self._spill.flush()
+        self._written += 1
+        return self._written
+
+    def _compact_spill(self):
+        """Replace the spill file with just the pending rows (caller holds _sync_lock, then _lock)"""
+        path = self._own_spill_path()
+        tmp = open(f"{path}.tmp", "a+")
+        if fcntl is not None:
+            fcntl.flock(tmp.fileno(), fcntl.LOCK_EX)
+        tmp.truncate(0)
+        for row in self._rows:
+            tmp.write(json.dumps(row) + "\n")
+        tmp.flush()
+        os.fsync(tmp.fileno())
+        # The locked handle moves with the file, so no other process can adopt it meanwhile
+        os.replace(tmp.name, path)
+        self._spill.close()
+        self._spill = tmp
+        self._written = self._synced = len(self._rows)
+
+    def _sync_spill(self, position: int):
+        """Wait until spill records up to `position` are on disk; one fsync covers every caller waiting meanwhile"""
+        with self._sync_lock:
+            if self._synced >= position or self._spill is None:
+                return
+            with self._lock:
+                target = self._written
+                fileno = self._spill.fileno()
+            os.fsync(fileno)
+            self._synced = target
+
+    def _own_spill_path(self) -> str:
+        stem, ext = os.path.splitext(self.spill_path)
+        return f"{stem}.{os.getpid()}{ext}"
+
+    def _orphan_candidates(self) -> List[str]:
+        """Other processes' spill files, plus the shared file older versions wrote"""
+        if fcntl is None:
+            return []
+        stem, ext = os.path.splitext(self.spill_path)
+        pattern = re.compile(re.escape(stem) + r"\.\d+" + re.escape(ext) + "$")
+        paths = [path for path in glob.glob(f"{glob.escape(stem)}.*{ext}") if pattern.match(path)]
+        paths.append(self.spill_path)
+        own = self._own_spill_path()
+        return [path for path in paths if path != own and os.path.isfile(path)]
+
+    def _replay_spill(self):
+        """Take over rows left by earlier or dead processes, then open this process's own spill file"""
+        if not self.spill_path:
+            return
+        own = self._own_spill_path()
+        self._spill = open(own, "a+")
+        if fcntl is not None:
+            fcntl.flock(self._spill.fileno(), fcntl.LOCK_EX)
+        self._spill.seek(0)
+        self._rows.extend(_read_spill(self._spill))  # same pid as a previous run (e.g. pid 1 in a container)
+
+        adopted = []
+        try:
+            for path in self._orphan_candidates():
+                try:
+                    spill = open(path)
+                except OSError:
+                    continue  # adopted and removed by another worker meanwhile
+                try:
+                    fcntl.flock(spill.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    spill.close()  # a live worker still owns it
+                    continue
+                if not _same_file(spill, path):
+                    spill.close()  # adopted by another worker between our open and our lock
+                    continue
+                # Keep it locked until its rows are durable in our own file
+                adopted.append(spill)
+                self._rows.extend(_read_spill(spill))
+            if self._rows:
+                print(f"ℹ️  Replaying {len(self._rows)} unsaved Sheets rows into {own}")
+
+            self._spill.truncate(0)
+            for row in self._rows:
+                self._append_spill(row)
+            self._sync_spill(self._written)
+            for spill in adopted:
+                os.remove(spill.name)
+        finally:
+            for spill in adopted:
+                spill.close()
+
+
+def _same_file(spill, path: str) -> bool:
+    """Whether `path` still names the file `spill` has open"""
+    try:
+        return os.fstat(spill.fileno()).st_ino == os.stat(path).st_ino
+    except OSError:
+        return False
+
+
+def _read_spill(spill) -> List[list]:
+    """Rows in a spill file still waiting to be flushed (rows minus committed markers)"""
+    rows = deque()
+    for line in spill:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # Torn last line from a crash mid-write
+            continue
+        if isinstance(record, dict):
+            for _ in range(min(record.get("committed", 0), len(rows))):
+                rows.popleft()
+        else:
+            rows.append(record)
+    return list(rows)
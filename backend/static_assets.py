@@ -0,0 +1,186 @@
+"""
+Precompressed, fingerprinted frontend assets
+
+At startup every file in frontend/ is read once into an in-memory manifest:
+  - CSS/JS get a content-hashed alias (style.css -> style.3f2a1b9c.css) and
+    HTML pages are rewritten to reference the hashed names
+  - gzip and (if the brotli package is installed) brotli variants are
+    precompressed when they are smaller
+  - a strong ETag is derived from the content hash
+
+Requests are then served from memory: hashed names with a one-year
+immutable Cache-Control, original names with `no-cache` so browsers
+revalidate and get 304 Not Modified. No filesystem access per request.
+"""
+import gzip
+import hashlib
+import mimetypes
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+FINGERPRINTED = (".css", ".js")
+COMPRESSIBLE = (".html", ".css", ".js", ".json", ".svg", ".txt")
+MIN_COMPRESS_BYTES = 256
+
+# href="style.css" / src="app.js" (relative, same directory)
+_REFERENCE = re.compile(r'''((?:href|src)=["'])([\w.-]+\.(?:css|js))(["'])''')
+
+
+@dataclass
+class StaticAsset:
+    """One frontend file and its precompressed variants"""
+    name: str
+    media_type: str
+    digest: str
+    body: bytes
+    encoded: Dict[str, bytes] = field(default_factory=dict)  # content-encoding -> body
+    hashed_name: Optional[str] = None
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.digest}"'
+
+
+def _compress(asset: StaticAsset):
+    if not asset.name.endswith(COMPRESSIBLE) or len(asset.body) < MIN_COMPRESS_BYTES:
+        return
+    variants = {"gzip": gzip.compress(asset.body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(asset.body, quality=11)
+    asset.encoded = {encoding: data for encoding, data in variants.items() if len(data) < len(asset.body)}
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if token:
+            accepted[token.strip().lower()] = quality
+    return accepted
+
+
+def _etag_matches(header: str, digest: str) -> bool:
+    """If-None-Match check (weak comparison; encoding suffixes ignored)"""
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"').split("-", 1)[0] == digest:
+            return True
+    return False
+
+
+class AssetManifest:
+    """
+    In-memory map of request path -> asset
+
+    Args:
+        directory: Folder to scan (frontend/)
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.assets: Dict[str, StaticAsset] = {}
+        self.load()
+
+    def load(self):
+        """(Re)build the manifest from disk"""
+        assets: Dict[str, StaticAsset] = {}
+        if self.directory.is_dir():
+            files = sorted(p for p in self.directory.iterdir() if p.is_file() and not p.name.startswith("."))
+            # Fingerprint CSS/JS first so HTML can be rewritten to the hashed names
+            for path in sorted(files, key=lambda p: p.suffix == ".html"):
+                body = path.read_bytes()
+                if path.suffix == ".html":
+                    body = self._rewrite_references(body, assets)
+                assets[path.name] = self._asset(path.name, body)
+        self.assets = {}
+        for asset in assets.values():
+            self.assets[asset.name] = asset
+            if asset.hashed_name:
+                self.assets[asset.hashed_name] = asset
+
+    def _asset(self, name: str, body: bytes) -> StaticAsset:
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type == "application/javascript":
+            media_type += "; charset=utf-8"
+        asset = StaticAsset(name=name, media_type=media_type, digest=digest, body=body)
+        if name.endswith(FINGERPRINTED):
+            stem, dot, suffix = name.rpartition(".")
+            asset.hashed_name = f"{stem}.{digest[:8]}{dot}{suffix}"
+        _compress(asset)
+        return asset
+
+    def _rewrite_references(self, body: bytes, assets: Dict[str, StaticAsset]) -> bytes:
+        def replace(match):
+            asset = assets.get(match.group(2))
+            if asset is None or not asset.hashed_name:
+                return match.group(0)
+            return f"{match.group(1)}{asset.hashed_name}{match.group(3)}"
+
+        return _REFERENCE.sub(replace, body.decode("utf-8")).encode("utf-8")
+
+    def response(self, name: str, headers) -> Optional[Response]:
+        """
+        Response for a request path, or None if the file is unknown
+
+        Args:
+            name: File name relative to frontend/ (e.g. "style.3f2a1b9c.css")
+            headers: Request headers (If-None-Match, Accept-Encoding)
+        """
+        asset = self.assets.get(name)
+        if asset is None:
+            return None
+        cache_control = IMMUTABLE if name == asset.hashed_name else REVALIDATE
+        response_headers = {"ETag": asset.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+        if _etag_matches(headers.get("if-none-match", ""), asset.digest):
+            return Response(status_code=304, headers=response_headers)
+
+        body = asset.body
+        if asset.encoded:
+            accepted = _accepted_encodings(headers.get("accept-encoding", ""))
+            for encoding in ("br", "gzip"):
+                if encoding in asset.encoded and accepted.get(encoding, 0) > 0:
+                    body = asset.encoded[encoding]
+                    response_headers["Content-Encoding"] = encoding
+                    response_headers["ETag"] = f'"{asset.digest}-{encoding}"'
+                    break
+        return Response(content=body, media_type=asset.media_type, headers=response_headers)
+
+    def stats(self) -> Dict:
+        files = {asset.name: asset for asset in self.assets.values()}
+        return {
+            "files": len(files),
+            "bytes": sum(len(asset.body) for asset in files.values()),
+            "gzip_bytes": sum(len(asset.encoded.get("gzip", asset.body)) for asset in files.values()),
+            "brotli": brotli is not None,
+            "fingerprinted": {asset.name: asset.hashed_name for asset in files.values() if asset.hashed_name}
+        }
+
+
+# Singleton instance
+static_assets = AssetManifest(Path(__file__).resolve().parent.parent / "frontend")
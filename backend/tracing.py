@@ -0,0 +1,275 @@
+"""
+Lightweight request tracing
+
+Spans are plain objects linked through a contextvar, so nested `with span(...)`
+blocks in async code (including tasks and threadpool calls started from a
+request) attach to the request's trace. When the root span ends:
+  - sampled traces are exported as one OTLP/JSON line (ExportTraceServiceRequest)
+    to TRACE_EXPORT (a file path or "stdout")
+  - requests slower than SLOW_REQUEST_MS are logged with a per-stage breakdown,
+    whether sampled or not (except event streams, which stay open by design)
+
+With TRACE_EXPORT unset and SLOW_REQUEST_MS=0, span() is a no-op.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from contextvars import Context, ContextVar
+from typing import Dict, List, Optional
+
+from backend.config import Config
+
+SERVICE_NAME = "weatherpro-api"
+
+_current: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_slow_log_lock = threading.Lock()
+TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Trace:
+    """Spans recorded for one request"""
+
+    __slots__ = ("trace_id", "sampled", "spans", "finished")
+
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: List["Span"] = []
+        self.finished = False
+
+
+class Span:
+    """One timed operation; use through span() or start_trace()"""
+
+    __slots__ = ("trace", "span_id", "parent_id", "is_root", "name", "attributes", "start_ns", "end_ns", "error", "_token")
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], attributes: Dict, is_root: bool = False):
+        self.trace = trace
+        self.is_root = is_root
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.error: Optional[str] = None
+        self._token = None
+
+    def set(self, key: str, value):
+        """Attach an attribute"""
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _current.reset(self._token)
+        if not self.trace.finished:
+            self.trace.spans.append(self)
+        if self.is_root:
+            _finish(self)
+        return False
+
+
+class _NoopSpan:
+    """Returned when tracing is off or there is no active trace"""
+
+    __slots__ = ()
+
+    def set(self, key: str, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def enabled() -> bool:
+    return bool(Config.TRACE_EXPORT) or Config.SLOW_REQUEST_MS > 0
+
+
+def start_trace(name: str, traceparent: Optional[str] = None, **attributes):
+    """
+    Root span for a request
+
+    Args:
+        name: Span name (e.g. "GET /api/weather/{city}")
+        traceparent: Incoming W3C traceparent header; continues that trace and honours its sampled flag
+    """
+    if not enabled():
+        return NOOP_SPAN
+    parent_id = None
+    match = TRACEPARENT.match(traceparent or "")
+    if match:
+        trace_id, parent_id, flags = match.groups()
+        sampled = bool(int(flags, 16) & 1)
+    else:
+        trace_id = "%032x" % random.getrandbits(128)
+        sampled = random.random() < Config.TRACE_SAMPLE_RATE
+    return Span(Trace(trace_id, sampled and bool(Config.TRACE_EXPORT)), name, parent_id, attributes, is_root=True)
+
+
+def span(name: str, **attributes):
+    """Child span of the current span (no-op outside a trace)"""
+    parent = _current.get()
+    if parent is None or parent.trace.finished:
+        return NOOP_SPAN
+    return Span(parent.trace, name, parent.span_id, attributes)
+
+
+def current_span():
+    """The active span, or a no-op span"""
+    return _current.get() or NOOP_SPAN
+
+
+def detached_task(coro) -> asyncio.Task:
+    """
+    Start a task outside the current trace
+
+    Tasks copy the caller's context, so a long-lived background loop started
+    while handling a request would otherwise keep attaching spans to that
+    request's trace.
+    """
+    return Context().run(asyncio.create_task, coro)
+
+
+def _finish(root: Span):
+    trace = root.trace
+    trace.finished = True
+    if trace.sampled:
+        exporter.export(trace)
+    streaming = root.attributes.get("http.streaming", False)
+    if Config.SLOW_REQUEST_MS > 0 and root.duration_ms >= Config.SLOW_REQUEST_MS and not streaming:
+        _log_slow(root)
+
+
+def _log_slow(root: Span):
+    """One line per slow request: total time and each stage, indented by depth"""
+    children: Dict[str, List[Span]] = {}
+    for item in root.trace.spans:
+        children.setdefault(item.parent_id, []).append(item)
+
+    def walk(parent: Span, depth: int, parts: List[str]):
+        for child in sorted(children.get(parent.span_id, []), key=lambda s: s.start_ns):
+            marker = " ✗" if child.error else ""
+            parts.append(f"{'›' * depth} {child.name} {child.duration_ms:.0f}ms{marker}")
+            walk(child, depth + 1, parts)
+
+    parts: List[str] = []
+    walk(root, 1, parts)
+    line = f"🐢 Slow request {root.name} {root.duration_ms:.0f}ms (trace {root.trace.trace_id}): " + "; ".join(parts)
+    if Config.SLOW_REQUEST_LOG:
+        with _slow_log_lock, open(Config.SLOW_REQUEST_LOG, "a") as log:
+            log.write(line + "\n")
+    else:
+        print(line)
+
+
+def _otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPJsonExporter:
+    """Writes each finished trace as one OTLP/JSON ExportTraceServiceRequest line"""
+
+    def __init__(self, target: str):
+        self.target = target
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace):
+        line = json.dumps(self._document(trace), separators=(",", ":"))
+        with self._lock:
+            if self.target == "stdout":
+                print(line, flush=True)
+            else:
+                with open(self.target, "a") as out:
+                    out.write(line + "\n")
+
+    def _document(self, trace: Trace) -> Dict:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "backend.tracing"},
+                    "spans": [self._span(trace.trace_id, item) for item in trace.spans]
+                }]
+            }]
+        }
+
+    def _span(self, trace_id: str, item: Span) -> Dict:
+        document = {
+            "traceId": trace_id,
+            "spanId": item.span_id,
+            "name": item.name,
+            "kind": 2 if item.is_root else 1,  # SERVER / INTERNAL
+            "startTimeUnixNano": str(item.start_ns),
+            "endTimeUnixNano": str(item.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in item.attributes.items()],
+            "status": {"code": 2, "message": item.error} if item.error else {"code": 1}
+        }
+        if item.parent_id:
+            document["parentSpanId"] = item.parent_id
+        return document
+
+
+exporter = OTLPJsonExporter(Config.TRACE_EXPORT)
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the root span of every HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled():
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope.get("headers", []):
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                for key, value in message.get("headers", []):
+                    if key.lower() == b"content-type" and value.startswith(b"text/event-stream"):
+                        # Lasts as long as the client stays connected: not a slow request
+                        root.set("http.streaming", True)
+            await send(message)
+
+        root = start_trace(scope["path"], traceparent, **{"http.method": scope["method"], "http.target": scope["path"]})
+        with root:
+            await self.app(scope, receive, send_with_status)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or scope["path"]
+            root.name = f"{scope['method']} {path}"
+            root.set("http.route", path)
+            root.set("http.status_code", status[0])
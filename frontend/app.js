@@ -72,6 +72,7 @@ const noHistory = document.getElementById('noHistory');
 // State
 let currentWeatherData = null;
 let currentCity = null;
+let liveWeather = null;
 
 // ===== Theme Management =====
 function initTheme() {
@@ -126,8 +127,8 @@ async function searchWeather() {
         showLoading();
         currentCity = city;
 
-        // Fetch current weather
-        const response = await apiCallWithAuth(`${API_BASE_URL}/weather/${encodeURIComponent(city)}`);
+        // Fetch current weather and forecasts in one call
+        const response = await apiCallWithAuth(`${API_BASE_URL}/dashboard/${encodeURIComponent(city)}`);
         const result = await response.json();
 
         if (!response.ok) {
@@ -138,9 +139,13 @@ async function searchWeather() {
             currentWeatherData = result.data;
             displayCurrentWeather(result.data);
 
-            // Load forecasts
-            loadHourlyForecast(city);
-            loadDailyForecast(city);
+            // Show forecasts from the same response
+            displayHourlyForecast(result.hourly);
+            show(forecastSection);
+            displayDailyForecast(result.daily);
+
+            // Keep current conditions up to date without re-polling
+            subscribeLiveWeather(city);
         } else {
             throw new Error('Invalid response from server');
         }
@@ -152,6 +157,52 @@ async function searchWeather() {
     }
 }
 
+// ===== Live Updates (Server-Sent Events) =====
+const LIVE_RECONNECT_DELAY = 5000;
+
+async function subscribeLiveWeather(city) {
+    if (liveWeather) {
+        liveWeather.close();
+        liveWeather = null;
+    }
+    if (!window.EventSource) return;
+
+    // The access token never goes in a URL: exchange it for a single-use stream ticket
+    let ticket;
+    try {
+        const response = await apiCallWithAuth(`${API_BASE_URL}/weather/stream/ticket`, { method: 'POST' });
+        if (!response.ok) return;
+        ticket = (await response.json()).ticket;
+    } catch (err) {
+        return;
+    }
+    // A newer search started while the ticket was being fetched
+    if (city !== currentCity || liveWeather) return;
+
+    const url = `${API_BASE_URL}/weather/stream?cities=${encodeURIComponent(city)}&ticket=${encodeURIComponent(ticket)}`;
+    const source = new EventSource(url);
+    liveWeather = source;
+
+    source.addEventListener('weather', event => {
+        const update = JSON.parse(event.data);
+        if (city !== currentCity) return;
+        currentWeatherData = update.data;
+        displayCurrentWeather(update.data);
+    });
+
+    // Server asked us to stop (slow connection, shutdown): reconnect on the next search
+    source.addEventListener('close', () => source.close());
+
+    // The browser's own reconnect reuses the spent ticket and is rejected: resubscribe with a new one
+    source.addEventListener('error', () => {
+        if (source.readyState !== EventSource.CLOSED || liveWeather !== source) return;
+        liveWeather = null;
+        setTimeout(() => {
+            if (city === currentCity && !liveWeather) subscribeLiveWeather(city);
+        }, LIVE_RECONNECT_DELAY);
+    });
+}
+
 function displayCurrentWeather(data) {
     locationName.textContent = data.city;
     locationCountry.textContent = data.country;
@@ -171,20 +222,6 @@ function displayCurrentWeather(data) {
 }
 
 // ===== Hourly Forecast =====
-async function loadHourlyForecast(city) {
-    try {
-        const response = await apiCallWithAuth(`${API_BASE_URL}/forecast/hourly/${encodeURIComponent(city)}`);
-        const result = await response.json();
-
-        if (result.success && result.data) {
-            displayHourlyForecast(result.data);
-            show(forecastSection);
-        }
-    } catch (err) {
-        console.error('Hourly forecast error:', err);
-    }
-}
-
 function displayHourlyForecast(data) {
     hourlyForecast.innerHTML = '';
 
@@ -207,19 +244,6 @@ function displayHourlyForecast(data) {
 }
 
 // ===== Daily Forecast =====
-async function loadDailyForecast(city) {
-    try {
-        const response = await apiCallWithAuth(`${API_BASE_URL}/forecast/daily/${encodeURIComponent(city)}`);
-        const result = await response.json();
-
-        if (result.success && result.data) {
-            displayDailyForecast(result.data);
-        }
-    } catch (err) {
-        console.error('Daily forecast error:', err);
-    }
-}
-
 function displayDailyForecast(data) {
     dailyForecast.innerHTML = '';
 